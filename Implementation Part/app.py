@@ -1,104 +1,616 @@
+import gc
+import io
 import os
+import math
 import json
+import time
 import logging
-from flask import Flask, jsonify, request, render_template, abort
+from flask import Blueprint, Flask, current_app, jsonify, request, render_template, abort, g, send_file
 from flask_cors import CORS
+from flask.json.provider import DefaultJSONProvider
 import uuid
+import hashlib
 from datetime import datetime
+from storage.registry import get_store
+from storage import codec
+from indexes.text_index import TextIndex, tokenize
+from indexes.sorted_index import SortedIndex
+from indexes.facet_index import FacetIndex
+from indexes.geo_index import GeoIndex, valid_coordinates
+from indexes.stats_index import StatsIndex
+from indexes import columnar_index
+from query.filters import IndexSource, RangeFilter, ValueFilter, matching_ids
+from query.pagination import (MAX_PAGE_SIZE, InvalidCursor, encode_cursor, decode_cursor,
+                              position_after, project, project_record)
+from query.encoding import MIN_COMPRESS_BYTES, choose_encoding, stream_json_array, stream_ndjson
+from query.response_cache import ResponseCache
+from monitoring.metrics import MetricsRegistry, SIZE_BUCKETS
+from monitoring.write_log import SampledWriteLog
+from monitoring.profiling import RequestProfiler, list_profiles, profile_path, rate_sampler
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG)
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes and decodes with the storage codec (orjson if installed)"""
 
-# Initialize Flask app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "ireland_tourism_default_key")
-CORS(app)  # Enable CORS for all routes
+    def dumps(self, obj, **kwargs):
+        # jsonify() only ever asks for compact separators or an indent
+        if set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        try:
+            return codec.dumps(obj, pretty='indent' in kwargs, sort_keys=self.sort_keys).decode('utf-8')
+        except TypeError:
+            # Types only Flask's default handler knows (Decimal, dates, ...)
+            return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return codec.loads(s)
+
+# Directory holding this file; relative data paths default to living under it
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # Path to the data file
-DATA_FILE = "data/attractions.json"
+DATA_FILE = os.path.join(APP_DIR, "data", "attractions.json")
+
+def settings_from_env():
+    """App settings read from the environment; create_app(config) overrides them"""
+    return {
+        'SECRET_KEY': os.environ.get("SESSION_SECRET", "ireland_tourism_default_key"),
+        'DATA_FILE': os.environ.get("DATA_FILE", DATA_FILE),
+        # 'json' rewrites the whole file per mutation, 'wal' appends to a write-ahead log,
+        # 'sqlite' keeps the data in an SQLite database seeded from the data file,
+        # 'mmap' serves a memory-mapped binary snapshot of it with a write-ahead log on top
+        'STORAGE_MODE': os.environ.get("STORAGE_MODE", "json"),
+        'WAL_COMPACT_BYTES': int(os.environ.get("WAL_COMPACT_BYTES", 4 * 1024 * 1024)),
+        # Hold attractions as shared-key tuples with interned locations and descriptions
+        # ('json' and 'wal' modes); less memory per worker, a dict built per record read
+        'COMPACT_RECORDS': os.environ.get("COMPACT_RECORDS", "0") == "1",
+        # 'numpy' also holds rating, created_at and location as NumPy columns and answers
+        # filtered list pages with vectorised masks ('json' and 'wal' modes; needs numpy)
+        'QUERY_ENGINE': os.environ.get("QUERY_ENGINE", "index"),
+        # Database used in 'sqlite' mode; defaults to the data file with a .db extension
+        'SQLITE_FILE': os.environ.get("SQLITE_FILE"),
+        # Memory budget for cached, already-encoded list responses
+        'RESPONSE_CACHE_BYTES': int(os.environ.get("RESPONSE_CACHE_BYTES", 64 * 1024 * 1024)),
+        # Unpaginated results with at least this many records are streamed, not cached
+        'STREAM_MIN_RECORDS': int(os.environ.get("STREAM_MIN_RECORDS", 5000)),
+        # Request metrics on /metrics; when off, instrumentation is a no-op
+        'METRICS_ENABLED': os.environ.get("METRICS_ENABLED", "1") != "0",
+        # Fraction of write requests logged as one structured JSON record
+        'WRITE_LOG_SAMPLE_RATE': float(os.environ.get("WRITE_LOG_SAMPLE_RATE", 0.01)),
+        # cProfile a sample of requests and keep the profiles of those slower than the threshold.
+        # PROFILE_SAMPLER may be set to a callable(request) -> bool to replace the random sample
+        'PROFILE_ENABLED': os.environ.get("PROFILE_ENABLED", "0") == "1",
+        'PROFILE_THRESHOLD_MS': float(os.environ.get("PROFILE_THRESHOLD_MS", 500)),
+        'PROFILE_SAMPLE_RATE': float(os.environ.get("PROFILE_SAMPLE_RATE", 1.0)),
+        'PROFILE_SAMPLER': None,
+        'PROFILE_DIR': os.environ.get("PROFILE_DIR", os.path.join(APP_DIR, "data", "profiles")),
+        'PROFILE_KEEP': int(os.environ.get("PROFILE_KEEP", 100)),
+        # GET /debug/profiles exposes code paths and query strings, so it is off unless asked for
+        'PROFILE_ENDPOINT_ENABLED': os.environ.get("PROFILE_ENDPOINT_ENABLED", "0") == "1",
+    }
+
+# Settings each APP_PROFILE applies on top of the environment, before create_app's config.
+# production loads and indexes the dataset before gunicorn forks (preload_app) so
+# workers start warm and share those pages copy-on-write
+PROFILES = {
+    'development': {'LOG_LEVEL': 'DEBUG', 'PRELOAD_DATA': False},
+    'production': {'LOG_LEVEL': 'INFO', 'PRELOAD_DATA': True},
+}
+
+# Shared by every app in the process; create_app applies its settings to them
+response_cache = ResponseCache()
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram('http_request_duration_seconds', "Request latency by route",
+                                    ('method', 'route', 'status'))
+phase_seconds = metrics.histogram('app_phase_duration_seconds',
+                                  "Time spent reading, filtering, sorting, serialising and writing",
+                                  ('phase',))
+request_bytes = metrics.histogram('http_request_size_bytes', "Request body size by route",
+                                  ('method', 'route'), SIZE_BUCKETS)
+response_bytes = metrics.histogram('http_response_size_bytes', "Response body size by route",
+                                   ('method', 'route'), SIZE_BUCKETS)
+records_written = metrics.counter('attractions_written_total', "Attractions created, updated or deleted",
+                                  ('route',))
+metrics.gauge('attractions_dataset_size', "Attractions in the store", lambda: attraction_store().count())
+metrics.gauge('response_cache_bytes', "Bytes held by the list response cache",
+              lambda: response_cache.stats()['bytes'])
+metrics.gauge('response_cache_hits_total', "List response cache hits",
+              lambda: response_cache.hits, 'counter')
+metrics.gauge('response_cache_misses_total', "List response cache misses",
+              lambda: response_cache.misses, 'counter')
+write_log = SampledWriteLog(logging.getLogger('attractions.writes'), 0)
+_profilers = {}
+
+# Fields searched by ?search= and how much a match in each counts
+SEARCH_FIELDS = {'name': 3.0, 'location': 2.0, 'description': 1.0}
+
+# Fields accepted by ?sort_by=, each backed by a pre-sorted index
+SORT_FIELDS = ['name', 'location', 'rating', 'created_at']
+
+# Fields accepted as ?<field>= exact-value filters and by ?facets=, each backed by a facet index
+FACET_FIELDS = ['location']
+
+# Page size used when a client sends ?cursor= without ?limit=
+DEFAULT_PAGE_SIZE = 50
+
+# Results returned by /api/attractions/nearby without ?limit=
+DEFAULT_NEARBY_LIMIT = 20
+
+# Content types POST /api/attractions/bulk reads as one JSON record per line
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+
+# Per-row errors listed in a bulk response; the rest are only counted
+MAX_BULK_ERRORS = 100
+
+# Most ids or operations accepted by one batch-get or batch PATCH request
+MAX_BATCH_SIZE = 1000
+
+RATING_ERROR = "Rating must be a number between 0 and 5"
+
+COORDINATES_ERROR = "lat and lon must be given together, lat between -90 and 90 and lon between -180 and 180"
+
+attractions = Blueprint('attractions', __name__)
+
+def create_app(config=None):
+    """Build the app from the environment, an APP_PROFILE and config overrides"""
+    config = dict(config or {})
+    profile = config.get('APP_PROFILE', os.environ.get("APP_PROFILE", "development"))
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown APP_PROFILE: {profile}")
+    
+    app = Flask(__name__)
+    app.json = CodecJSONProvider(app)
+    app.config.update(settings_from_env())
+    app.config.update(PROFILES[profile])
+    app.config.update(config, APP_PROFILE=profile)
+    if app.config['QUERY_ENGINE'] not in ('index', 'numpy'):
+        raise ValueError(f"Unknown QUERY_ENGINE: {app.config['QUERY_ENGINE']}")
+    if app.config['QUERY_ENGINE'] == 'numpy' and columnar_index.np is None:
+        logging.warning("QUERY_ENGINE=numpy needs numpy, which is not installed; using the index engine")
+    
+    logging.basicConfig(level=app.config['LOG_LEVEL'])
+    logging.getLogger().setLevel(app.config['LOG_LEVEL'])
+    CORS(app)  # Enable CORS for all routes
+    
+    response_cache.max_bytes = app.config['RESPONSE_CACHE_BYTES']
+    metrics.enabled = app.config['METRICS_ENABLED']
+    write_log.rate = app.config['WRITE_LOG_SAMPLE_RATE']
+    
+    app.register_blueprint(attractions)
+    initialize_data(app.config['DATA_FILE'])
+    if app.config['PRELOAD_DATA']:
+        preload(app)
+    return app
+
+def __getattr__(name):
+    """Build the default app on first use of ``app``, so importing has no side effects"""
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Ensure data directory and file exist
-def initialize_data():
+def initialize_data(data_file):
     """Initialize the data file if it doesn't exist"""
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    if not os.path.exists(DATA_FILE):
+    os.makedirs(os.path.dirname(os.path.abspath(data_file)), exist_ok=True)
+    if not os.path.exists(data_file):
         # Create default file with empty array
-        with open(DATA_FILE, 'w') as f:
+        with open(data_file, 'w') as f:
             json.dump([], f)
 
-initialize_data()
+def preload(app):
+    """Load the dataset and build every index before workers fork"""
+    start = time.perf_counter()
+    with app.app_context():
+        count = attraction_store().count()
+    # Objects that exist now are never touched by the collector again, so its
+    # bookkeeping does not copy the shared pages into each worker
+    gc.collect()
+    gc.freeze()
+    logging.info(f"Preloaded {count} attractions in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+def attraction_store():
+    """Return the cached store for the configured data file"""
+    if current_app.config['STORAGE_MODE'] == 'wal':
+        store = get_store(current_app.config['DATA_FILE'], 'wal',
+                          compact_bytes=current_app.config['WAL_COMPACT_BYTES'],
+                          compact_records=current_app.config['COMPACT_RECORDS'])
+    elif current_app.config['STORAGE_MODE'] == 'sqlite':
+        store = get_store(current_app.config['DATA_FILE'], 'sqlite', db_path=current_app.config['SQLITE_FILE'],
+                          sort_fields=SORT_FIELDS, search_fields=SEARCH_FIELDS)
+    elif current_app.config['STORAGE_MODE'] == 'mmap':
+        store = get_store(current_app.config['DATA_FILE'], 'mmap',
+                          compact_bytes=current_app.config['WAL_COMPACT_BYTES'],
+                          sort_fields=SORT_FIELDS, search_fields=SEARCH_FIELDS)
+    else:
+        store = get_store(current_app.config['DATA_FILE'], current_app.config['STORAGE_MODE'],
+                          compact_records=current_app.config['COMPACT_RECORDS'])
+    if store.native_queries:
+        return store
+    store.ensure_index('text', lambda: TextIndex(SEARCH_FIELDS))
+    for field in SORT_FIELDS:
+        store.ensure_index(f'sort:{field}', lambda field=field: SortedIndex(field))
+    for field in FACET_FIELDS:
+        store.ensure_index(f'facet:{field}', lambda field=field: FacetIndex(field))
+    store.ensure_index('geo', GeoIndex)
+    store.ensure_index('stats', StatsIndex)
+    if current_app.config['QUERY_ENGINE'] == 'numpy' and columnar_index.np is not None:
+        store.ensure_index('columns', columnar_index.ColumnarIndex)
+    return store
 
 def read_data():
-    """Read data from the JSON file"""
-    try:
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
-        # Log the error for debugging
-        logging.error(f"Error reading from {DATA_FILE}. Creating empty data array.")
-        return []
+    """Read data from the JSON file (served from the in-memory cache)"""
+    with phase('read_data'):
+        return list(attraction_store().records())
 
 def write_data(data):
     """Write data to the JSON file"""
+    data_file = current_app.config['DATA_FILE']
     try:
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
-        logging.debug(f"Successfully wrote data to {DATA_FILE}")
+        with phase('write_data'):
+            attraction_store().save(data)
     except Exception as e:
-        logging.error(f"Error writing to {DATA_FILE}: {str(e)}")
+        logging.error(f"Error writing to {data_file}: {str(e)}")
         raise
 
+def request_profiler():
+    """Return the profiler for the current config, or None when profiling is off"""
+    if not current_app.config['PROFILE_ENABLED']:
+        return None
+    settings = (current_app.config['PROFILE_DIR'], current_app.config['PROFILE_THRESHOLD_MS'],
+                current_app.config['PROFILE_SAMPLE_RATE'], current_app.config['PROFILE_SAMPLER'], current_app.config['PROFILE_KEEP'])
+    profiler = _profilers.get(settings)
+    if profiler is None:
+        directory, threshold_ms, rate, sampler, keep = settings
+        profiler = _profilers[settings] = RequestProfiler(directory, threshold_ms,
+                                                          sampler or rate_sampler(rate), keep)
+    return profiler
+
+def phase(name):
+    """Time a section of request handling under app_phase_duration_seconds"""
+    return metrics.timer(phase_seconds, name)
+
+def attraction_etag(attraction):
+    """Strong ETag derived from an attraction's content, identical in every worker"""
+    return hashlib.sha1(codec.dumps(attraction, sort_keys=True)).hexdigest()
+
+def precondition_failed(attraction):
+    """True if the request's If-Match header does not match the attraction"""
+    return bool(request.if_match) and attraction_etag(attraction) not in request.if_match
+
 # API Routes
-@app.route('/api/attractions', methods=['GET'])
+def cached_response(cache_key, entry):
+    """Build a response from a cache entry, answering If-None-Match with 304"""
+    encoding = None
+    if len(entry.body) >= MIN_COMPRESS_BYTES:
+        encoding = choose_encoding(request.accept_encodings)
+    if encoding:
+        response = current_app.response_class(response_cache.encoded(cache_key, entry, encoding),
+                                      mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+        # Each coding is a different representation and needs its own strong ETag
+        response.set_etag(f"{entry.etag}-{encoding}")
+    else:
+        response = current_app.response_class(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+    response.headers.update(entry.headers)
+    response.vary.add('Accept-Encoding')
+    return response.make_conditional(request)
+
+def streamed_response(attractions, fields, headers):
+    """Stream a JSON array record by record instead of building it in memory"""
+    encoding = choose_encoding(request.accept_encodings)
+    # The body is generated after the request context is gone, so bind the encoder now
+    json_dumps = current_app.json.dumps
+    dumps = lambda attraction: json_dumps(project_record(attraction, fields))
+    response = current_app.response_class(stream_json_array(attractions, dumps, encoding),
+                                  mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers.update(headers)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def list_attractions(store, search_term, sort_by, reverse, limit, after, fields, query_key,
+                     filters=(), facets=(), fuzzy=False, lazy=False):
+    """Run a list query against the indexes and return (attractions, total, next_cursor, facet_counts).
+
+    With ``lazy`` and no limit the attractions are an iterator that reads
+    one record at a time, for a response streamed without holding them all.
+    """
+    if store.native_queries:
+        # Search, filters, sort and keyset pagination run inside the store
+        with phase('query'):
+            attractions, total, last, has_more = store.query(search_term, sort_by, reverse, limit, after,
+                                                             filters, fuzzy, lazy)
+            facet_counts = {field: store.facets(field, search_term, other_filters(filters, field), fuzzy)
+                            for field in facets}
+        next_cursor = encode_cursor(last, query_key) if has_more else None
+        return attractions, total, next_cursor, facet_counts
+    
+    sort_index = store.indexes.get(f'sort:{sort_by}')
+    source = IndexSource(store.indexes)
+    columns = store.indexes.get('columns') if current_app.config['QUERY_ENGINE'] == 'numpy' else None
+    with phase('filter'):
+        # Search functionality, answered by the inverted index
+        scores = store.indexes['text'].search(search_term, fuzzy) if search_term else None
+        # Filters and field sorts only need the matching keys, never their relevance
+        hits = scores.ids if scores is not None else None
+        result = None
+        if columns is not None and (filters or hits is not None) and sort_by != 'relevance':
+            # Filter and pick the page with vectorised masks; None if the columns cannot answer
+            result = columns.page(sort_by, hits, filters, reverse, limit, after)
+        if result is not None:
+            facet_counts = {field: column_counts(columns, source, field, other_filters(filters, field), hits)
+                            for field in facets}
+        else:
+            matched = matching_ids(source, filters, hits) if filters else hits
+            facet_counts = {field: source.counts(field, matching_ids(source, other_filters(filters, field), hits))
+                            for field in facets}
+    if result is not None:
+        page_ids, total, has_more = result
+        key_of = sort_index.entry
+    elif sort_by == 'relevance' and limit:
+        with phase('sort'):
+            # Rank just the page, not every match
+            top = scores.top(limit + 1, after, matched if filters else None)
+        total, has_more = len(matched), len(top) > limit
+        page_ids = [doc_id for _, doc_id in top[:limit]]
+        key_of = lambda i: (scores[i], i)
+    elif matched is not None:
+        with phase('sort'):
+            if sort_by == 'relevance':
+                ids = TextIndex.rank({i: scores[i] for i in matched})
+                key_of, descending = (lambda i: (scores[i], i)), True
+            else:
+                # Order the matches by walking the pre-sorted index, not re-sorting
+                ids = sort_index.order(matched, reverse)
+                key_of, descending = sort_index.entry, reverse
+        total = len(ids)
+        start = position_after(ids, key_of, after, descending) if after is not None else 0
+        page_ids = ids[start:start + limit] if limit else ids
+        has_more = bool(limit) and start + limit < total
+    else:
+        total = len(sort_index)
+        key_of = sort_index.entry
+        if limit:
+            page_ids = sort_index.page(after, limit + 1, reverse)
+            has_more = len(page_ids) > limit
+            page_ids = page_ids[:limit]
+        else:
+            page_ids, has_more = sort_index.ids(reverse), False
+    
+    next_cursor = encode_cursor(key_of(page_ids[-1]), query_key) if has_more else None
+    with phase('read_data'):
+        records = store.iter_lookup(page_ids) if lazy and not limit else store.lookup(page_ids)
+        return records, total, next_cursor, facet_counts
+
+def column_counts(columns, source, field, filters, scores):
+    """Facet counts from the columnar index, or from the facet index when the columns cannot answer"""
+    mask = columns.matches(filters, scores)
+    counts = columns.counts(field, mask) if mask is not None else None
+    if counts is None:
+        counts = source.counts(field, matching_ids(source, filters, scores))
+    return counts
+
+def other_filters(filters, field):
+    """The filters except those on field; a facet counts values as if it were unfiltered"""
+    return [f for f in filters if f.field != field]
+
+def number_arg(name):
+    """Parse a numeric query parameter, or None if absent"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        number = math.nan
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be a number")
+    return number
+
+def date_arg(name):
+    """Parse an ISO 8601 date or date-time query parameter into the form created_at is stored in"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or date-time")
+
+def list_filters():
+    """Build the filters a list request asks for; ValueError names a bad parameter"""
+    filters = []
+    low, high = number_arg('min_rating'), number_arg('max_rating')
+    if low is not None or high is not None:
+        filters.append(RangeFilter('rating', low, high))
+    after, before = date_arg('created_after'), date_arg('created_before')
+    if after is not None or before is not None:
+        filters.append(RangeFilter('created_at', after, before, exclusive=True))
+    for field in FACET_FIELDS:
+        values = [value for value in request.args.getlist(field) if value]
+        if values:
+            filters.append(ValueFilter(field, values))
+    return filters
+
+@attractions.route('/api/attractions', methods=['GET'])
 def get_attractions():
-    """Get all attractions with optional search and sort parameters"""
-    attractions = read_data()
-    
-    # Search functionality
-    search_term = request.args.get('search', '').lower()
-    if search_term:
-        attractions = [a for a in attractions if 
-                      search_term in a.get('name', '').lower() or 
-                      search_term in a.get('location', '').lower() or
-                      search_term in a.get('description', '').lower()]
-    
-    # Sorting functionality
-    sort_by = request.args.get('sort_by', 'name')
+    """Get attractions with optional search, filters, facets, sort, pagination and field selection"""
+    store = attraction_store()
+    
+    # Normalise the query so equivalent requests share a cache entry
+    search_term = ' '.join(tokenize(request.args.get('search', '')))
+    # Typo-tolerant matching of the search terms
+    fuzzy = bool(search_term) and request.args.get('fuzzy', '0').lower() in ('1', 'true')
+    sort_by = request.args.get('sort_by', 'relevance' if search_term else 'name')
     reverse = request.args.get('order', 'asc') == 'desc'
+    if sort_by not in SORT_FIELDS and not (sort_by == 'relevance' and search_term):
+        sort_by = 'name'
+    fields = tuple(f.strip() for f in request.args.get('fields', '').split(',') if f.strip())
     
-    if sort_by in ['name', 'location', 'rating', 'created_at']:
-        attractions = sorted(attractions, key=lambda x: x.get(sort_by, ''), reverse=reverse)
+    # Range and exact-value filters, and the fields to return facet counts for
+    try:
+        filters = list_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    facets = tuple(dict.fromkeys(f.strip() for f in request.args.get('facets', '').split(',') if f.strip()))
+    if any(field not in FACET_FIELDS for field in facets):
+        return jsonify({"error": f"facets must be among: {', '.join(FACET_FIELDS)}"}), 400
     
-    return jsonify(attractions)
+    # Pagination: ?limit= with an opaque keyset ?cursor= from the previous page
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    elif cursor:
+        limit = DEFAULT_PAGE_SIZE
+    filter_keys = [f.key() for f in filters]
+    query_key = [search_term, sort_by, reverse] + ([filter_keys] if filters else []) + (['fuzzy'] if fuzzy else [])
+    try:
+        after = decode_cursor(cursor, query_key) if cursor else None
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+    
+    # Identical queries against the same dataset version reuse the encoded body
+    with phase('read_data'):
+        generation = (store.path, store.current_version())
+    cache_key = (search_term, sort_by, reverse, limit, cursor, fields, codec.dumps(filter_keys), facets, fuzzy)
+    entry = response_cache.get(generation, cache_key)
+    if entry is None:
+        unpaginated = limit is None and not facets
+        attractions, total, next_cursor, facet_counts = list_attractions(
+            store, search_term, sort_by, reverse, limit, after, fields, query_key, filters, facets, fuzzy,
+            lazy=unpaginated)
+        headers = {'X-Total-Count': str(total)}
+        if unpaginated:
+            # Every match is listed, so the total decides before any record is read
+            if total >= current_app.config['STREAM_MIN_RECORDS']:
+                return streamed_response(attractions, fields, headers)
+            payload = project(list(attractions), fields)
+        else:
+            payload = {
+                "items": project(attractions, fields),
+                "total": total,
+                "limit": limit,
+                "next_cursor": next_cursor
+            }
+            if facets:
+                payload["facets"] = facet_counts
+        with phase('serialise'):
+            body = jsonify(payload).get_data()
+        entry = response_cache.put(generation, cache_key, body, headers)
+    return cached_response(cache_key, entry)
+
+@attractions.route('/api/attractions/nearby', methods=['GET'])
+def get_nearby_attractions():
+    """Get the attractions nearest to ?lat=&lon=, closest first, optionally within ?radius_km="""
+    try:
+        lat, lon, radius_km = number_arg('lat'), number_arg('lon'), number_arg('radius_km')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if lat is None or lon is None or not valid_coordinates(lat, lon):
+        return jsonify({"error": "lat must be between -90 and 90 and lon between -180 and 180"}), 400
+    if radius_km is not None and radius_km <= 0:
+        return jsonify({"error": "radius_km must be greater than 0"}), 400
+    try:
+        limit = int(request.args.get('limit', DEFAULT_NEARBY_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    fields = tuple(f.strip() for f in request.args.get('fields', '').split(',') if f.strip())
+    
+    store = attraction_store()
+    with phase('query'):
+        if store.native_queries:
+            nearest = store.nearby(lat, lon, limit, radius_km)
+        else:
+            hits = store.indexes['geo'].nearest(lat, lon, limit, radius_km)
+            found = {a['id']: a for a in store.lookup([attraction_id for _, attraction_id in hits])}
+            nearest = [(distance, found[i]) for distance, i in hits if i in found]
+    items = [dict(project_record(attraction, fields), distance_km=round(distance, 3))
+             for distance, attraction in nearest]
+    return jsonify({"items": items, "total": len(items), "limit": limit})
+
+@attractions.route('/api/attractions/stats', methods=['GET'])
+def get_attraction_stats():
+    """Count, rating summary and histogram, per-location counts and averages, and creations per day and month"""
+    store = attraction_store()
+    with phase('query'):
+        if store.native_queries:
+            stats = store.stats()
+        else:
+            store.refresh()
+            stats = store.indexes['stats'].summary()
+    return jsonify(stats)
 
-@app.route('/api/attractions/<attraction_id>', methods=['GET'])
+@attractions.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss counters for the list response cache"""
+    return jsonify(response_cache.stats())
+
+@attractions.route('/api/attractions/<attraction_id>', methods=['GET'])
 def get_attraction(attraction_id):
     """Get a specific attraction by ID"""
-    attractions = read_data()
-    attraction = next((a for a in attractions if a.get('id') == attraction_id), None)
+    with phase('read_data'):
+        attraction = attraction_store().get(attraction_id)
     
     if attraction:
-        return jsonify(attraction)
+        response = jsonify(attraction)
+        response.set_etag(attraction_etag(attraction))
+        return response
     else:
         return jsonify({"error": "Attraction not found"}), 404
 
-@app.route('/api/attractions', methods=['POST'])
-def create_attraction():
-    """Create a new attraction"""
-    data = request.get_json()
+def valid_rating(rating):
+    """True if rating is a number between 0 and 5"""
+    return isinstance(rating, (int, float)) and 0 <= rating <= 5
+
+def coordinates_error(record):
+    """Return COORDINATES_ERROR unless a record has valid lat/lon or neither of them"""
+    lat, lon = record.get('lat'), record.get('lon')
+    if (lat is not None or lon is not None) and not valid_coordinates(lat, lon):
+        return COORDINATES_ERROR
+    return None
+
+def updated_attraction(attraction, data, updated_at=None):
+    """Return a copy of attraction with the fields in data applied"""
+    updated = attraction.copy()
+    for key, value in data.items():
+        if key != 'id' and key != 'created_at':  # Prevent updating these fields
+            updated[key] = value
+    
+    updated['updated_at'] = updated_at or datetime.now().isoformat()
+    return updated
+
+def validation_error(data):
+    """Return why data cannot be created as an attraction, or None if it is valid"""
+    if not isinstance(data, dict):
+        return "Attraction must be a JSON object"
     
     # Validation
     required_fields = ['name', 'location', 'description', 'rating']
     for field in required_fields:
         if field not in data:
-            return jsonify({"error": f"Missing required field: {field}"}), 400
+            return f"Missing required field: {field}"
     
     # Data type validation
-    if not isinstance(data.get('rating'), (int, float)) or not (0 <= data.get('rating') <= 5):
-        return jsonify({"error": "Rating must be a number between 0 and 5"}), 400
-    
-    # Create new attraction
-    new_attraction = {
+    if not valid_rating(data.get('rating')):
+        return RATING_ERROR
+    return coordinates_error(data)
+
+def new_attraction(data, created_at=None):
+    """Build a new attraction record from validated request data"""
+    return {
         'id': str(uuid.uuid4()),
         'name': data['name'],
         'location': data['location'],
@@ -106,72 +618,344 @@ def create_attraction():
         'rating': data['rating'],
         'image_url': data.get('image_url', ''),
         'website': data.get('website', ''),
-        'created_at': datetime.now().isoformat()
+        **{field: data[field] for field in ('lat', 'lon') if data.get(field) is not None},
+        'created_at': created_at or datetime.now().isoformat()
     }
+
+@attractions.route('/api/attractions', methods=['POST'])
+def create_attraction():
+    """Create a new attraction"""
+    data = request.get_json()
+    
+    error = validation_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    # Create new attraction
+    attraction = new_attraction(data)
+    with phase('write_data'):
+        attraction_store().add(attraction)
+    g.records_written = 1
+    
+    return jsonify(attraction), 201
+
+def bulk_rows():
+    """Yield (row number, parsed record or None) from an NDJSON or JSON array body"""
+    if request.mimetype in NDJSON_MIMETYPES:
+        # Read line by line so the raw body is never held in memory
+        for number, line in enumerate(io.BufferedReader(request.stream, 1 << 16), 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, codec.loads(line)
+            except ValueError:
+                yield number, None
+        return
+    try:
+        rows = codec.loads(request.get_data())
+    except ValueError:
+        rows = None
+    if not isinstance(rows, list):
+        raise ValueError("Body must be a JSON array or NDJSON")
+    yield from enumerate(rows, 1)
+
+@attractions.route('/api/attractions/bulk', methods=['POST'])
+def bulk_create_attractions():
+    """Create many attractions from an NDJSON or JSON array body in one write.
+
+    Rows that fail validation are skipped and reported; every valid row is
+    committed together.
+    """
+    if request.mimetype not in NDJSON_MIMETYPES + ('application/json',):
+        return jsonify({"error": "Send application/x-ndjson or a JSON array"}), 415
+    
+    created_at = datetime.now().isoformat()
+    attractions, errors, error_count = [], [], 0
+    try:
+        for row, data in bulk_rows():
+            error = "Invalid JSON" if data is None else validation_error(data)
+            if error:
+                error_count += 1
+                if len(errors) < MAX_BULK_ERRORS:
+                    errors.append({"row": row, "error": error})
+                continue
+            attractions.append(new_attraction(data, created_at))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    attractions = read_data()
-    attractions.append(new_attraction)
-    write_data(attractions)
+    if attractions:
+        with phase('write_data'):
+            attraction_store().add_many(attractions)
+    g.records_written = len(attractions)
     
-    return jsonify(new_attraction), 201
+    result = {"created": len(attractions), "failed": error_count, "errors": errors}
+    return jsonify(result), 201 if attractions else 400
 
-@app.route('/api/attractions/<attraction_id>', methods=['PUT'])
+@attractions.route('/api/attractions/export', methods=['GET'])
+def export_attractions():
+    """Stream every attraction as NDJSON without building the whole body"""
+    store = attraction_store()
+    encoding = choose_encoding(request.accept_encodings)
+    response = current_app.response_class(stream_ndjson(store.iter_records(), current_app.json.dumps, encoding),
+                                  mimetype='application/x-ndjson')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+@attractions.route('/api/attractions/<attraction_id>', methods=['PUT'])
 def update_attraction(attraction_id):
     """Update an existing attraction"""
     data = request.get_json()
-    attractions = read_data()
+    store = attraction_store()
     
-    # Find attraction to update
-    attraction_index = next((i for i, a in enumerate(attractions) if a.get('id') == attraction_id), None)
+    # Read, check and write under one lock so concurrent updates are not lost
+    with store.write_lock():
+        # Find attraction to update
+        attraction = store.get(attraction_id)
+        
+        if attraction is None:
+            return jsonify({"error": "Attraction not found"}), 404
+        
+        if precondition_failed(attraction):
+            return jsonify({"error": "Attraction has been modified by another request"}), 412
+        
+        # Data type validation
+        if 'rating' in data and not valid_rating(data.get('rating')):
+            return jsonify({"error": RATING_ERROR}), 400
+        
+        # Update attraction
+        updated = updated_attraction(attraction, data)
+        error = coordinates_error(updated)
+        if error:
+            return jsonify({"error": error}), 400
+        with phase('write_data'):
+            store.replace(attraction_id, updated)
+    g.records_written = 1
     
-    if attraction_index is None:
-        return jsonify({"error": "Attraction not found"}), 404
+    response = jsonify(updated)
+    response.set_etag(attraction_etag(updated))
+    return response
+
+@attractions.route('/api/attractions/<attraction_id>', methods=['DELETE'])
+def delete_attraction(attraction_id):
+    """Delete an attraction"""
+    store = attraction_store()
     
-    # Data type validation
-    if 'rating' in data and (not isinstance(data.get('rating'), (int, float)) or not (0 <= data.get('rating') <= 5)):
-        return jsonify({"error": "Rating must be a number between 0 and 5"}), 400
+    with store.write_lock():
+        attraction = store.get(attraction_id)
+        
+        if attraction is None:
+            return jsonify({"error": "Attraction not found"}), 404
+        
+        if precondition_failed(attraction):
+            return jsonify({"error": "Attraction has been modified by another request"}), 412
+        
+        # Remove attraction with matching ID
+        with phase('write_data'):
+            store.remove(attraction_id)
+    g.records_written = 1
     
-    # Update attraction
-    updated_attraction = attractions[attraction_index].copy()
-    for key, value in data.items():
-        if key != 'id' and key != 'created_at':  # Prevent updating these fields
-            updated_attraction[key] = value
+    return jsonify({"message": "Attraction deleted successfully"}), 200
+
+@attractions.route('/api/attractions/batch-get', methods=['POST'])
+def batch_get_attractions():
+    """Get many attractions by id in one request"""
+    body = request.get_json(silent=True)
+    ids = body.get('ids') if isinstance(body, dict) else None
+    if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+        return jsonify({"error": "Body must be {\"ids\": [...]} with string ids"}), 400
+    if len(ids) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} ids per request"}), 400
+    
+    with phase('read_data'):
+        attractions = {a['id']: a for a in attraction_store().lookup(ids)}
+    return jsonify({
+        "attractions": attractions,
+        "etags": {i: attraction_etag(a) for i, a in attractions.items()},
+        "missing": [i for i in dict.fromkeys(ids) if i not in attractions]
+    })
+
+def check_batch_operation(store, operation, pending, updated_at):
+    """Check one batch operation against the data as earlier operations left it.
+
+    Returns the operation's result and the store change to make, or None
+    as the change if the operation fails.
+    """
+    if not isinstance(operation, dict) or operation.get('op') not in ('update', 'delete'):
+        return {"status": 400, "error": "op must be 'update' or 'delete'"}, None
+    attraction_id = operation.get('id')
+    if not isinstance(attraction_id, str):
+        return {"status": 400, "error": "Missing attraction id"}, None
+    result = {"id": attraction_id}
+    
+    attraction = pending[attraction_id] if attraction_id in pending else store.get(attraction_id)
+    if attraction is None:
+        return dict(result, status=404, error="Attraction not found"), None
+    if 'if_match' in operation and operation['if_match'] != attraction_etag(attraction):
+        return dict(result, status=412, error="Attraction has been modified by another request"), None
     
-    updated_attraction['updated_at'] = datetime.now().isoformat()
-    attractions[attraction_index] = updated_attraction
-    write_data(attractions)
+    if operation['op'] == 'delete':
+        return dict(result, status=200), ('delete', attraction_id)
     
-    return jsonify(updated_attraction)
+    fields = operation.get('fields')
+    if not isinstance(fields, dict):
+        return dict(result, status=400, error="fields must be an object"), None
+    if 'rating' in fields and not valid_rating(fields['rating']):
+        return dict(result, status=400, error=RATING_ERROR), None
+    updated = updated_attraction(attraction, fields, updated_at)
+    error = coordinates_error(updated)
+    if error:
+        return dict(result, status=400, error=error), None
+    return dict(result, status=200, attraction=updated, etag=attraction_etag(updated)), ('put', updated)
 
-@app.route('/api/attractions/<attraction_id>', methods=['DELETE'])
-def delete_attraction(attraction_id):
-    """Delete an attraction"""
-    attractions = read_data()
-    initial_count = len(attractions)
+@attractions.route('/api/attractions/batch', methods=['PATCH'])
+def batch_update_attractions():
+    """Apply many partial updates and deletes atomically in one write.
+
+    Every operation is checked before anything is written. If any fails,
+    nothing is applied and the operations that would have succeeded are
+    reported with status 424.
+    """
+    body = request.get_json(silent=True)
+    operations = body.get('operations') if isinstance(body, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "Body must be {\"operations\": [...]}"}), 400
+    if len(operations) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} operations per request"}), 400
     
-    # Remove attraction with matching ID
-    attractions = [a for a in attractions if a.get('id') != attraction_id]
+    store = attraction_store()
+    updated_at = datetime.now().isoformat()
     
-    if len(attractions) == initial_count:
-        return jsonify({"error": "Attraction not found"}), 404
+    # Check and write under one lock so the batch sees a consistent dataset
+    with store.write_lock():
+        results, changes, pending = [], [], {}
+        for operation in operations:
+            result, change = check_batch_operation(store, operation, pending, updated_at)
+            results.append(result)
+            if change is not None:
+                changes.append(change)
+                op, value = change
+                pending[result['id']] = value if op == 'put' else None
+        applied = len(changes) == len(operations)
+        if applied:
+            with phase('write_data'):
+                store.apply_changes(changes)
+            g.records_written = len(changes)
     
-    write_data(attractions)
-    return jsonify({"message": "Attraction deleted successfully"}), 200
+    if not applied:
+        for result in results:
+            if result['status'] == 200:
+                result.pop('attraction', None)
+                result.pop('etag', None)
+                result.update(status=424, error="Not applied because another operation failed")
+        return jsonify({"applied": False, "results": results}), 409
+    return jsonify({"applied": True, "results": results}), 200
+
+@attractions.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, phase and payload metrics in Prometheus text format"""
+    if not metrics.enabled:
+        abort(404)
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@attractions.before_app_request
+def start_request_timer():
+    if metrics.enabled:
+        g.request_start = time.perf_counter()
+
+@attractions.after_app_request
+def record_request(response):
+    """Observe latency and payload sizes, and log a sample of writes"""
+    start = g.pop('request_start', None)
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        request_seconds.observe(elapsed, request.method, route, str(response.status_code))
+        if request.content_length:
+            request_bytes.observe(request.content_length, request.method, route)
+        # Streamed bodies have no length until they have been sent
+        if response.content_length is not None:
+            response_bytes.observe(response.content_length, request.method, route)
+    written = g.pop('records_written', None)
+    if written:
+        if metrics.enabled:
+            records_written.inc(route, amount=written)
+        if write_log.sampled():
+            write_log.emit(event="write", method=request.method, route=route,
+                           status=response.status_code, records=written,
+                           duration_ms=None if start is None else round(elapsed * 1000, 3),
+                           dataset_size=attraction_store().count(),
+                           storage_mode=current_app.config['STORAGE_MODE'])
+    return response
+
+# Registered after the metrics hooks so the profile covers only the request itself
+@attractions.before_app_request
+def start_profile():
+    profiler = request_profiler()
+    if profiler:
+        profile = profiler.start(request)
+        if profile:
+            g.profile = (profiler, profile, time.perf_counter())
+
+@attractions.after_app_request
+def finish_profile(response):
+    """Save the profile of a sampled request that took longer than the threshold"""
+    if 'profile' not in g:
+        return response
+    profiler, profile, start = g.pop('profile')
+    elapsed = time.perf_counter() - start
+    profiler.stop(profile)
+    if profiler.is_slow(elapsed):
+        try:
+            profiler.save(profile, elapsed, method=request.method,
+                          route=request.url_rule.rule if request.url_rule else 'unmatched',
+                          path=request.path, args=request.args.to_dict(flat=False),
+                          status=response.status_code,
+                          dataset_version=attraction_store().current_version(),
+                          storage_mode=current_app.config['STORAGE_MODE'])
+        except Exception as e:
+            logging.error(f"Error saving request profile: {str(e)}")
+    return response
+
+@attractions.teardown_app_request
+def discard_profile(exc):
+    """Stop a profile left running by a request that raised"""
+    if 'profile' in g:
+        profiler, profile, _ = g.pop('profile')
+        profiler.stop(profile)
+
+@attractions.route('/debug/profiles', methods=['GET'])
+def get_profiles():
+    """List saved slow-request profiles, newest first, with their hottest functions"""
+    if not current_app.config['PROFILE_ENDPOINT_ENABLED']:
+        abort(404)
+    return jsonify(list_profiles(current_app.config['PROFILE_DIR']))
+
+@attractions.route('/debug/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    """Download a saved profile as a .prof file for pstats or snakeviz"""
+    path = profile_path(current_app.config['PROFILE_DIR'], name) if current_app.config['PROFILE_ENDPOINT_ENABLED'] else None
+    if path is None:
+        abort(404)
+    return send_file(os.path.abspath(path), mimetype='application/octet-stream',
+                     as_attachment=True, download_name=name + '.prof')
 
 # Front-end routes
-@app.route('/')
+@attractions.route('/')
 def index():
     """Render the main page"""
     return render_template('index.html')
 
 # Error handling
-@app.errorhandler(404)
+@attractions.app_errorhandler(404)
 def not_found(e):
     return jsonify({"error": "Resource not found"}), 404
 
-@app.errorhandler(500)
+@attractions.app_errorhandler(500)
 def server_error(e):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app = create_app()
+    app.run(host="0.0.0.0", port=5000, debug=app.config['APP_PROFILE'] == 'development')
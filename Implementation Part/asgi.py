@@ -0,0 +1,9 @@
+"""ASGI entry point: ``uvicorn asgi:application`` serves the Flask app with
+client I/O on the event loop and request handling in a thread pool."""
+import os
+
+from app import create_app
+from serving.asgi import WsgiToAsgi
+
+# Requests handled at once per process; connections beyond this wait on the loop, not a thread
+application = WsgiToAsgi(create_app(), max_workers=int(os.environ.get("ASGI_THREADS", 32)))
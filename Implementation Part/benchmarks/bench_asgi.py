@@ -0,0 +1,108 @@
+"""Slow clients served by sync workers vs the ASGI adapter's event loop.
+
+    python benchmarks/bench_asgi.py --clients 10 100 1000 --client-ms 100 --workers 8
+
+Every client connects at once, spends --client-ms sending its request and
+--client-ms reading the response (a slow mobile link). The sync model is
+--workers threads that each own one connection from accept to last byte,
+as a gunicorn sync worker does; the ASGI model does client I/O on one
+event loop and runs the app in a pool of the same size. Latency includes
+time spent waiting for a free worker.
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.loadtest import percentile
+from benchmarks.synthetic import write_catalogue
+from serving.asgi import WsgiToAsgi
+
+
+def scope_for(index):
+    """Alternate a list page and a single attraction"""
+    if index % 2:
+        return {'type': 'http', 'method': 'GET', 'path': f'/api/attractions/{index}',
+                'query_string': b'', 'headers': []}
+    return {'type': 'http', 'method': 'GET', 'path': '/api/attractions',
+            'query_string': b'limit=20&sort_by=rating', 'headers': []}
+
+
+def run_sync(app, clients, client_s, workers):
+    """Each worker thread serves one slow client at a time; returns latencies"""
+    def serve(index, connected):
+        time.sleep(client_s)  # reading the request
+        environ = WsgiToAsgi.environ(scope_for(index), io.BytesIO(), 0)
+        b''.join(app(environ, lambda status, headers, exc_info=None: None))
+        time.sleep(client_s)  # writing the response
+        return time.perf_counter() - connected
+
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [pool.submit(serve, i, time.perf_counter()) for i in range(clients)]
+        return [f.result() for f in futures]
+
+
+def run_asgi(application, clients, client_s):
+    """Every client is a coroutine; only the app itself takes a pool thread"""
+    async def client(index):
+        connected = time.perf_counter()
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                return {'type': 'http.disconnect'}
+            await asyncio.sleep(client_s)
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                await asyncio.sleep(client_s)
+
+        await application(scope_for(index), receive, send)
+        return time.perf_counter() - connected
+
+    async def all_clients():
+        return await asyncio.gather(*(client(i) for i in range(clients)))
+
+    return asyncio.run(all_clients())
+
+
+def report(model, clients, latencies, elapsed):
+    latencies = sorted(latencies)
+    print(f"{model:>5} {clients:>6} clients  {elapsed:7.2f} s  {clients / elapsed:8.1f} req/s  "
+          f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  p99 {percentile(latencies, 0.99) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--client-ms', type=float, default=100, help="time each client takes to send and to read")
+    parser.add_argument('--workers', type=int, default=8, help="sync workers, and ASGI pool threads")
+    parser.add_argument('--size', type=int, default=10000, help="attractions in the synthetic catalogue")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATA_FILE'] = write_catalogue(os.path.join(tmp, 'attractions.json'), args.size)
+        from app import app
+        application = WsgiToAsgi(app, max_workers=args.workers)
+        client_s = args.client_ms / 1000
+        run_sync(app, args.workers, 0, args.workers)  # warm the store and indexes
+        for clients in args.clients:
+            for model, run in (('sync', lambda: run_sync(app, clients, client_s, args.workers)),
+                               ('asgi', lambda: run_asgi(application, clients, client_s))):
+                start = time.perf_counter()
+                latencies = run()
+                report(model, clients, latencies, time.perf_counter() - start)
+        application.shutdown()
+
+
+if __name__ == '__main__':
+    main()
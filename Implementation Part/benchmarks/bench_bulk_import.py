@@ -0,0 +1,62 @@
+"""Loading attractions through POST /bulk vs one POST per record, per storage mode.
+
+    python benchmarks/bench_bulk_import.py --size 1000000 --single 200
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from benchmarks.synthetic import make_attractions
+
+FIELDS = ('name', 'location', 'description', 'rating', 'image_url', 'website')
+
+
+def ndjson(records):
+    """Encode records as the request body of a bulk import"""
+    return ''.join(json.dumps({f: r[f] for f in FIELDS}) + '\n' for r in records).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--single', type=int, default=200, help="records loaded one POST at a time")
+    parser.add_argument('--modes', nargs='+', default=['json', 'wal', 'sqlite'])
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    records = make_attractions(args.size)
+    body = ndjson(records)
+    print(f"{args.size} attractions, {len(body) / 1e6:.0f} MB of NDJSON")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes:
+            data_file = os.path.join(tmp, f"{mode}.json")
+            with open(data_file, 'w') as f:
+                f.write('[]')
+            app.config.update(DATA_FILE=data_file, STORAGE_MODE=mode)
+            with app.test_client() as client:
+                start = time.perf_counter()
+                for record in records[:args.single]:
+                    client.post('/api/attractions', data=json.dumps({f: record[f] for f in FIELDS}),
+                                content_type='application/json')
+                single = (time.perf_counter() - start) / args.single
+                start = time.perf_counter()
+                response = client.post('/api/attractions/bulk', data=body,
+                                       content_type='application/x-ndjson')
+                bulk = time.perf_counter() - start
+                assert response.get_json()['created'] == args.size
+                start = time.perf_counter()
+                b''.join(client.get('/api/attractions/export').response)
+                export = time.perf_counter() - start
+            print(f"{mode:>6}  one POST {single * 1000:7.2f} ms/record  "
+                  f"bulk {bulk:6.2f} s ({args.size / bulk:,.0f} records/s)  export {export:6.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""GET /api/attractions latency of filtered pages with QUERY_ENGINE=index vs numpy.
+
+    python benchmarks/bench_columnar.py --size 1000000
+
+Each query filters on rating, created_at or location, sorts on another
+field and asks for the first page and the page after it. The response
+cache is off, so every request runs the query. Both apps share one loaded
+store, so the numpy setup time is that of building the columns alone.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from benchmarks.synthetic import write_catalogue
+
+QUERIES = ["min_rating=4.5&sort_by=rating&order=desc&limit=20",
+           "min_rating=1&max_rating=4&sort_by=created_at&limit=20",
+           "created_after=2023-06-01&sort_by=rating&limit=50",
+           "location=County%20Kerry&location=County%20Clare&sort_by=created_at&order=desc&limit=20",
+           "min_rating=3&location=County%20Cork&limit=20",
+           "created_before=2021-01-01&facets=location&sort_by=location&limit=20"]
+
+
+def time_query(client, query, repeat):
+    """Return the median latency in milliseconds of a first page and the page after it"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = json.loads(client.get(f'/api/attractions?{query}').data)
+        client.get(f"/api/attractions?{query}&cursor={body['next_cursor']}")
+        samples.append((time.perf_counter() - start) * 1000 / 2)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_catalogue(os.path.join(tmp, "attractions.json"), args.size)
+        results = {}
+        for engine in ('index', 'numpy'):
+            start = time.perf_counter()
+            app = create_app({'DATA_FILE': path, 'QUERY_ENGINE': engine, 'RESPONSE_CACHE_BYTES': 0,
+                              'METRICS_ENABLED': False})
+            client = app.test_client()
+            client.get('/api/attractions?limit=1')
+            print(f"{engine}: ready for {args.size} attractions in {time.perf_counter() - start:.1f} s")
+            results[engine] = [time_query(client, query, args.repeat) for query in QUERIES]
+            del app, client
+        for query, before, after in zip(QUERIES, results['index'], results['numpy']):
+            print(f"{query:>88}  index {before:8.1f} ms  numpy {after:7.1f} ms  {before / after:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
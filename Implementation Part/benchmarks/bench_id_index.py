@@ -0,0 +1,54 @@
+"""Point lookup cost by id: linear scan vs the store's id index.
+
+    python benchmarks/bench_id_index.py --sizes 1000 100000 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage.json_store import AttractionStore
+
+
+def per_op_us(func, ids):
+    """Return the mean cost of func(id) in microseconds"""
+    start = time.perf_counter()
+    for attraction_id in ids:
+        func(attraction_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--lookups', type=int, default=1000)
+    parser.add_argument('--scan-lookups', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            # Small records keep the 1M file manageable; only ids matter here
+            records = [{'id': str(uuid.UUID(int=rng.getrandbits(128))), 'name': f"Attraction {i}"}
+                       for i in range(size)]
+            path = os.path.join(tmp, f"ids_{size}.json")
+            with open(path, 'w') as f:
+                json.dump(records, f)
+            store = AttractionStore(path)
+            attractions = store.records()
+            ids = [rng.choice(records)['id'] for _ in range(args.lookups)]
+
+            scan = per_op_us(lambda i: next((a for a in attractions if a.get('id') == i), None),
+                             ids[:args.scan_lookups])
+            indexed = per_op_us(store.get, ids)
+            print(f"{size:>8} records  scan {scan:12.1f} us  index {indexed:6.2f} us")
+
+
+if __name__ == '__main__':
+    main()
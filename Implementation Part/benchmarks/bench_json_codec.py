@@ -0,0 +1,53 @@
+"""Parse and serialise time of each installed JSON codec.
+
+    python benchmarks/bench_json_codec.py --size 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import make_attractions
+from storage.codec import CODECS
+
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), '..', 'data', 'attractions.json')
+
+
+def best_ms(func, repeat):
+    """Return the fastest of repeat calls in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def report(label, records, repeat):
+    """Time a pretty write, a compact write and a parse of records per codec"""
+    print(f"{label}: {len(records)} attractions")
+    for name, codec in CODECS.items():
+        data = codec.dumps(records, pretty=True)
+        write = best_ms(lambda: codec.dumps(records, pretty=True), repeat)
+        compact = best_ms(lambda: codec.dumps(records), repeat)
+        read = best_ms(lambda: codec.loads(data), repeat)
+        print(f"  {name:>7}  {len(data) / 1e6:7.2f} MB  parse {read:9.2f} ms  "
+              f"pretty {write:9.2f} ms  compact {compact:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(SAMPLE_FILE, 'rb') as f:
+        sample = CODECS['stdlib'].loads(f.read())
+    report("data/attractions.json", sample, args.repeat * 20)
+    report("synthetic", make_attractions(args.size), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
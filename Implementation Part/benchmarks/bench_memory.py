@@ -0,0 +1,78 @@
+"""Resident memory of a loaded catalogue with plain dict records vs compact records.
+
+    python benchmarks/bench_memory.py --size 1000000
+    python benchmarks/bench_memory.py --size 100000 --indexes
+
+Each variant loads the catalogue in a fresh interpreter and reports the
+RSS growth over the bare interpreter with the app imported. --indexes
+also builds the search and sort indexes the app registers.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def rss_mib():
+    """Current resident set size in MiB (Linux)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def measure(path, compact, indexes):
+    """Load path in this process and return the numbers for one variant"""
+    import gc
+    from app import SEARCH_FIELDS, SORT_FIELDS
+    from indexes.sorted_index import SortedIndex
+    from indexes.text_index import TextIndex
+    from storage.json_store import AttractionStore
+
+    gc.collect()
+    before = rss_mib()
+    start = time.perf_counter()
+    store = AttractionStore(path, compact_records=compact)
+    store.refresh()
+    if indexes:
+        store.ensure_index('text', lambda: TextIndex(SEARCH_FIELDS))
+        for field in SORT_FIELDS:
+            store.ensure_index(f'sort:{field}', lambda field=field: SortedIndex(field))
+    load_s = time.perf_counter() - start
+    gc.collect()
+    return {'records': store.count(), 'rss_mib': round(rss_mib() - before, 1), 'load_s': round(load_s, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000000)
+    parser.add_argument('--indexes', action='store_true', help="also build the search and sort indexes")
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--compact', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.compact, args.indexes)))
+        return
+
+    from benchmarks.synthetic import write_catalogue
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_catalogue(os.path.join(tmp, 'attractions.json'), args.size)
+        print(f"{args.size} attractions, {os.path.getsize(path) / 2 ** 20:.0f} MiB on disk"
+              f"{', with indexes' if args.indexes else ''}")
+        for compact in (False, True):
+            command = [sys.executable, __file__, '--measure', path] + ['--compact'] * compact \
+                + ['--indexes'] * args.indexes
+            result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+            print(f"{'compact' if compact else 'dicts':>8}  RSS +{result['rss_mib']:8.1f} MiB  "
+                  f"load {result['load_s']:6.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Nearest-neighbour latency of the grid index and the SQLite R*Tree vs a full scan.
+
+    python benchmarks/bench_nearby.py --size 1000000
+    python benchmarks/bench_nearby.py --size 100000 --sqlite
+
+Points are scattered around the county centroids, as backfilled or
+geocoded attractions would be, and queried from random places in Ireland
+for the nearest 20 and for everything within 5 km.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from geo.counties import COUNTY_CENTROIDS
+from indexes.geo_index import GeoIndex, haversine_km
+
+
+def make_points(count, seed=42):
+    """Records with positions spread about 15 km around a random county centroid"""
+    rng = random.Random(seed)
+    centroids = list(COUNTY_CENTROIDS.values())
+    points = []
+    for i in range(count):
+        lat, lon = rng.choice(centroids)
+        points.append({'id': f'{i:08d}', 'name': f'Point {i}',
+                       'lat': round(rng.gauss(lat, 0.14), 6), 'lon': round(rng.gauss(lon, 0.22), 6)})
+    return points
+
+
+def percentiles(func, queries):
+    """Return (p50, p99) latency of func over the queries in milliseconds"""
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        func(*query)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--sqlite', action='store_true', help="also query an SQLite store's R*Tree")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    queries = [(rng.uniform(51.5, 55.3), rng.uniform(-10.3, -5.6)) for _ in range(args.queries)]
+    points = make_points(args.size)
+
+    start = time.perf_counter()
+    index = GeoIndex()
+    index.reset(points)
+    print(f"{args.size} points: grid index built in {time.perf_counter() - start:.2f} s")
+
+    def scan(lat, lon):
+        return sorted((haversine_km(lat, lon, p['lat'], p['lon']), p['id']) for p in points)[:20]
+
+    rows = [("grid, nearest 20", lambda lat, lon: index.nearest(lat, lon, 20), queries),
+            ("grid, within 5 km", lambda lat, lon: index.nearest(lat, lon, radius_km=5), queries),
+            ("full scan, nearest 20", scan, queries[:5])]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.sqlite:
+            from storage.sqlite_store import SqliteAttractionStore
+            store = SqliteAttractionStore(os.path.join(tmp, 'attractions.json'))
+            start = time.perf_counter()
+            store.save(points)
+            print(f"SQLite store with R*Tree loaded in {time.perf_counter() - start:.2f} s")
+            rows += [("sqlite, nearest 20", lambda lat, lon: store.nearby(lat, lon, 20), queries),
+                     ("sqlite, within 5 km", lambda lat, lon: store.nearby(lat, lon, radius_km=5), queries)]
+        for label, func, sample in rows:
+            p50, p99 = percentiles(func, sample)
+            print(f"{label:>22}  p50 {p50:9.3f} ms  p99 {p99:9.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
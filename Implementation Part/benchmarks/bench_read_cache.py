@@ -0,0 +1,75 @@
+"""GET /api/attractions latency with and without the resident store.
+
+"before" is the old handler: it parses the data file on every request,
+then sorts and encodes every attraction. "after" is the current endpoint
+serving the same list from the resident records and indexes. Both are
+timed for the whole list and for a first page of ``--limit``. The response
+cache is off, so it measures re-parsing against resident data rather than
+a cache hit.
+
+    python benchmarks/bench_read_cache.py --sizes 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Response, request
+
+from app import app, response_cache
+from benchmarks.synthetic import write_catalogue
+from storage.codec import dumps, loads
+
+
+@app.route('/bench/reparse')
+def reparse_attractions():
+    """The pre-store get_attractions: parse the file and sort by name, then encode it or a page"""
+    with open(app.config['DATA_FILE'], 'rb') as f:
+        attractions = loads(f.read())
+    attractions.sort(key=lambda a: a.get('name', ''))
+    limit = request.args.get('limit', type=int)
+    return Response(dumps(attractions[:limit] if limit else attractions), mimetype='application/json')
+
+
+def time_requests(client, url, repeat):
+    """Return the median latency in milliseconds of repeat GET requests, body included"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=24, help="page size")
+    args = parser.parse_args()
+
+    response_cache.max_bytes = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = write_catalogue(os.path.join(tmp, f"attractions_{size}.json"), size)
+            app.config['DATA_FILE'] = path
+            page = f"?limit={args.limit}"
+            with app.test_client() as client:
+                before = time_requests(client, '/bench/reparse', args.repeat)
+                before_page = time_requests(client, '/bench/reparse' + page, args.repeat)
+                # Load the store and build its indexes outside the timing
+                client.get('/api/attractions').get_data()
+                after = time_requests(client, '/api/attractions', args.repeat)
+                after_page = time_requests(client, '/api/attractions' + page, args.repeat)
+            print(f"{size:>8} attractions  all: before {before:9.1f} ms  after {after:9.1f} ms"
+                  f"  page: before {before_page:9.1f} ms  after {after_page:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Query latency of the inverted index vs the old per-request substring scan.
+
+    python benchmarks/bench_search.py --size 100000
+
+Each query is timed ranking every match and ranking just the first page,
+as the API does with ``limit``; "medieval" and "medieval trail" match
+almost every record, the worst case for ranking. Then times fuzzy
+searches for misspelt terms, which the scan never found.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import SEARCH_FIELDS
+from benchmarks.synthetic import make_attractions
+from indexes.text_index import TextIndex
+
+QUERIES = ["castle", "kerry", "cas", "medieval", "medieval trail", "stle", "distillery 17"]
+
+FUZZY_QUERIES = ["casle", "killkenny", "tiperary", "medeival trial", "distilery 17", "monastry"]
+
+
+def scan(attractions, search_term):
+    """The substring filter get_attractions used before the index"""
+    search_term = search_term.lower()
+    return [a for a in attractions if
+            search_term in a.get('name', '').lower() or
+            search_term in a.get('location', '').lower() or
+            search_term in a.get('description', '').lower()]
+
+
+def best_ms(func, repeat):
+    """Return the fastest of repeat calls in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--limit', type=int, default=24, help="page size")
+    args = parser.parse_args()
+
+    attractions = make_attractions(args.size)
+    index = TextIndex(SEARCH_FIELDS)
+    start = time.perf_counter()
+    index.reset(attractions)
+    print(f"built index over {args.size} attractions in {time.perf_counter() - start:.2f} s")
+
+    for query in QUERIES:
+        old = best_ms(lambda: scan(attractions, query), args.repeat)
+        new = best_ms(lambda: index.ranked(query), args.repeat)
+        page = best_ms(lambda: index.ranked(query, limit=args.limit), args.repeat)
+        hits = len(index.search(query))
+        print(f"{query!r:>18}  {hits:>7} hits  scan {old:8.1f} ms  index {new:8.1f} ms  page {page:6.1f} ms")
+
+    for query in FUZZY_QUERIES:
+        exact = len(index.search(query))
+        fuzzy = best_ms(lambda: index.ranked(query, fuzzy=True), args.repeat)
+        page = best_ms(lambda: index.ranked(query, fuzzy=True, limit=args.limit), args.repeat)
+        hits = len(index.search(query, fuzzy=True))
+        print(f"{query!r:>18}  {hits:>7} hits  ({exact} without fuzzy)  fuzzy {fuzzy:8.1f} ms  page {page:6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
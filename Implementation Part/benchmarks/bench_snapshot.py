@@ -0,0 +1,85 @@
+"""Worker startup time and memory with the JSON, WAL and memory-mapped snapshot stores.
+
+    python benchmarks/bench_snapshot.py --sizes 10000 100000 1000000
+
+Each store is opened in a fresh interpreter, as a newly started worker
+would, and times the first sorted page and the first single-record read.
+The snapshot is built once beforehand (as the first worker to start in
+'mmap' mode does); after that startup does not depend on catalogue size.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def rss_mib():
+    """Current resident set size in MiB (Linux)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def measure(path, mode):
+    """Open the store in this process and time the first requests"""
+    import gc
+    from app import SEARCH_FIELDS, SORT_FIELDS
+    from indexes.sorted_index import SortedIndex
+    from storage.registry import get_store
+
+    gc.collect()
+    before = rss_mib()
+    start = time.perf_counter()
+    if mode == 'mmap':
+        store = get_store(path, 'mmap', sort_fields=SORT_FIELDS, search_fields=SEARCH_FIELDS)
+        page = store.query(sort_by='rating', limit=20)[0]
+    else:
+        # What the app builds before it can answer a sorted page in these modes
+        store = get_store(path, mode)
+        index = store.ensure_index('sort:rating', lambda: SortedIndex('rating'))
+        page = store.lookup(index.page(None, 20))
+    first_page_s = time.perf_counter() - start
+    start = time.perf_counter()
+    store.get(page[-1]['id'])
+    get_ms = (time.perf_counter() - start) * 1000
+    return {'first_page_s': round(first_page_s, 4), 'get_ms': round(get_ms, 3),
+            'rss_mib': round(rss_mib() - before, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.mode)))
+        return
+
+    from app import SEARCH_FIELDS, SORT_FIELDS
+    from benchmarks.synthetic import write_catalogue
+    from storage.mmap_store import MmapAttractionStore
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = write_catalogue(os.path.join(tmp, 'attractions.json'), size)
+            start = time.perf_counter()
+            MmapAttractionStore(path, sort_fields=SORT_FIELDS, search_fields=SEARCH_FIELDS).count()
+            print(f"{size} attractions: snapshot built once in {time.perf_counter() - start:.2f} s, "
+                  f"{os.path.getsize(path + '.snap') / 2 ** 20:.0f} MiB")
+            for mode in ('json', 'wal', 'mmap'):
+                command = [sys.executable, __file__, '--measure', path, '--mode', mode]
+                result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+                print(f"{mode:>6}  first page {result['first_page_s'] * 1000:9.1f} ms  "
+                      f"get {result['get_ms']:7.3f} ms  RSS +{result['rss_mib']:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""List, search and write latency of the in-memory JSON store vs SQLite.
+
+    python benchmarks/bench_sqlite.py --size 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import SEARCH_FIELDS, SORT_FIELDS, list_attractions
+from benchmarks.synthetic import make_attractions, write_catalogue
+from indexes.sorted_index import SortedIndex
+from indexes.text_index import TextIndex
+from storage.json_store import AttractionStore
+from storage.sqlite_store import SqliteAttractionStore
+
+# (label, search_term, sort_by, limit)
+QUERIES = [
+    ("first page by name", '', 'name', 50),
+    ("first page by rating", '', 'rating', 50),
+    ("search relevance page", 'castle', 'relevance', 50),
+    ("search by created_at", 'kerry trail', 'created_at', 50),
+    ("full list by name", '', 'name', None),
+]
+
+
+def best_ms(func, repeat):
+    """Return the fastest of repeat calls in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def json_store(path):
+    """A JSON store with the indexes app.py attaches"""
+    store = AttractionStore(path)
+    store.ensure_index('text', lambda: TextIndex(SEARCH_FIELDS))
+    for field in SORT_FIELDS:
+        store.ensure_index(f'sort:{field}', lambda field=field: SortedIndex(field))
+    return store
+
+
+def run(store, search_term, sort_by, limit, after=None):
+    return list_attractions(store, search_term, sort_by, False, limit, after, (), [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--writes', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_catalogue(os.path.join(tmp, "attractions.json"), args.size)
+        stores = {}
+        for name, factory in (('json', json_store),
+                              ('sqlite', lambda p: SqliteAttractionStore(
+                                  p, sort_fields=SORT_FIELDS, search_fields=SEARCH_FIELDS))):
+            start = time.perf_counter()
+            stores[name] = factory(path)
+            stores[name].refresh()
+            print(f"{name:>6}: loaded {args.size} attractions in {time.perf_counter() - start:.2f} s")
+
+        for label, search_term, sort_by, limit in QUERIES:
+            results = [f"{name} {best_ms(lambda: run(store, search_term, sort_by, limit), args.repeat):8.2f} ms"
+                       for name, store in stores.items()]
+            print(f"{label:>24}  " + '  '.join(results))
+
+        new_records = make_attractions(args.writes, seed=7)
+        results = []
+        for name, store in stores.items():
+            start = time.perf_counter()
+            for attraction in new_records:
+                store.add(attraction)
+            results.append(f"{name} {(time.perf_counter() - start) / args.writes * 1000:8.2f} ms")
+        print(f"{'add one attraction':>24}  " + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main()
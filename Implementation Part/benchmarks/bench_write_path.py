@@ -0,0 +1,44 @@
+"""Per-mutation cost of the whole-file JSON store vs the write-ahead log.
+
+    python benchmarks/bench_write_path.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import make_attractions, write_catalogue
+from storage.json_store import AttractionStore
+from storage.wal_store import WalAttractionStore
+
+
+def mean_write_ms(store, new_records):
+    """Return the mean latency of store.add() in milliseconds"""
+    store.records()
+    start = time.perf_counter()
+    for attraction in new_records:
+        store.add(attraction)
+    return (time.perf_counter() - start) / len(new_records) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--writes', type=int, default=20)
+    args = parser.parse_args()
+
+    new_records = make_attractions(args.writes, seed=7)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results = []
+            for name, cls in (('json', AttractionStore), ('wal', WalAttractionStore)):
+                path = write_catalogue(os.path.join(tmp, f"{name}_{size}.json"), size)
+                results.append(f"{name} {mean_write_ms(cls(path), new_records):9.2f} ms")
+            print(f"{size:>8} attractions  " + '  '.join(results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""Replay a mixed read/write workload against the API and report latency per endpoint.
+
+    python benchmarks/loadtest.py --size 10000 --requests 5000 --concurrency 8
+    python benchmarks/loadtest.py --driver gunicorn --workers 4 --output run.json
+    python benchmarks/loadtest.py --baseline run.json --tolerance 0.2
+
+The app runs against a synthetic catalogue in a temporary directory,
+either in this process through app.test_client() or in a local gunicorn.
+The report (p50/p95/p99 latency in ms and requests/s per endpoint) is
+printed as JSON. With --baseline the run is compared with an earlier
+report and the exit status is 1 if any endpoint regressed.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.synthetic import COUNTIES, WORDS, make_attractions, write_catalogue
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Relative frequency of each operation in a workload
+WORKLOADS = {
+    'read-heavy': {'list': 10, 'page': 25, 'search': 20, 'get': 30, 'batch_get': 5,
+                   'create': 4, 'update': 4, 'delete': 2},
+    'mixed': {'list': 5, 'page': 20, 'search': 15, 'get': 20, 'batch_get': 5,
+              'create': 15, 'update': 15, 'delete': 5},
+    'write-heavy': {'page': 10, 'search': 5, 'get': 10, 'create': 35, 'update': 30, 'delete': 10},
+}
+
+SORT_FIELDS = ['name', 'location', 'rating', 'created_at']
+
+
+class Catalogue:
+    """Ids the workload can address, shared by all client threads"""
+
+    def __init__(self, ids):
+        self.ids = list(ids)
+        self.created = []
+        self._lock = threading.Lock()
+
+    def any_id(self, rng):
+        with self._lock:
+            return rng.choice(self.ids) if self.ids else 'missing'
+
+    def add(self, attraction_id):
+        with self._lock:
+            self.ids.append(attraction_id)
+            self.created.append(attraction_id)
+
+    def take_created(self, rng):
+        """Remove and return an id created during the run, so deletes never shrink the catalogue"""
+        with self._lock:
+            if not self.created:
+                return None
+            attraction_id = self.created.pop(rng.randrange(len(self.created)))
+            self.ids.remove(attraction_id)
+            return attraction_id
+
+
+def new_attraction_body(rng):
+    return {
+        'name': f"Load Test {rng.randrange(10 ** 9)}",
+        'location': rng.choice(COUNTIES),
+        'description': ' '.join(rng.choice(WORDS) for _ in range(30)),
+        'rating': round(rng.uniform(0, 5), 1),
+    }
+
+
+def build_request(op, rng, catalogue):
+    """Return (method, path, body) for one operation, or None if it cannot run now"""
+    if op == 'list':
+        return 'GET', f"/api/attractions?sort_by={rng.choice(SORT_FIELDS)}", None
+    if op == 'page':
+        return 'GET', f"/api/attractions?limit=24&fields=id,name,location,rating,image_url&sort_by={rng.choice(SORT_FIELDS)}", None
+    if op == 'search':
+        terms = ' '.join(rng.sample(WORDS + [c.split()[1].lower() for c in COUNTIES], 2))
+        return 'GET', f"/api/attractions?search={terms.replace(' ', '+')}&limit=24", None
+    if op == 'get':
+        return 'GET', f"/api/attractions/{catalogue.any_id(rng)}", None
+    if op == 'batch_get':
+        return 'POST', "/api/attractions/batch-get", {'ids': [catalogue.any_id(rng) for _ in range(50)]}
+    if op == 'create':
+        return 'POST', "/api/attractions", new_attraction_body(rng)
+    if op == 'update':
+        return 'PUT', f"/api/attractions/{catalogue.any_id(rng)}", {'rating': round(rng.uniform(0, 5), 1)}
+    if op == 'delete':
+        attraction_id = catalogue.take_created(rng)
+        return None if attraction_id is None else ('DELETE', f"/api/attractions/{attraction_id}", None)
+    raise ValueError(f"Unknown operation: {op}")
+
+
+class TestClientDriver:
+    """Sends requests to the app in this process through Flask's test client"""
+
+    def __init__(self, data_file, storage_mode):
+        from app import app
+        app.config.update(DATA_FILE=data_file, STORAGE_MODE=storage_mode)
+        self.app = app
+        self._local = threading.local()
+
+    def send(self, method, path, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class HttpDriver:
+    """Sends requests over HTTP to a running server, one connection per client thread"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self._local = threading.local()
+
+    def send(self, method, path, body):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = {}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, ConnectionError):
+            # The server closed the connection (gunicorn sync workers do); retry once
+            conn.close()
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+
+    def close(self):
+        pass
+
+
+class GunicornDriver(HttpDriver):
+    """Starts a local gunicorn serving main:app and sends requests to it over HTTP"""
+
+    def __init__(self, data_file, storage_mode, workers, threads):
+        if shutil.which('gunicorn') is None:
+            raise SystemExit("gunicorn is not installed (pip install -r project-requirements.txt)")
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        env = dict(os.environ, DATA_FILE=data_file, STORAGE_MODE=storage_mode)
+        self.process = subprocess.Popen(
+            ['gunicorn', '--bind', f"127.0.0.1:{port}", '--workers', str(workers),
+             '--threads', str(threads), '--log-level', 'warning', 'main:app'],
+            cwd=APP_DIR, env=env)
+        super().__init__('127.0.0.1', port)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                with socket.create_connection(('127.0.0.1', port), timeout=1):
+                    break
+            except OSError:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.close()
+                    raise SystemExit("gunicorn did not start")
+                time.sleep(0.1)
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(10)
+
+
+def percentile(sorted_values, fraction):
+    """Linearly interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def summarise(latencies, errors, elapsed):
+    """Latency percentiles (ms) and throughput for one endpoint"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else None,
+    }
+
+
+def run_workload(driver, catalogue, mix, requests, concurrency, seed=0):
+    """Issue requests from concurrency threads and return the report's endpoint section"""
+    ops, weights = zip(*mix.items())
+    latencies = {op: [] for op in ops}
+    errors = {op: 0 for op in ops}
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def client(worker):
+        rng = random.Random(seed * 1000 + worker)
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            op = rng.choices(ops, weights)[0]
+            request = build_request(op, rng, catalogue)
+            if request is None:
+                op, request = 'create', build_request('create', rng, catalogue)
+            method, path, body = request
+            start = time.perf_counter()
+            status, data = driver.send(method, path, body)
+            latency = time.perf_counter() - start
+            if op == 'create' and status == 201:
+                catalogue.add(json.loads(data)['id'])
+            with lock:
+                latencies[op].append(latency)
+                if status >= 500 or (status >= 400 and op not in ('get', 'update')):
+                    errors[op] += 1
+
+    threads = [threading.Thread(target=client, args=(w,)) for w in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    endpoints = {op: summarise(latencies[op], errors[op], elapsed) for op in ops if latencies[op]}
+    everything = [latency for values in latencies.values() for latency in values]
+    return summarise(everything, sum(errors.values()), elapsed), endpoints
+
+
+def compare(report, baseline, tolerance):
+    """List endpoints whose p95 latency grew or throughput fell by more than tolerance"""
+    regressions = []
+    for name, current in report['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        if before['p95_ms'] and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append({'endpoint': name, 'metric': 'p95_ms',
+                                'baseline': before['p95_ms'], 'current': current['p95_ms']})
+        if before['throughput_rps'] and current['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+            regressions.append({'endpoint': name, 'metric': 'throughput_rps',
+                                'baseline': before['throughput_rps'], 'current': current['throughput_rps']})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000, help="attractions in the synthetic catalogue")
+    parser.add_argument('--workload', choices=sorted(WORKLOADS), default='read-heavy')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=50, help="requests sent before measuring")
+    parser.add_argument('--driver', choices=['test_client', 'gunicorn'], default='test_client')
+    parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument('--storage-mode', default='json', choices=['json', 'wal', 'sqlite'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="also write the report to this file")
+    parser.add_argument('--baseline', help="report from an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative p95/throughput change before flagging a regression")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='loadtest-')
+    try:
+        data_file = write_catalogue(os.path.join(tmp, 'attractions.json'), args.size, args.seed)
+        catalogue = Catalogue(a['id'] for a in make_attractions(args.size, args.seed))
+        if args.driver == 'gunicorn':
+            driver = GunicornDriver(data_file, args.storage_mode, args.workers, args.threads)
+        else:
+            driver = TestClientDriver(data_file, args.storage_mode)
+        try:
+            mix = WORKLOADS[args.workload]
+            if args.warmup:
+                run_workload(driver, catalogue, mix, args.warmup, args.concurrency, args.seed + 1)
+            total, endpoints = run_workload(driver, catalogue, mix, args.requests, args.concurrency, args.seed)
+        finally:
+            driver.close()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        'config': {k: getattr(args, k) for k in ('size', 'workload', 'requests', 'concurrency',
+                                                 'driver', 'workers', 'threads', 'storage_mode', 'seed')},
+        'total': total,
+        'endpoints': endpoints,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = compare(report, json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Synthetic attraction catalogues for the benchmarks"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from storage import codec
+
+COUNTIES = [
+    "County Antrim", "County Armagh", "County Carlow", "County Cavan", "County Clare",
+    "County Cork", "County Derry", "County Donegal", "County Down", "County Dublin",
+    "County Fermanagh", "County Galway", "County Kerry", "County Kildare", "County Kilkenny",
+    "County Laois", "County Leitrim", "County Limerick", "County Longford", "County Louth",
+    "County Mayo", "County Meath", "County Monaghan", "County Offaly", "County Roscommon",
+    "County Sligo", "County Tipperary", "County Tyrone", "County Waterford", "County Westmeath",
+    "County Wexford", "County Wicklow",
+]
+
+NOUNS = ["Castle", "Abbey", "Cliffs", "Lake", "Park", "Museum", "Gardens", "Tower",
+         "Bridge", "Cathedral", "Harbour", "Forest", "Island", "Falls", "Gaol", "Distillery"]
+ADJECTIVES = ["Old", "Great", "Little", "Round", "Green", "Ancient", "Royal", "Hidden",
+              "Wild", "Silver", "Black", "Misty", "Golden", "Stone", "Holy", "Lost"]
+WORDS = ("historic scenic coastal medieval walking trail views heritage tour visitors "
+         "atlantic ruins monastery celtic famine music pub beach cycling garden").split()
+
+
+def make_attraction(rng, index):
+    """Build one attraction record shaped like data/attractions.json"""
+    county = rng.choice(COUNTIES)
+    name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {index}"
+    created = datetime(2020, 1, 1) + timedelta(seconds=rng.randrange(5 * 365 * 86400))
+    return {
+        'id': str(uuid.UUID(int=rng.getrandbits(128))),
+        'name': name,
+        'location': county,
+        'description': ' '.join(rng.choice(WORDS) for _ in range(60)),
+        'rating': round(rng.uniform(0, 5), 1),
+        'image_url': f"https://example.com/images/{index}.jpg",
+        'website': f"https://example.com/attractions/{index}",
+        'created_at': created.isoformat(),
+    }
+
+
+def make_attractions(count, seed=42):
+    """Build a deterministic list of count attractions"""
+    rng = random.Random(seed)
+    return [make_attraction(rng, i) for i in range(count)]
+
+
+def write_catalogue(path, count, seed=42):
+    """Write a synthetic catalogue to path in the on-disk format"""
+    with open(path, 'wb') as f:
+        f.write(codec.dumps(make_attractions(count, seed), pretty=True))
+    return path
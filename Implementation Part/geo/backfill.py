@@ -0,0 +1,57 @@
+"""Give attractions without coordinates the centroid of the county they are in.
+
+    python -m geo.backfill
+    STORAGE_MODE=sqlite DATA_FILE=data/attractions.json python -m geo.backfill --dry-run
+
+Works on the store the app is configured for (DATA_FILE, STORAGE_MODE,
+...). The county is read from the free-text location ("County Clare",
+"Co. Cork", "Belfast, Northern Ireland"); attractions whose location names
+no county are listed and left alone. All changes are written at once.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from geo.counties import county_centroid
+from indexes.geo_index import coordinates
+
+
+def backfill_coordinates(store, overwrite=False, dry_run=False):
+    """Set lat/lon from county centroids; returns (updated count, unmatched attractions)"""
+    with store.write_lock():
+        changes, unmatched = [], []
+        for attraction in store.iter_records():
+            if coordinates(attraction) is not None and not overwrite:
+                continue
+            centroid = county_centroid(attraction.get('location'))
+            if centroid is None:
+                unmatched.append(attraction)
+                continue
+            lat, lon = centroid
+            changes.append(('put', dict(attraction, lat=lat, lon=lon)))
+        if changes and not dry_run:
+            store.apply_changes(changes)
+    return len(changes), unmatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--overwrite', action='store_true', help="also replace existing coordinates")
+    parser.add_argument('--dry-run', action='store_true', help="report what would change without writing")
+    args = parser.parse_args()
+
+    from app import attraction_store, create_app
+    app = create_app()
+    with app.app_context():
+        store = attraction_store()
+        updated, unmatched = backfill_coordinates(store, args.overwrite, args.dry_run)
+    for attraction in unmatched:
+        print(f"no county found for {attraction.get('id')}: {attraction.get('location')!r}")
+    print(f"{'would set' if args.dry_run else 'set'} coordinates on {updated} attractions, "
+          f"{len(unmatched)} without a recognised county")
+
+
+if __name__ == '__main__':
+    main()
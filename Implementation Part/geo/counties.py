@@ -0,0 +1,48 @@
+"""Approximate centroids of the 32 counties of Ireland, for offline geocoding"""
+import re
+
+# County name -> (lat, lon) of its approximate geographic centre
+COUNTY_CENTROIDS = {
+    'Antrim': (54.86, -6.28), 'Armagh': (54.29, -6.62), 'Carlow': (52.72, -6.84),
+    'Cavan': (53.99, -7.36), 'Clare': (52.86, -8.98), 'Cork': (51.95, -8.76),
+    'Derry': (54.92, -6.96), 'Donegal': (54.92, -7.97), 'Down': (54.36, -5.87),
+    'Dublin': (53.38, -6.27), 'Fermanagh': (54.35, -7.63), 'Galway': (53.36, -8.75),
+    'Kerry': (52.15, -9.57), 'Kildare': (53.17, -6.79), 'Kilkenny': (52.58, -7.20),
+    'Laois': (52.99, -7.38), 'Leitrim': (54.12, -8.00), 'Limerick': (52.51, -8.77),
+    'Longford': (53.73, -7.70), 'Louth': (53.91, -6.49), 'Mayo': (53.90, -9.29),
+    'Meath': (53.61, -6.66), 'Monaghan': (54.16, -6.93), 'Offaly': (53.20, -7.60),
+    'Roscommon': (53.63, -8.19), 'Sligo': (54.16, -8.60), 'Tipperary': (52.65, -7.88),
+    'Tyrone': (54.60, -7.30), 'Waterford': (52.19, -7.62), 'Westmeath': (53.53, -7.44),
+    'Wexford': (52.47, -6.58), 'Wicklow': (52.98, -6.37),
+}
+
+# Other names a location may use for a county
+ALIASES = {
+    'Londonderry': 'Derry', 'Belfast': 'Antrim', 'Tipp': 'Tipperary',
+}
+
+_PREFIX = re.compile(r'^(county|co\.?)\s+', re.IGNORECASE)
+_LOOKUP = {name.lower(): name for name in COUNTY_CENTROIDS}
+_LOOKUP.update((alias.lower(), county) for alias, county in ALIASES.items())
+
+
+def county_of(location):
+    """Return the county a free-text location names, or None.
+
+    Each comma-separated part is tried in turn, so "County Antrim,
+    Northern Ireland", "Co. Cork" and "Belfast, Northern Ireland" all
+    resolve; "Dublin" is read as the county.
+    """
+    if not isinstance(location, str):
+        return None
+    for part in location.split(','):
+        county = _LOOKUP.get(_PREFIX.sub('', part.strip()).lower())
+        if county:
+            return county
+    return None
+
+
+def county_centroid(location):
+    """Return the (lat, lon) centroid of the county a location names, or None"""
+    county = county_of(location)
+    return COUNTY_CENTROIDS[county] if county else None
@@ -0,0 +1,14 @@
+"""Production gunicorn settings: ``gunicorn -c gunicorn.conf.py``
+
+The app is built once in the master with the production profile, which
+loads and indexes the dataset before the workers are forked, so they
+start warm and share that memory copy-on-write.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "app:create_app({'APP_PROFILE': 'production'})"
+preload_app = True
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
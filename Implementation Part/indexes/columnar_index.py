@@ -0,0 +1,361 @@
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; without it list queries use the other indexes
+    np = None
+
+# Rows allocated when the arrays first grow; they double after that
+INITIAL_CAPACITY = 1024
+
+EPOCH = datetime(1970, 1, 1)
+
+# created_at of a record without one; sorts before every date like sort_key's (1, '')
+NO_TIME = -(2 ** 62)
+
+
+def epoch_micros(value):
+    """Microseconds since 1970 of a canonical naive ISO 8601 string, else None.
+
+    Only strings equal to their own ``isoformat()`` qualify: for those,
+    comparing the numbers orders them exactly as comparing the strings.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None or parsed.isoformat() != value:
+        return None
+    delta = parsed - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def id_prefix(doc_id, start=0):
+    """8 UTF-8 bytes of a string from byte ``start`` as an integer that orders like the string"""
+    return int.from_bytes(str(doc_id).encode('utf-8')[start:start + 8].ljust(8, b'\0'), 'big')
+
+
+class ColumnarIndex:
+    """Rating, created_at, location and name of every record held as NumPy columns.
+
+    Each record owns one row: ``rating`` as a float, ``created_at`` as
+    microseconds since 1970, ``location`` as a code into a dictionary of
+    the distinct values and ``name`` as its first 16 bytes in two integers,
+    plus an integer prefix of the key; rows whose integers tie are settled
+    on the full strings. ``page`` evaluates filters as boolean masks over whole columns
+    and picks a page with ``np.partition`` and ``np.lexsort`` over the rows
+    that can reach it, so only the returned keys ever become Python
+    objects again; ``counts`` is a ``bincount`` of the location codes.
+
+    Values that these columns cannot order the way ``sort_key`` does (a
+    string rating, a created_at not in canonical ISO form, a numeric
+    location) are flagged; queries that would depend on them return None
+    so the caller answers them from the other indexes instead.
+
+    Like the other indexes it is a store listener, kept current through
+    ``reset``, ``put`` and ``delete``. Deleted rows are reused.
+    """
+
+    # Sort fields the columns can answer
+    fields = ('rating', 'created_at', 'location', 'name')
+
+    def __init__(self, key='id'):
+        if np is None:
+            raise RuntimeError("The columnar index needs numpy")
+        self.key = key
+        self.reset([])
+
+    def __len__(self):
+        return len(self._rows)
+
+    def reset(self, records):
+        """Rebuild the columns from scratch"""
+        self._rows = {}
+        self._ids = []
+        self._names = []
+        self._free = []
+        self._codes = {}
+        self._values = []
+        self._ranks = None
+        self._allocate(INITIAL_CAPACITY)
+        self._size = 0
+        records = list(records)
+        if len(records) > self._capacity:
+            self._grow(len(records))
+        for record in records:
+            self._write(self._next_row(record[self.key]), record)
+
+    def put(self, old, new):
+        """Write a created or updated record into its row"""
+        doc_id = new[self.key]
+        if old is not None and old[self.key] != doc_id:
+            self.delete(old)
+        row = self._rows.get(doc_id)
+        self._write(self._next_row(doc_id) if row is None else row, new)
+
+    def delete(self, old):
+        """Free the row of a deleted record"""
+        row = self._rows.pop(old[self.key], None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self._ids[row] = self._names[row] = None
+        self._free.append(row)
+
+    def _allocate(self, capacity):
+        self._capacity = capacity
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.prefix = np.zeros(capacity, dtype=np.uint64)
+        self.rating = np.full(capacity, np.inf)
+        self.rating_valid = np.zeros(capacity, dtype=bool)
+        self.rating_odd = np.zeros(capacity, dtype=bool)
+        self.created = np.full(capacity, NO_TIME, dtype=np.int64)
+        self.created_valid = np.zeros(capacity, dtype=bool)
+        self.created_odd = np.zeros(capacity, dtype=bool)
+        self.location = np.full(capacity, -1, dtype=np.int64)
+        self.location_odd = np.zeros(capacity, dtype=bool)
+        self.name_head = np.zeros(capacity, dtype=np.uint64)
+        self.name_tail = np.zeros(capacity, dtype=np.uint64)
+        self.name_odd = np.zeros(capacity, dtype=bool)
+
+    def _grow(self, capacity):
+        """Reallocate every column with room for capacity rows"""
+        old = {name: getattr(self, name) for name in self._columns()}
+        size = self._capacity
+        self._allocate(capacity)
+        for name, column in old.items():
+            getattr(self, name)[:size] = column
+
+    @staticmethod
+    def _columns():
+        return ('alive', 'prefix', 'rating', 'rating_valid', 'rating_odd', 'created', 'created_valid',
+                'created_odd', 'location', 'location_odd', 'name_head', 'name_tail', 'name_odd')
+
+    def _next_row(self, doc_id):
+        if self._free:
+            row = self._free.pop()
+            self._ids[row] = doc_id
+        else:
+            if self._size == self._capacity:
+                self._grow(self._capacity * 2)
+            row = self._size
+            self._size += 1
+            self._ids.append(doc_id)
+            self._names.append(None)
+        self._rows[doc_id] = row
+        return row
+
+    def _write(self, row, record):
+        self.alive[row] = True
+        self.prefix[row] = id_prefix(record[self.key])
+
+        rating = record.get('rating')
+        numeric = isinstance(rating, (int, float)) and not isinstance(rating, bool)
+        self.rating[row] = rating if numeric else np.inf
+        self.rating_valid[row] = numeric
+        self.rating_odd[row] = not numeric and rating is not None
+
+        created = record.get('created_at')
+        micros = epoch_micros(created)
+        self.created[row] = NO_TIME if micros is None else micros
+        self.created_valid[row] = micros is not None
+        self.created_odd[row] = micros is None and created is not None
+
+        location = record.get('location')
+        if isinstance(location, str):
+            code = self._codes.get(location)
+            if code is None:
+                code = self._codes[location] = len(self._values)
+                self._values.append(location)
+                self._ranks = None
+            self.location[row] = code
+        else:
+            self.location[row] = -1
+        self.location_odd[row] = location is not None and not isinstance(location, str)
+
+        name = record.get('name')
+        text = name if isinstance(name, str) else ''
+        self._names[row] = text
+        self.name_head[row] = id_prefix(text)
+        self.name_tail[row] = id_prefix(text, 8)
+        self.name_odd[row] = name is not None and not isinstance(name, str)
+
+    def _location_ranks(self):
+        """Sort position of each location code; a missing location ranks with ''"""
+        if self._ranks is None:
+            order = sorted(range(len(self._values)), key=self._values.__getitem__)
+            ranks = np.empty(len(self._values) + 1, dtype=np.int64)
+            ranks[np.array(order, dtype=np.int64)] = np.arange(1, len(order) + 1)
+            # Index -1 is the missing value
+            ranks[-1] = 1 if '' in self._codes else 0
+            self._ranks = ranks
+        return self._ranks
+
+    def _sort_keys(self, field, alive):
+        """(key columns, full key of a row, position of a sort key) ordering rows like sort_key, or None.
+
+        The columns order rows by the field, most significant first, and
+        end with the key prefix where the field's columns hold it exactly;
+        rows tied on all of them are ordered by the full key and then the
+        record key. The position turns a (sort_key, key) pair into column
+        values and a full key, or None when it lies outside what the
+        columns hold.
+        """
+        prefix = self.prefix
+        if field == 'rating':
+            if (self.rating_odd & alive).any():
+                return None
+            rating = self.rating
+
+            def position(key, doc_id):
+                if key[0] == 0:
+                    return (key[1], id_prefix(doc_id)), key[1]
+                return ((np.inf, id_prefix(doc_id)), np.inf) if key[1] == '' else None
+            return (rating, prefix), lambda row: float(rating[row]), position
+        if field == 'created_at':
+            if (self.created_odd & alive).any():
+                return None
+            created = self.created
+
+            def position(key, doc_id):
+                micros = NO_TIME if key == (1, '') else epoch_micros(key[1]) if key[0] == 1 else None
+                return None if micros is None else ((micros, id_prefix(doc_id)), micros)
+            return (created, prefix), lambda row: int(created[row]), position
+        if field == 'location':
+            if (self.location_odd & alive).any():
+                return None
+            ranks = self._location_ranks()
+            location = ranks[self.location]
+
+            def position(key, doc_id):
+                code = self._codes.get(key[1]) if key[0] == 1 else None
+                rank = ranks[-1] if key == (1, '') else None if code is None else ranks[code]
+                return None if rank is None else ((rank, id_prefix(doc_id)), int(rank))
+            return (location, prefix), lambda row: int(location[row]), position
+        if field == 'name':
+            if (self.name_odd & alive).any():
+                return None
+            names = self._names
+
+            # Names longer than 16 bytes can tie on both columns, so the key prefix cannot follow them
+            def position(key, doc_id):
+                if key[0] != 1:
+                    return None
+                return (id_prefix(key[1]), id_prefix(key[1], 8)), key[1]
+            return (self.name_head, self.name_tail), names.__getitem__, position
+        return None
+
+    def _filter_mask(self, f, alive):
+        """Boolean mask of the rows passing a query.filters filter, or None"""
+        if f.kind == 'in':
+            if f.field != 'location':
+                return None
+            codes = [self._codes[value] for value in f.values if value in self._codes]
+            return np.isin(self.location, np.array(codes, dtype=np.int64)) & alive
+        numeric = f.low[0] == 0
+        if f.field == 'rating' and numeric:
+            values, mask = self.rating, self.rating_valid & alive
+            low, high = f.low_value, f.high_value
+        elif f.field == 'created_at' and not numeric:
+            if (self.created_odd & alive).any():
+                return None
+            values, mask = self.created, self.created_valid & alive
+            low, high = (None if v is None else epoch_micros(v) for v in (f.low_value, f.high_value))
+            if (low is None) != (f.low_value is None) or (high is None) != (f.high_value is None):
+                return None
+        else:
+            return None
+        if low is not None:
+            mask &= values > low if f.exclusive else values >= low
+        if high is not None:
+            mask &= values < high if f.exclusive else values <= high
+        return mask
+
+    def matches(self, filters, candidates=None, size=None):
+        """Mask of the live rows passing every filter and among candidates, or None"""
+        size = self._size if size is None else size
+        alive = self.alive
+        mask = alive[:size].copy()
+        if candidates is not None:
+            rows = self._rows
+            chosen = np.zeros(self._capacity, dtype=bool)
+            chosen[np.fromiter((rows[i] for i in candidates if i in rows), dtype=np.int64)] = True
+            mask &= chosen[:size]
+        for f in filters:
+            passing = self._filter_mask(f, alive)
+            if passing is None:
+                return None
+            mask &= passing[:size]
+        return mask
+
+    def page(self, sort_by, candidates=None, filters=(), reverse=False, limit=None, after=None):
+        """Return (keys, total, has_more) for one page of a filtered, sorted list, or None.
+
+        ``candidates`` restricts the result to those keys (e.g. search
+        hits); ``after`` is a ``(sort_key, key)`` position as the sorted
+        indexes use. Returns None when the columns cannot answer exactly.
+        """
+        if not limit:
+            return None
+        # Rows past this size may be written meanwhile; everything below is read consistently
+        size = self._size
+        mask = self.matches(filters, candidates, size)
+        sort_keys = self._sort_keys(sort_by, self.alive)
+        if mask is None or sort_keys is None:
+            return None
+        columns, full_key, position = sort_keys
+        columns = [column[:size] for column in columns]
+        if reverse:
+            # Walking an ascending order backwards is ascending order of the inverted keys
+            columns = [~column if column.dtype == np.uint64 else -column for column in columns]
+        ids = self._ids
+        row_key = lambda row: (full_key(row), ids[row])
+        total = int(np.count_nonzero(mask))
+        if after is not None:
+            (key, doc_id) = after
+            start = position(key, doc_id)
+            if start is None:
+                return None
+            values, full = start
+            if reverse:
+                values = [~np.uint64(v) if column.dtype == np.uint64 else -v for column, v in zip(columns, values)]
+            mask &= self._after(columns, values, mask, row_key, (full, doc_id), reverse)
+        rows = np.flatnonzero(mask)
+        wanted = limit + 1
+        first = columns[0]
+        if len(rows) > wanted:
+            # Rows at or below the wanted-th smallest leading value, ties included
+            cut = np.partition(first[rows], wanted - 1)[wanted - 1]
+            rows = rows[first[rows] <= cut]
+        rows = rows[np.lexsort([column[rows] for column in reversed(columns)])]
+        # Rows equal on every column are settled, with the page edge, on the full keys
+        end = min(wanted, len(rows))
+        while end and end < len(rows) and all(column[rows[end]] == column[rows[end - 1]] for column in columns):
+            end += 1
+        chosen = sorted(rows[:end].tolist(), key=row_key, reverse=reverse)
+        page = [ids[row] for row in chosen[:wanted]]
+        return page[:limit], total, len(page) > limit
+
+    @staticmethod
+    def _after(columns, values, mask, row_key, after_key, reverse):
+        """Mask of the rows whose keys come after a position in the (possibly inverted) column order"""
+        later = np.zeros(len(mask), dtype=bool)
+        equal = mask.copy()
+        for column, value in zip(columns, values):
+            later |= equal & (column > value)
+            equal &= column == value
+        for row in np.flatnonzero(equal).tolist():
+            if (row_key(row) < after_key) if reverse else (row_key(row) > after_key):
+                later[row] = True
+        return later
+
+    def counts(self, field, mask=None):
+        """Return {value: number of records} for the string values of field, over a row mask or every row"""
+        if field != 'location':
+            return None
+        codes = self.location[:self._size]
+        selected = codes[(mask if mask is not None else self.alive[:self._size]) & (codes >= 0)]
+        totals = np.bincount(selected, minlength=len(self._values))
+        return {self._values[code]: int(totals[code]) for code in np.flatnonzero(totals).tolist()}
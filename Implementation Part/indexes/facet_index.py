@@ -0,0 +1,78 @@
+from collections import Counter
+
+
+class FacetIndex:
+    """Keys of a record collection grouped by the exact value of one field.
+
+    Each distinct value maps to the set of keys holding it, so an equality
+    filter is a dict lookup and facet counts are set sizes rather than a
+    scan. Only string values are indexed: they are what a query string can
+    ask for and what a JSON object can use as a facet key.
+
+    Like the other indexes it is a store listener, kept current through
+    ``reset``, ``put`` and ``delete``.
+    """
+
+    def __init__(self, field, key='id'):
+        self.field = field
+        self.key = key
+        self._postings = {}
+        self._values = {}
+
+    def __len__(self):
+        return len(self._values)
+
+    def reset(self, records):
+        """Rebuild the index from scratch"""
+        self._postings = {}
+        self._values = {}
+        for record in records:
+            self._add(record)
+
+    def put(self, old, new):
+        """Move a created or updated record to its value's group"""
+        if old is not None:
+            self._discard(old[self.key])
+        self._add(new)
+
+    def delete(self, old):
+        """Drop a deleted record from the index"""
+        self._discard(old[self.key])
+
+    def _add(self, record):
+        value = record.get(self.field)
+        if isinstance(value, str):
+            doc_id = record[self.key]
+            self._values[doc_id] = value
+            self._postings.setdefault(value, set()).add(doc_id)
+
+    def _discard(self, doc_id):
+        value = self._values.pop(doc_id, None)
+        if value is None:
+            return
+        group = self._postings[value]
+        group.discard(doc_id)
+        if not group:
+            del self._postings[value]
+
+    def ids(self, value):
+        """Return the keys of records whose field equals value"""
+        # Copied in C, so a concurrent write cannot resize the set while a caller loops over it
+        return frozenset(self._postings.get(value, ()))
+
+    def count(self, value):
+        """Return the number of records whose field equals value"""
+        return len(self._postings.get(value, ()))
+
+    def value(self, doc_id):
+        """Return the indexed value of a record, or None"""
+        return self._values.get(doc_id)
+
+    def counts(self, ids=None):
+        """Return {value: number of records}, over every record or only over ids"""
+        if ids is None:
+            # Copy so a concurrent writer cannot resize the dict under us
+            return {value: len(group) for value, group in list(self._postings.items())}
+        values = self._values
+        counts = Counter(value for value in map(values.get, ids) if value is not None)
+        return dict(counts)
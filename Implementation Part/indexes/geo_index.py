@@ -0,0 +1,225 @@
+import heapq
+import math
+
+# Mean Earth radius used for every distance
+EARTH_RADIUS_KM = 6371.0088
+
+# Distance to the antipode, the farthest any two points can be
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Side of a grid cell in degrees; about 5.5 km north-south
+GRID_DEGREES = 0.05
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def valid_coordinates(lat, lon):
+    """True if lat and lon are numbers within -90..90 and -180..180"""
+    return all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+               for v in (lat, lon)) and -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def coordinates(record, lat_field='lat', lon_field='lon'):
+    """Return (lat, lon) of a record, or None if it has no valid position"""
+    lat, lon = record.get(lat_field), record.get(lon_field)
+    return (lat, lon) if valid_coordinates(lat, lon) else None
+
+
+def bounding_boxes(lat, lon, radius_km):
+    """Boxes (min_lat, max_lat, min_lon, max_lon) that together hold every point within radius_km.
+
+    One box normally and two when the circle crosses the antimeridian; a
+    circle reaching a pole spans every longitude.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    low, high = lat - math.degrees(angle), lat + math.degrees(angle)
+    if low <= -90 or high >= 90:
+        return [(max(low, -90.0), min(high, 90.0), -180.0, 180.0)]
+    spread = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(lat)))))
+    west, east = lon - spread, lon + spread
+    if west < -180:
+        return [(low, high, west + 360, 180.0), (low, high, -180.0, east)]
+    if east > 180:
+        return [(low, high, west, 180.0), (low, high, -180.0, east - 360)]
+    return [(low, high, west, east)]
+
+
+def _haversine_term(distance_km):
+    """The haversine 'a' of a distance, which orders points like the distance itself"""
+    return math.sin(min(distance_km, HALF_CIRCUMFERENCE_KM) / (2 * EARTH_RADIUS_KM)) ** 2
+
+
+class GeoIndex:
+    """Keys of a record collection bucketed on a latitude/longitude grid.
+
+    Each record with a valid ``lat``/``lon`` sits in one ``cell_degrees``
+    square cell. A nearest-neighbour query visits the cells in rings around
+    the query point, computing distances only for the points in cells that
+    could still hold a closer match, and stops once the next ring's
+    distance lower bound exceeds the radius or the current k-th distance.
+    Once the rings have probed more cells than remain occupied it ranks
+    those cells directly, so sparse data never walks empty ocean.
+
+    Like the other indexes it is a store listener, kept current through
+    ``reset``, ``put`` and ``delete``.
+    """
+
+    def __init__(self, lat_field='lat', lon_field='lon', key='id', cell_degrees=GRID_DEGREES):
+        self.lat_field = lat_field
+        self.lon_field = lon_field
+        self.key = key
+        self.cell_degrees = cell_degrees
+        self._columns = round(360 / cell_degrees)
+        self._cells = {}
+        self._cell_of = {}
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def reset(self, records):
+        """Rebuild the index from scratch"""
+        self._cells = {}
+        self._cell_of = {}
+        for record in records:
+            self._add(record)
+
+    def put(self, old, new):
+        """Move a created or updated record to its new cell"""
+        if old is not None:
+            self._discard(old[self.key])
+        self._add(new)
+
+    def delete(self, old):
+        """Drop a deleted record from the index"""
+        self._discard(old[self.key])
+
+    def _cell(self, lat, lon):
+        size = self.cell_degrees
+        return (min(math.floor(lat / size), round(90 / size) - 1), math.floor(lon / size) % self._columns)
+
+    def _add(self, record):
+        position = coordinates(record, self.lat_field, self.lon_field)
+        if position is None:
+            return
+        lat, lon = map(math.radians, position)
+        cell = self._cell(*position)
+        self._cells.setdefault(cell, {})[record[self.key]] = (lat, lon, math.cos(lat))
+        self._cell_of[record[self.key]] = cell
+
+    def _discard(self, doc_id):
+        cell = self._cell_of.pop(doc_id, None)
+        if cell is None:
+            return
+        points = self._cells[cell]
+        del points[doc_id]
+        if not points:
+            del self._cells[cell]
+
+    def _bound(self, lat, lon, row, column):
+        """Lower bound in km on the distance from (lat, lon) to any point of a cell.
+
+        ``column`` is unwrapped (it may lie beyond ±180°), so the bound
+        follows the direction the ring reached the cell from.
+        """
+        size = self.cell_degrees
+        lat_gap = max(row * size - lat, lat - (row + 1) * size, 0)
+        lon_gap = max(column * size - lon, lon - (column + 1) * size, 0)
+        # Crossing a meridian at least lon_gap away costs this much
+        meridian = 0.0
+        if lon_gap < 90:
+            meridian = EARTH_RADIUS_KM * math.asin(min(1.0, math.cos(math.radians(lat))
+                                                       * math.sin(math.radians(lon_gap))))
+        return max(EARTH_RADIUS_KM * math.radians(lat_gap), meridian)
+
+    def nearest(self, lat, lon, limit=None, radius_km=None):
+        """Return up to limit (distance_km, key) pairs nearest to (lat, lon), closest first.
+
+        With ``radius_km`` only points that close are returned; with neither
+        a limit nor a radius every indexed point is.
+        """
+        if limit is not None and limit <= 0:
+            return []
+        size, cells = self.cell_degrees, self._cells
+        rows = round(90 / size)
+        row, column = min(math.floor(lat / size), rows - 1), math.floor(lon / size)
+        q_lat, q_lon = math.radians(lat), math.radians(lon)
+        q_cos = math.cos(q_lat)
+        max_a = _haversine_term(radius_km) if radius_km is not None else 1.0
+        # Max-heap of the best matches so far, as (-a, key)
+        best = []
+        visited = set()
+        seen_cells = 0
+
+        def worst():
+            return -best[0][0] if limit is not None and len(best) >= limit else max_a
+
+        def scan(points):
+            sin, heappush, heappushpop = math.sin, heapq.heappush, heapq.heappushpop
+            # Copy so a concurrent writer cannot resize the dict under us; dict.copy()
+            # allocates no per-item tuples, so no garbage collection (and thread
+            # switch) can run partway through the copy as it can in list(items())
+            for doc_id, (p_lat, p_lon, p_cos) in points.copy().items():
+                d_lat, d_lon = sin((p_lat - q_lat) / 2), sin((p_lon - q_lon) / 2)
+                a = d_lat * d_lat + q_cos * p_cos * d_lon * d_lon
+                if a > max_a:
+                    continue
+                if limit is None or len(best) < limit:
+                    heappush(best, (-a, doc_id))
+                elif a < -best[0][0]:
+                    heappushpop(best, (-a, doc_id))
+
+        ring = probes = 0
+        while seen_cells < len(cells):
+            probes += 8 * ring
+            if probes > len(cells) - seen_cells:
+                # The rings have cost more than the occupied cells left: rank those instead
+                remaining = []
+                for cell, points in cells.copy().items():
+                    if cell not in visited:
+                        unwrapped = column + (cell[1] - column + self._columns // 2) % self._columns \
+                            - self._columns // 2
+                        remaining.append((self._bound(lat, lon, cell[0], unwrapped), cell, points))
+                remaining.sort()
+                for bound, cell, points in remaining:
+                    if _haversine_term(bound) > worst():
+                        break
+                    scan(points)
+                break
+            for r, c in self._ring(row, column, ring):
+                cell = (r, c % self._columns)
+                if cell in visited:
+                    continue
+                visited.add(cell)
+                points = cells.get(cell)
+                if points is None:
+                    continue
+                seen_cells += 1
+                if _haversine_term(self._bound(lat, lon, r, c)) <= worst():
+                    scan(points)
+            # The ring's nearest cells are those straight above, below and beside the query
+            ring_bound = min(self._bound(lat, lon, r, c) for r, c in
+                             ((row - ring, column), (row + ring, column), (row, column - ring), (row, column + ring))
+                             if -rows <= r < rows)
+            if _haversine_term(ring_bound) > worst():
+                break
+            ring += 1
+        found = sorted((-a, doc_id) for a, doc_id in best)
+        return [(2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))), doc_id) for a, doc_id in found]
+
+    def _ring(self, row, column, ring):
+        """Cells (row, unwrapped column) at Chebyshev distance ring from a cell"""
+        rows = round(90 / self.cell_degrees)
+        for r in range(row - ring, row + ring + 1):
+            if not -rows <= r < rows:
+                continue
+            if abs(r - row) == ring:
+                columns = range(column - ring, column + ring + 1)
+            else:
+                columns = (column - ring, column + ring)
+            for c in columns:
+                yield r, c
@@ -0,0 +1,113 @@
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+
+
+def sort_key(value):
+    """Order numbers before strings so mixed or missing values never raise"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, '' if value is None else str(value))
+
+
+class SortedIndex:
+    """Keys of a record collection kept permanently ordered by one field.
+
+    Entries are ``(sort_key, key)`` pairs held in a sorted list and updated
+    with bisect insertion/removal on every mutation, so listing records in
+    field order needs no per-request sort. Descending order is the same
+    list walked backwards; ties are broken by key.
+    """
+
+    def __init__(self, field, key='id'):
+        self.field = field
+        self.key = key
+        self._entries = []
+        self._ids = []
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def reset(self, records):
+        """Rebuild the index from scratch"""
+        self._keys = {record[self.key]: sort_key(record.get(self.field)) for record in records}
+        self._entries = sorted((value, doc_id) for doc_id, value in self._keys.items())
+        self._ids = [doc_id for _, doc_id in self._entries]
+
+    def put(self, old, new):
+        """Move a created or updated record to its sorted position"""
+        if old is not None:
+            self._discard(old[self.key])
+        doc_id = new[self.key]
+        entry = (sort_key(new.get(self.field)), doc_id)
+        position = bisect_left(self._entries, entry)
+        self._entries.insert(position, entry)
+        self._ids.insert(position, doc_id)
+        self._keys[doc_id] = entry[0]
+
+    def delete(self, old):
+        """Drop a deleted record from the index"""
+        self._discard(old[self.key])
+
+    def _discard(self, doc_id):
+        value = self._keys.pop(doc_id, None)
+        if value is None:
+            return
+        position = bisect_left(self._entries, (value, doc_id))
+        del self._entries[position]
+        del self._ids[position]
+
+    def ids(self, reverse=False):
+        """Return every key in field order (callers must not mutate it)"""
+        return self._ids[::-1] if reverse else self._ids
+
+    def entry(self, doc_id):
+        """Return the (sort_key, key) pair a record is ordered by"""
+        return (self._keys[doc_id], doc_id)
+
+    def page(self, after=None, limit=None, reverse=False):
+        """Return up to limit keys that follow the entry ``after`` in field order"""
+        if not reverse:
+            start = 0 if after is None else bisect_right(self._entries, after)
+            return self._ids[start:None if limit is None else start + limit]
+        end = len(self._ids) if after is None else bisect_left(self._entries, after)
+        start = 0 if limit is None else max(0, end - limit)
+        return self._ids[start:end][::-1]
+
+    def key_of(self, doc_id):
+        """Return the sort key a record is indexed under, or None"""
+        return self._keys.get(doc_id)
+
+    def _span(self, low, high, exclusive):
+        """Positions of the entries whose sort key lies between low and high"""
+        first = itemgetter(0)
+        if exclusive:
+            return (bisect_right(self._entries, low, key=first),
+                    bisect_left(self._entries, high, key=first))
+        return (bisect_left(self._entries, low, key=first),
+                bisect_right(self._entries, high, key=first))
+
+    def range(self, low, high, exclusive=False):
+        """Return the keys whose sort key lies between low and high, in field order"""
+        start, end = self._span(low, high, exclusive)
+        return self._ids[start:end]
+
+    def count_range(self, low, high, exclusive=False):
+        """Return how many keys range() would return, in O(log n)"""
+        start, end = self._span(low, high, exclusive)
+        return max(0, end - start)
+
+    def order(self, ids, reverse=False):
+        """Return a subset of keys in field order.
+
+        Large subsets are merged against the index by walking it once; small
+        ones are sorted on the keys the index already holds, which is
+        cheaper than a full walk.
+        """
+        wanted = ids if isinstance(ids, (set, dict)) else set(ids)
+        if len(wanted) * 16 < len(self._ids):
+            keys = self._keys
+            return sorted((doc_id for doc_id in wanted if doc_id in keys),
+                          key=lambda doc_id: (keys[doc_id], doc_id), reverse=reverse)
+        ordered = [doc_id for doc_id in self._ids if doc_id in wanted]
+        return ordered[::-1] if reverse else ordered
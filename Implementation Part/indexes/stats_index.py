@@ -0,0 +1,128 @@
+import math
+import re
+from collections import Counter
+from datetime import date
+
+# A created_at whose first ten characters are a calendar date counts towards that day
+DAY = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')
+
+
+def numeric_rating(value):
+    """True if a rating value is a number (JSON booleans are not)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def creation_day(value):
+    """The 'YYYY-MM-DD' day a created_at string starts with, or None"""
+    if not isinstance(value, str) or not DAY.match(value):
+        return None
+    day = value[:10]
+    try:
+        date.fromisoformat(day)
+    except ValueError:
+        return None
+    return day
+
+
+def summarise(count, ratings, locations, days):
+    """Shape rollups as the statistics a client sees.
+
+    ``ratings`` maps each rating value to how many records hold it,
+    ``locations`` maps a location to ``(records, rating sum, rated
+    records)`` and ``days`` a creation day to its record count. The
+    histogram (by whole star) and the monthly counts are folded from
+    these, so reading costs O(distinct values), not O(records).
+    """
+    rated = sum(ratings.values())
+    histogram = Counter()
+    for value, n in ratings.items():
+        histogram[str(math.floor(value))] += n
+    months = Counter()
+    for day, n in days.items():
+        months[day[:7]] += n
+    return {
+        "count": count,
+        "rating": {
+            "count": rated,
+            "mean": round(sum(value * n for value, n in ratings.items()) / rated, 3) if rated else None,
+            "min": min(ratings) if ratings else None,
+            "max": max(ratings) if ratings else None,
+            "histogram": dict(sorted(histogram.items(), key=lambda item: int(item[0]))),
+        },
+        "locations": {location: {"count": n, "mean_rating": round(total / rated_here, 3) if rated_here else None}
+                      for location, (n, total, rated_here) in sorted(locations.items())},
+        "created": {"per_day": dict(sorted(days.items())), "per_month": dict(sorted(months.items()))},
+    }
+
+
+class StatsIndex:
+    """Running rollups of ratings, locations and creation days.
+
+    Every record adds one to the count of its rating value, of its
+    location (with its rating added to that location's sum) and of the
+    day it was created; an update subtracts the old record's share and
+    adds the new one's, so each write costs O(1) and only ``reset`` (a
+    load) looks at every record. Groups whose count drops to zero are
+    removed, so they never show up in ``summary``.
+
+    Like the other indexes it is a store listener, kept current through
+    ``reset``, ``put`` and ``delete``.
+    """
+
+    def __init__(self):
+        self.reset([])
+
+    def __len__(self):
+        return self._count
+
+    def reset(self, records):
+        """Rebuild the rollups from scratch"""
+        self._count = 0
+        self._ratings = {}
+        self._locations = {}
+        self._days = {}
+        for record in records:
+            self._apply(record, 1)
+
+    def put(self, old, new):
+        """Move a created or updated record's share to its new values"""
+        if old is not None:
+            self._apply(old, -1)
+        self._apply(new, 1)
+
+    def delete(self, old):
+        """Drop a deleted record's share"""
+        self._apply(old, -1)
+
+    @staticmethod
+    def _bump(groups, key, change):
+        n = groups.get(key, 0) + change
+        if n:
+            groups[key] = n
+        else:
+            del groups[key]
+
+    def _apply(self, record, change):
+        self._count += change
+        rating = record.get('rating')
+        rated = numeric_rating(rating)
+        if rated:
+            self._bump(self._ratings, rating, change)
+        location = record.get('location')
+        if isinstance(location, str):
+            n, total, rated_here = self._locations.get(location, (0, 0, 0))
+            if rated:
+                total, rated_here = total + change * rating, rated_here + change
+            if n + change:
+                self._locations[location] = (n + change, total if rated_here else 0, rated_here)
+            else:
+                del self._locations[location]
+        day = creation_day(record.get('created_at'))
+        if day is not None:
+            self._bump(self._days, day, change)
+
+    def summary(self):
+        """Return the statistics of every record (see ``summarise``)"""
+        # Copies taken in C, so a concurrent write cannot change a dict while it is read
+        return summarise(self._count, dict(list(self._ratings.items())),
+                         dict(list(self._locations.items())), dict(list(self._days.items())))
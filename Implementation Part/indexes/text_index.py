@@ -0,0 +1,446 @@
+import re
+import math
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from collections.abc import Mapping
+from heapq import heappop, heappush, nlargest
+from operator import itemgetter
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Score multipliers for how a query term matched an indexed token
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+SUBSTRING_MATCH = 0.4
+# Multiplied by the trigram similarity, so a fuzzy match never outranks a prefix
+FUZZY_MATCH = 0.6
+
+# Lowest trigram similarity (Jaccard) for a fuzzy match, as pg_trgm's default
+FUZZY_THRESHOLD = 0.3
+# Most similar tokens a fuzzy term expands to
+FUZZY_CANDIDATES = 10
+# Shorter terms only match exactly or as a prefix
+FUZZY_MIN_LENGTH = 4
+# Edits (insert, delete, substitute, swap neighbours) a fuzzy match may need instead,
+# by term length; a swap in a short word leaves too few shared trigrams
+FUZZY_EDITS = ((8, 2), (0, 1))
+
+# Tokens in at least this many records also keep their keys as a set and grouped
+# by weight, so broad terms intersect and rank a page with set operations; smaller
+# postings are grouped per query
+IMPACT_MIN_POSTINGS = 256
+
+# Pages are ranked by scoring every match when there are no more than this
+SCORE_ALL_MATCHES = 2048
+
+
+def fold(text):
+    """Casefold text and strip accents, so 'Dún' and 'DUN' both become 'dun'"""
+    text = str(text).casefold()
+    if text.isascii():
+        return text
+    return ''.join(c for c in unicodedata.normalize('NFKD', text) if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Split text into case- and accent-folded word tokens"""
+    return TOKEN_RE.findall(fold(text))
+
+
+def trigrams(token):
+    """Return the set of three-character substrings of a token"""
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def padded_trigrams(token):
+    """Trigrams of a token padded like pg_trgm, so its start and end count as well"""
+    return trigrams(f"  {token} ")
+
+
+def edit_distance(a, b, bound):
+    """Optimal string alignment distance between a and b, or bound + 1 once it must exceed bound"""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (x != y))
+            if i > 1 and j > 1 and x == b[j - 2] and a[i - 2] == y:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > bound:
+            return bound + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+class TrigramIndex:
+    """Vocabulary tokens grouped by the padded trigrams they contain.
+
+    Finds the tokens containing a string (every trigram of it must be
+    shared) and the tokens most similar to a misspelt term, scored by the
+    Jaccard similarity of their padded trigram sets or, where it is higher,
+    by one minus their edit distance over the longer length.
+    """
+
+    def __init__(self):
+        self._grams = {}
+
+    def __len__(self):
+        return len(self._grams)
+
+    def add(self, token):
+        for gram in padded_trigrams(token):
+            self._grams.setdefault(gram, set()).add(token)
+
+    def remove(self, token):
+        for gram in padded_trigrams(token):
+            tokens = self._grams.get(gram)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._grams[gram]
+
+    def containing(self, term):
+        """Return the tokens that contain term (at least three characters long)"""
+        candidates = None
+        for gram in trigrams(term):
+            tokens = self._grams.get(gram)
+            if not tokens:
+                return set()
+            candidates = set(tokens) if candidates is None else candidates & tokens
+        return {token for token in candidates or () if term in token}
+
+    def similar(self, term, threshold=FUZZY_THRESHOLD, limit=FUZZY_CANDIDATES):
+        """Return up to limit (token, similarity) pairs at or above threshold, most similar first.
+
+        Tokens sharing fewer than ``threshold`` of the term's trigrams
+        cannot reach it by Jaccard, and each edit breaks at most four of
+        them, so only tokens sharing enough have their similarity computed.
+        """
+        grams = padded_trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            tokens = self._grams.get(gram)
+            if tokens:
+                shared.update(list(tokens))
+        edits = next(edits for length, edits in FUZZY_EDITS if len(term) >= length)
+        needed = min(threshold * len(grams), max(2, len(grams) - 4 * edits))
+        scored = []
+        for token, count in shared.items():
+            if count < needed:
+                continue
+            similarity = count / (len(grams) + len(padded_trigrams(token)) - count)
+            distance = edit_distance(term, token, edits)
+            if distance <= edits:
+                similarity = max(similarity, 1 - distance / max(len(term), len(token)))
+            if similarity >= threshold:
+                scored.append((similarity, token))
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [(token, similarity) for similarity, token in scored[:limit]]
+
+
+class TextIndex:
+    """Inverted index over weighted text fields of a record collection.
+
+    Records are keyed by ``key`` (``id`` for attractions, craftspeople and
+    products alike). Every query term must match each returned record,
+    either exactly, as a word prefix, or, when ``substring`` is on, anywhere
+    inside a word via a trigram index over the vocabulary. A fuzzy search
+    also lets a term match the vocabulary tokens most similar to it by
+    trigrams, so misspelt words still find their records. Text is case-
+    and accent-folded on both sides. Results carry a tf-idf style
+    relevance score weighted by field, computed lazily (see ``Matches``).
+
+    The index is a store listener: ``reset`` rebuilds it on load and
+    ``put``/``delete`` keep it current on every mutation.
+    """
+
+    def __init__(self, fields, key='id', substring=True):
+        self.fields = fields
+        self.key = key
+        self.substring = substring
+        self._postings = {}
+        self._key_sets = {}
+        self._impacts = {}
+        self._doc_tokens = {}
+        self._vocabulary = []
+        self._trigrams = TrigramIndex()
+
+    def __len__(self):
+        return len(self._doc_tokens)
+
+    def reset(self, records):
+        """Rebuild the index from scratch"""
+        self._postings = {}
+        self._key_sets = {}
+        self._impacts = {}
+        self._doc_tokens = {}
+        self._trigrams = TrigramIndex()
+        for record in records:
+            self._add(record, update_vocabulary=False)
+        self._vocabulary = sorted(self._postings)
+        if self.substring:
+            for token in self._vocabulary:
+                self._trigrams.add(token)
+
+    def put(self, old, new):
+        """Index a created or updated record"""
+        if old is not None:
+            self._remove(old[self.key])
+        self._add(new)
+
+    def delete(self, old):
+        """Drop a deleted record from the index"""
+        self._remove(old[self.key])
+
+    def _token_weights(self, record):
+        """Map each token in the indexed fields to its summed field weight"""
+        weights = {}
+        for field, weight in self.fields.items():
+            value = record.get(field)
+            if value:
+                for token, count in Counter(tokenize(value)).items():
+                    weights[token] = weights.get(token, 0) + weight * count
+        return weights
+
+    def _add(self, record, update_vocabulary=True):
+        doc_id = record[self.key]
+        weights = self._token_weights(record)
+        self._doc_tokens[doc_id] = weights
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                if update_vocabulary:
+                    insort(self._vocabulary, token)
+                    if self.substring:
+                        self._trigrams.add(token)
+            # Store the damped term frequency so queries only multiply
+            weight = postings[doc_id] = math.log1p(weight)
+            impacts = self._impacts.get(token)
+            if impacts is not None:
+                self._key_sets[token].add(doc_id)
+                impacts.setdefault(weight, set()).add(doc_id)
+            elif len(postings) >= IMPACT_MIN_POSTINGS:
+                self._key_sets[token] = set(postings)
+                self._impacts[token] = group_by_weight(postings)
+
+    def _remove(self, doc_id):
+        for token in self._doc_tokens.pop(doc_id, ()):
+            postings = self._postings[token]
+            weight = postings.pop(doc_id)
+            impacts = self._impacts.get(token)
+            if impacts is not None:
+                self._key_sets[token].discard(doc_id)
+                group = impacts[weight]
+                group.discard(doc_id)
+                if not group:
+                    del impacts[weight]
+            if not postings:
+                del self._postings[token]
+                self._impacts.pop(token, None)
+                self._key_sets.pop(token, None)
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+                if self.substring:
+                    self._trigrams.remove(token)
+
+    def _weight_groups(self, token, postings):
+        """(weight, keys) groups of a token's postings, in no particular order"""
+        impacts = self._impacts.get(token)
+        if impacts is None:
+            return list(group_by_weight(postings).items())
+        # Copied in C without per-item allocations, so a concurrent write cannot
+        # add a weight while the copy or the caller loops
+        return impacts.copy().items()
+
+    def _expand(self, term, fuzzy=False):
+        """Yield (token, quality) for every indexed token a query term matches"""
+        vocabulary = self._vocabulary
+        matched = set()
+        i = bisect_left(vocabulary, term)
+        while i < len(vocabulary) and vocabulary[i].startswith(term):
+            token = vocabulary[i]
+            matched.add(token)
+            yield token, EXACT_MATCH if token == term else PREFIX_MATCH
+            i += 1
+        if self.substring and len(term) >= 3:
+            for token in self._trigrams.containing(term):
+                if token not in matched:
+                    matched.add(token)
+                    yield token, SUBSTRING_MATCH
+        if fuzzy and self.substring and len(term) >= FUZZY_MIN_LENGTH:
+            for token, similarity in self._trigrams.similar(term):
+                if token not in matched:
+                    yield token, FUZZY_MATCH * similarity
+
+    def search(self, query, fuzzy=False):
+        """Return the records matching every query term as ``Matches`` (key -> relevance).
+
+        The matching keys are found with set operations on the postings;
+        relevance is only computed for the records a caller reads, and
+        ``Matches.top`` ranks a page without scoring every match. With
+        ``fuzzy`` a term of ``FUZZY_MIN_LENGTH`` or more characters also
+        matches the ``FUZZY_CANDIDATES`` tokens most similar to it.
+        """
+        terms = tokenize(query)
+        total = len(self._doc_tokens) or 1
+        # (token, postings, score factor) for every token each term expands to
+        expanded = []
+        for term in dict.fromkeys(terms):
+            expansions = []
+            for token, quality in self._expand(term, fuzzy):
+                postings = self._postings.get(token)
+                if postings:
+                    expansions.append((token, postings, quality * math.log(1 + total / len(postings))))
+            if not expansions:
+                return Matches(self, [], set())
+            expanded.append(expansions)
+        if not expanded:
+            return Matches(self, [], set())
+
+        # Start from the rarest term; each later intersection in C walks the smaller side
+        ids = None
+        for expansions in sorted(expanded, key=lambda expansions: sum(len(p) for _, p, _ in expansions)):
+            keys = [self._key_sets.get(token, postings) for token, postings, _ in expansions]
+            if ids is None:
+                # A term matches the union of its tokens' postings; a lone key set is
+                # only read in C until it is copied below
+                ids = keys[0] if len(keys) == 1 and isinstance(keys[0], set) else set().union(*keys)
+                shared = ids is keys[0]
+            elif len(keys) == 1:
+                ids, shared = ids.intersection(keys[0]), False
+            else:
+                ids, shared = set().union(*(ids.intersection(k) for k in keys)), False
+            if not ids:
+                break
+        if shared:
+            ids = set(ids)
+        return Matches(self, expanded, ids)
+
+    @staticmethod
+    def rank(scores):
+        """Order search() results by descending (relevance, key)"""
+        return [doc_id for doc_id, _ in sorted(scores.items(), key=itemgetter(1, 0), reverse=True)]
+
+    def ranked(self, query, fuzzy=False, limit=None):
+        """Return matching keys ordered from most to least relevant, or the first limit of them"""
+        matches = self.search(query, fuzzy)
+        if limit:
+            return [doc_id for _, doc_id in matches.top(limit)]
+        return self.rank(matches)
+
+
+def group_by_weight(postings):
+    """Group a token's {key: weight} postings as {weight: set of keys}"""
+    groups = {}
+    for doc_id, weight in postings.copy().items():
+        groups.setdefault(weight, set()).add(doc_id)
+    return groups
+
+
+class Matches(Mapping):
+    """The records matching a search, as a read-only mapping of key -> relevance.
+
+    ``ids`` is the set of matching keys, so counting, filtering and
+    ordering by another field never score anything. A record's relevance
+    (per term, its best weighted match over the tokens the term expanded
+    to, summed over the terms) is computed the first time it is read.
+    ``top`` picks the best page without scoring every match.
+    """
+
+    def __init__(self, index, expanded, ids):
+        self.ids = ids
+        self._index = index
+        self._expanded = expanded
+        self._scores = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.ids
+
+    def __getitem__(self, doc_id):
+        score = self._scores.get(doc_id)
+        if score is None:
+            if doc_id not in self.ids:
+                raise KeyError(doc_id)
+            score = 0
+            for expansions in self._expanded:
+                best = 0
+                for _, postings, factor in expansions:
+                    weight = postings.get(doc_id)
+                    if weight is not None and factor * weight > best:
+                        best = factor * weight
+                score += best
+            self._scores[doc_id] = score
+        return score
+
+    def top(self, count, after=None, within=None):
+        """Return up to count (relevance, key) pairs, best first, that rank after ``after``.
+
+        ``after`` is the (relevance, key) position a previous page ended at
+        and ``within`` an optional set the keys must also belong to. Each
+        term splits its matches into levels of equal term score, so the
+        records in one level of every term (a cell) share one relevance.
+        Cells are visited best first and intersected with set operations,
+        stopping once the page is full; a small set of matches is simply
+        scored instead.
+        """
+        candidates = self.ids if within is None else self.ids & within
+        after = None if after is None else tuple(after)
+        if len(candidates) <= SCORE_ALL_MATCHES:
+            pairs = ((self[doc_id], doc_id) for doc_id in candidates)
+            return nlargest(count, (pair for pair in pairs if after is None or pair < after))
+        levels = [self._levels(expansions) for expansions in self._expanded]
+        first = (0,) * len(levels)
+        heap, queued, best = [(-sum(level[0][0] for level in levels), first)], {first}, []
+        while heap and (len(best) < count or -heap[0][0] >= best[count - 1][0]):
+            score, cell = heappop(heap)
+            score = -score
+            for term, position in enumerate(cell):
+                if position + 1 < len(levels[term]):
+                    step = cell[:term] + (position + 1,) + cell[term + 1:]
+                    if step not in queued:
+                        queued.add(step)
+                        heappush(heap, (-sum(levels[t][p][0] for t, p in enumerate(step)), step))
+            if after is not None and score > after[0]:
+                continue
+            ids = sorted((levels[term][position][1] for term, position in enumerate(cell)), key=len)
+            ids = ids[0].intersection(*ids[1:])
+            if within is not None:
+                ids &= within
+            if after is not None and score == after[0]:
+                ids = {doc_id for doc_id in ids if doc_id < after[1]}
+            best.extend((score, doc_id) for doc_id in nlargest(count, ids))
+        best.sort(reverse=True)
+        return best[:count]
+
+    def _levels(self, expansions):
+        """Split one term's matches into (term score, keys) levels, best first.
+
+        A record takes the score of its best matching token, so with
+        several tokens a record already in a higher level is dropped from
+        the lower ones.
+        """
+        groups = {}
+        for token, postings, factor in expansions:
+            for weight, ids in self._index._weight_groups(token, postings):
+                groups.setdefault(factor * weight, []).append(ids)
+        levels, placed = [], set()
+        for score in sorted(groups, reverse=True):
+            if len(expansions) == 1 and len(groups[score]) == 1:
+                # Only ever intersected in C into a new set, so a live group needs no copy
+                levels.append((score, groups[score][0]))
+                continue
+            ids = set().union(*groups[score]) - placed
+            placed |= ids
+            if ids:
+                levels.append((score, ids))
+        return levels
@@ -1,4 +1,7 @@
-from app import app
+from app import create_app
+
+# APP_PROFILE=production (or gunicorn -c gunicorn.conf.py) preloads the data and drops debug logging
+app = create_app()
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app.run(host="0.0.0.0", port=5000, debug=app.config['APP_PROFILE'] == 'development')
@@ -0,0 +1,124 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import threading
+from datetime import datetime
+
+# Functions listed per profile, by cumulative time
+TOP_FUNCTIONS = 20
+
+_NAME = re.compile(r'^[\w.-]+$')
+
+
+def rate_sampler(rate):
+    """Sampler that profiles a random fraction of requests (0 none, 1 all)"""
+    def sample(request):
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+    return sample
+
+
+class RequestProfiler:
+    """Runs sampled requests under cProfile and keeps the slow ones.
+
+    A request is only known to be slow once it has finished, so
+    ``sampler(request)`` picks which requests run under the profiler and
+    ``save`` is only called for those over the threshold. One request per
+    process is profiled at a time; requests overlapping it run unprofiled.
+    Each saved profile is a ``.prof`` file (readable with pstats or
+    snakeviz) plus a ``.json`` file describing the request.
+    """
+
+    def __init__(self, directory, threshold_ms, sampler, keep=100):
+        self.directory = directory
+        self.threshold_ms = threshold_ms
+        self.sampler = sampler
+        self.keep = keep
+        self._busy = threading.Lock()
+
+    def start(self, request):
+        """Start profiling if the request is sampled; returns the profile or None"""
+        if not self.sampler(request) or not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler or debugger already owns the hook
+            self._busy.release()
+            return None
+        return profile
+
+    def stop(self, profile):
+        profile.disable()
+        self._busy.release()
+
+    def is_slow(self, elapsed):
+        return elapsed * 1000 >= self.threshold_ms
+
+    def save(self, profile, elapsed, **details):
+        """Write a stopped profile and its request details; returns the profile name"""
+        os.makedirs(self.directory, exist_ok=True)
+        now = datetime.now()
+        slug = re.sub(r'[^\w]+', '_', details.get('route', '')).strip('_') or 'root'
+        name = f"{now:%Y%m%dT%H%M%S%f}-{os.getpid()}-{slug}"
+        profile.dump_stats(os.path.join(self.directory, name + '.prof'))
+
+        stats = pstats.Stats(profile).sort_stats('cumulative')
+        functions = []
+        for function in stats.fcn_list[:TOP_FUNCTIONS]:
+            _, calls, own_time, cumulative_time, _ = stats.stats[function]
+            functions.append({
+                "function": pstats.func_std_string(function),
+                "calls": calls,
+                "own_ms": round(own_time * 1000, 3),
+                "cumulative_ms": round(cumulative_time * 1000, 3),
+            })
+        summary = dict(details, name=name, created_at=now.isoformat(), pid=os.getpid(),
+                       duration_ms=round(elapsed * 1000, 3), functions=functions)
+        with open(os.path.join(self.directory, name + '.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        self._prune()
+        return name
+
+    def _prune(self):
+        """Delete the oldest profiles beyond ``keep``"""
+        names = _profile_names(self.directory)
+        for name in names[:max(len(names) - self.keep, 0)]:
+            for extension in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(self.directory, name + extension))
+                except FileNotFoundError:
+                    pass
+
+
+def _profile_names(directory):
+    """Saved profile names, oldest first (names start with a timestamp)"""
+    try:
+        files = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(f[:-5] for f in files if f.endswith('.json'))
+
+
+def list_profiles(directory):
+    """Return the saved profile summaries, newest first"""
+    summaries = []
+    for name in reversed(_profile_names(directory)):
+        try:
+            with open(os.path.join(directory, name + '.json')) as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            # Pruned by another worker, or still being written
+            continue
+    return summaries
+
+
+def profile_path(directory, name):
+    """Path of the .prof file for a saved profile, or None if there is none"""
+    if not _NAME.match(name):
+        return None
+    path = os.path.join(directory, name + '.prof')
+    return path if os.path.exists(path) else None
@@ -0,0 +1,21 @@
+import json
+import random
+
+
+class SampledWriteLog:
+    """Emits one structured JSON log record for a random sample of writes.
+
+    ``rate`` is the fraction of writes logged (0 disables, 1 logs all).
+    Callers check ``sampled()`` first so the record, which may need a
+    dataset count, is only built when it will be written.
+    """
+
+    def __init__(self, logger, rate):
+        self.logger = logger
+        self.rate = rate
+
+    def sampled(self):
+        return self.rate >= 1 or (self.rate > 0 and random.random() < self.rate)
+
+    def emit(self, **fields):
+        self.logger.info(json.dumps(dict(fields, sample_rate=self.rate), sort_keys=True))
@@ -0,0 +1,84 @@
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+# Streamed responses are flushed in chunks of roughly this size
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def available_encodings():
+    """Content codings this process can produce, most preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def choose_encoding(accept_encodings, encodings=None):
+    """Pick the best content coding the client accepts, or None for identity"""
+    for encoding in encodings or available_encodings():
+        if accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    """Compress a complete body with the given content coding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def _compressor(encoding):
+    """Return (compress, flush) callables for incremental compression"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        return compressor.process, compressor.finish
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+    return None, None
+
+
+def _stream(parts, encoding=None):
+    """Join encoded parts into chunks of about STREAM_CHUNK_BYTES, optionally compressed"""
+    process, finish = _compressor(encoding)
+    chunk, size = [], 0
+    for part in parts:
+        chunk.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_BYTES:
+            data = b''.join(chunk)
+            chunk, size = [], 0
+            data = process(data) if process else data
+            if data:
+                yield data
+    data = b''.join(chunk)
+    if process:
+        data = process(data) + finish()
+    yield data
+
+
+def stream_json_array(records, dumps, encoding=None):
+    """Yield a JSON array one record at a time, optionally compressed.
+
+    Only the current chunk is held in memory, so peak memory stays flat
+    however many records the response contains.
+    """
+    def parts():
+        yield b'['
+        for i, record in enumerate(records):
+            yield ((',' if i else '') + dumps(record)).encode('utf-8')
+        yield b']'
+    return _stream(parts(), encoding)
+
+
+def stream_ndjson(records, dumps, encoding=None):
+    """Yield one JSON document per line (NDJSON), optionally compressed"""
+    return _stream(((dumps(record) + '\n').encode('utf-8') for record in records), encoding)
@@ -0,0 +1,119 @@
+from indexes.sorted_index import sort_key
+
+
+class RangeFilter:
+    """Records whose field lies between low and high (either end may be open).
+
+    Bounds are compared as sort keys, so a numeric range never matches
+    string values and a string range never matches numbers; an open end
+    stays within the type of the given one. Records missing the field
+    never match. ``exclusive`` makes both given ends strict.
+    """
+
+    kind = 'range'
+
+    def __init__(self, field, low=None, high=None, exclusive=False):
+        if low is None and high is None:
+            raise ValueError("A range needs at least one bound")
+        self.field = field
+        self.low_value, self.high_value, self.exclusive = low, high, exclusive
+        numeric = sort_key(high if low is None else low)[0] == 0
+        # (1, '\0') sorts above (1, ''), the key of a missing value
+        self.low = sort_key(low) if low is not None else ((0,) if numeric else (1, '\0'))
+        self.high = sort_key(high) if high is not None else ((1,) if numeric else (2,))
+
+    def key(self):
+        """JSON-compatible description, used in cache keys and cursors"""
+        return ['range', self.field, self.low_value, self.high_value, self.exclusive]
+
+    def contains_key(self, key):
+        """True if a record indexed under sort key ``key`` passes the filter"""
+        if key is None:
+            return False
+        return self.low < key < self.high if self.exclusive else self.low <= key <= self.high
+
+    def matches(self, record):
+        return self.field in record and self.contains_key(sort_key(record[self.field]))
+
+
+class ValueFilter:
+    """Records whose field equals one of a set of string values"""
+
+    kind = 'in'
+
+    def __init__(self, field, values):
+        self.field = field
+        self.values = frozenset(values)
+
+    def key(self):
+        """JSON-compatible description, used in cache keys and cursors"""
+        return ['in', self.field, sorted(self.values)]
+
+    def matches(self, record):
+        return record.get(self.field) in self.values
+
+
+class IndexSource:
+    """Answers filters from a store's in-memory indexes.
+
+    A ``RangeFilter`` uses the ``sort:<field>`` SortedIndex and a
+    ``ValueFilter`` the ``facet:<field>`` FacetIndex.
+    """
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    def estimate(self, f):
+        """Number of records the filter matches, without collecting them"""
+        if f.kind == 'range':
+            return self.indexes[f'sort:{f.field}'].count_range(f.low, f.high, f.exclusive)
+        index = self.indexes[f'facet:{f.field}']
+        return sum(index.count(value) for value in f.values)
+
+    def ids(self, f):
+        """The keys of every record the filter matches"""
+        if f.kind == 'range':
+            return self.indexes[f'sort:{f.field}'].range(f.low, f.high, f.exclusive)
+        index = self.indexes[f'facet:{f.field}']
+        return [doc_id for value in f.values for doc_id in index.ids(value)]
+
+    def contains(self, f, doc_id):
+        """True if the record with key doc_id passes the filter"""
+        if f.kind == 'range':
+            return f.contains_key(self.indexes[f'sort:{f.field}'].key_of(doc_id))
+        return self.indexes[f'facet:{f.field}'].value(doc_id) in f.values
+
+    def counts(self, field, ids=None):
+        """Facet counts for field over ids, or over every record"""
+        return self.indexes[f'facet:{field}'].counts(ids)
+
+
+def matching_ids(source, filters, candidates=None):
+    """Return the set of ids passing every filter, or None when nothing restricts the result.
+
+    The planner starts from whichever of ``candidates`` (e.g. search hits)
+    and the filters is expected to match the fewest records, as estimated
+    by the source without collecting ids, and narrows that set with each
+    remaining filter from most to least selective. A filter no larger than
+    the current set is collected and intersected; a larger one only tests
+    the surviving ids, so work follows the most selective filter rather
+    than the catalogue size.
+    """
+    planned = sorted(((source.estimate(f), f) for f in filters), key=lambda pair: pair[0])
+    if candidates is not None:
+        if planned and planned[0][0] < len(candidates):
+            ids = {doc_id for doc_id in source.ids(planned.pop(0)[1]) if doc_id in candidates}
+        else:
+            ids = set(candidates)
+    elif planned:
+        ids = set(source.ids(planned.pop(0)[1]))
+    else:
+        return None
+    for size, f in planned:
+        if not ids:
+            break
+        if size <= len(ids):
+            ids.intersection_update(source.ids(f))
+        else:
+            ids = {doc_id for doc_id in ids if source.contains(f, doc_id)}
+    return ids
@@ -0,0 +1,61 @@
+import json
+import base64
+import binascii
+
+# Largest page a client may ask for with ?limit=
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a ?cursor= value cannot be decoded or belongs to another query"""
+
+
+def _as_tuple(value):
+    """Turn the nested lists JSON gives back into comparable tuples"""
+    return tuple(_as_tuple(v) for v in value) if isinstance(value, list) else value
+
+
+def encode_cursor(position, query):
+    """Encode a keyset position and the query it belongs to as an opaque token"""
+    raw = json.dumps({'p': position, 'q': query}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, query):
+    """Return the keyset position stored in a cursor issued for the same query"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        position, issued_for = payload['p'], payload['q']
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise InvalidCursor("Invalid cursor")
+    if issued_for != query:
+        raise InvalidCursor("Cursor does not match this query")
+    return _as_tuple(position)
+
+
+def position_after(ids, key_of, after, descending=False):
+    """Index of the first id in an ordered list whose key comes after ``after``"""
+    lo, hi = 0, len(ids)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        key = key_of(ids[mid])
+        if (key < after) if descending else (key > after):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def project_record(record, fields):
+    """Keep only the requested fields of one record"""
+    if not fields:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def project(records, fields):
+    """Keep only the requested fields of each record"""
+    if not fields:
+        return records
+    return [project_record(record, fields) for record in records]
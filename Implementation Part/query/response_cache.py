@@ -0,0 +1,109 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+from query.encoding import compress
+
+# Default memory budget for cached response bodies
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# encodings maps a content coding ('gzip', 'br') to the compressed body
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag', 'headers', 'encodings'])
+
+
+class ResponseCache:
+    """LRU cache of encoded response bodies, bounded by total size in bytes.
+
+    Compressed variants of a body are produced on first request and kept
+    on the entry, counting towards the same budget.
+
+    Entries belong to a generation (the store path and its dataset version).
+    Looking up or storing under a new generation drops everything cached
+    for the old one, so a mutation invalidates the cache the moment the
+    next request sees the bumped version.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._generation = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_size(entry):
+        return len(entry.body) + sum(len(data) for data in entry.encodings.values())
+
+    def _switch_generation(self, generation):
+        if generation != self._generation:
+            self._entries.clear()
+            self._bytes = 0
+            self._generation = generation
+
+    def get(self, generation, key):
+        """Return the cached entry for key, or None"""
+        with self._lock:
+            self._switch_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, generation, key, body, headers=None):
+        """Cache an encoded body with a strong ETag and return the entry"""
+        entry = CachedResponse(body, hashlib.sha1(body).hexdigest(), dict(headers or {}), {})
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return entry
+        with self._lock:
+            self._switch_generation(generation)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._entry_size(previous)
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(evicted)
+                self.evictions += 1
+        return entry
+
+    def encoded(self, key, entry, encoding):
+        """Return entry's body compressed with encoding, caching the result"""
+        data = entry.encodings.get(encoding)
+        if data is not None:
+            return data
+        # Compress outside the lock; a duplicate effort is harmless
+        data = compress(entry.body, encoding)
+        with self._lock:
+            if encoding not in entry.encodings:
+                entry.encodings[encoding] = data
+                if self._entries.get(key) is entry:
+                    self._bytes += len(data)
+                    while self._bytes > self.max_bytes and len(self._entries) > 1:
+                        _, evicted = self._entries.popitem(last=False)
+                        self._bytes -= self._entry_size(evicted)
+                        self.evictions += 1
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,203 @@
+import asyncio
+import contextvars
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Request bodies up to this size stay in memory; larger ones spill to a temp file
+SPOOL_BYTES = 1024 * 1024
+
+# Response chunks gathered per thread-pool hop before they are sent
+SEND_CHUNK_BYTES = 64 * 1024
+
+_DONE = object()
+
+
+class WsgiToAsgi:
+    """Serves a WSGI app (the Flask app) over ASGI from a bounded set of threads.
+
+    The event loop does the client I/O: it reads the whole request body
+    before the app runs and sends the response as the app produces it, so
+    a slow client costs a coroutine rather than a worker thread. The app
+    itself, and with it every storage read and write, runs on one of
+    ``max_workers`` threads, one hop per request plus one per
+    ``SEND_CHUNK_BYTES`` of a streamed response. ``max_workers`` therefore
+    bounds concurrent request handling, not concurrent connections.
+
+    Every hop of a request runs on the same thread (its lane), because a
+    streamed body can hold per-thread state, such as a SQLite cursor on
+    the request thread's connection. A request takes the lane with the
+    fewest requests in flight.
+
+    asgiref's WsgiToAsgi runs every request on one shared thread and keeps
+    that thread while the client reads. With 1000 clients taking 0.1 s
+    each way it served 9.7 req/s, against about 1000 req/s for this
+    adapter with 8 threads (benchmarks/bench_asgi.py).
+    """
+
+    def __init__(self, wsgi_app, max_workers=32):
+        self.wsgi_app = wsgi_app
+        self.lanes = [ThreadPoolExecutor(1, thread_name_prefix=f'asgi-{i}') for i in range(max_workers)]
+        # Requests in flight per lane; only touched on the event loop
+        self._in_flight = [0] * max_workers
+
+    def shutdown(self, wait=True):
+        """Stop every lane's thread"""
+        for lane in self.lanes:
+            lane.shutdown(wait=wait)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        lane = min(range(len(self.lanes)), key=self._in_flight.__getitem__)
+        self._in_flight[lane] += 1
+        try:
+            await self._serve(loop, self.lanes[lane], scope, receive, send)
+        finally:
+            self._in_flight[lane] -= 1
+
+    async def _serve(self, loop, executor, scope, receive, send):
+        body, size = await self._read_body(loop, executor, receive)
+        if body is None:
+            return  # client went away before sending the whole request
+        response = _StartResponse()
+        # Every hop for this request runs in one context, so a generator that
+        # pushes a Flask context in one hop can pop it in another
+        context = contextvars.copy_context()
+        try:
+            iterable = await loop.run_in_executor(executor, context.run, self.wsgi_app,
+                                                  self.environ(scope, body, size), response)
+        except Exception:
+            body.close()
+            await _send_error(send)
+            raise
+        try:
+            chunks = iter(iterable)
+            started = False
+            while True:
+                data = await loop.run_in_executor(executor, context.run, _next_chunks, chunks)
+                if data is _DONE:
+                    break
+                if not started:
+                    await self._start(send, response)
+                    started = True
+                await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+            if not started:
+                await self._start(send, response)
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            if hasattr(iterable, 'close'):
+                await loop.run_in_executor(executor, context.run, iterable.close)
+            body.close()
+
+    @staticmethod
+    async def _start(send, response):
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': response.headers})
+        if response.written:
+            await send({'type': 'http.response.body', 'body': b''.join(response.written), 'more_body': True})
+
+    async def _read_body(self, loop, executor, receive):
+        """Buffer the request body, off the loop once it spills to disk"""
+        body = tempfile.SpooledTemporaryFile(SPOOL_BYTES)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None, 0
+            chunk = message.get('body', b'')
+            if chunk:
+                size += len(chunk)
+                if size > SPOOL_BYTES:
+                    await loop.run_in_executor(executor, body.write, chunk)
+                else:
+                    body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body, size
+
+    @staticmethod
+    def environ(scope, body, size):
+        """Build the WSGI environ for an ASGI http scope and a buffered body"""
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1] or 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'CONTENT_LENGTH': str(size),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if scope.get('client'):
+            environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_LENGTH':
+                continue  # the body is fully read, so its real size wins
+            key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+class _StartResponse:
+    """WSGI start_response callable that remembers status and headers"""
+
+    def __init__(self):
+        self.status = None
+        self.headers = []
+        # Bytes passed to the legacy write() callable, sent before the body
+        self.written = []
+
+    def __call__(self, status, headers, exc_info=None):
+        if exc_info and self.status is not None:
+            raise exc_info[1].with_traceback(exc_info[2])
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in headers]
+        return self.written.append
+
+
+def _next_chunks(chunks):
+    """Pull response chunks until SEND_CHUNK_BYTES are ready; _DONE when exhausted"""
+    parts, size = [], 0
+    for chunk in chunks:
+        if chunk:
+            parts.append(chunk)
+            size += len(chunk)
+            if size >= SEND_CHUNK_BYTES:
+                break
+    return b''.join(parts) if parts else _DONE
+
+
+async def _send_error(send):
+    await send({'type': 'http.response.start', 'status': 500,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': b'Internal Server Error'})
@@ -43,6 +43,55 @@ class AttractionAPI {
         }
     }
     
+    /**
+     * Get one page of attractions using keyset pagination
+     * @param {string} searchTerm - Optional search term to filter attractions
+     * @param {string} sortBy - Field to sort by (name, location, rating, created_at, relevance)
+     * @param {string} order - Sort order (asc, desc)
+     * @param {string|null} cursor - Cursor from the previous page, or null for the first page
+     * @param {number} limit - Maximum number of attractions in the page
+     * @param {Array<string>} fields - Fields to return for each attraction (all if empty)
+     * @returns {Promise<Object>} - Promise resolving to {items, total, limit, next_cursor}
+     */
+    static async getAttractionsPage(searchTerm = '', sortBy = 'name', order = 'asc', cursor = null, limit = 24, fields = []) {
+        try {
+            const params = new URLSearchParams();
+            
+            if (searchTerm) {
+                params.append('search', searchTerm);
+            }
+            
+            if (sortBy) {
+                params.append('sort_by', sortBy);
+            }
+            
+            if (order) {
+                params.append('order', order);
+            }
+            
+            params.append('limit', limit);
+            
+            if (cursor) {
+                params.append('cursor', cursor);
+            }
+            
+            if (fields.length) {
+                params.append('fields', fields.join(','));
+            }
+            
+            const response = await fetch(`/api/attractions?${params.toString()}`);
+            
+            if (!response.ok) {
+                throw new Error(`Error: ${response.status} - ${response.statusText}`);
+            }
+            
+            return await response.json();
+        } catch (error) {
+            console.error('Failed to fetch attractions page:', error);
+            throw error;
+        }
+    }
+    
     /**
      * Get a single attraction by ID
      * @param {string} id - The attraction ID
@@ -63,6 +112,33 @@ class AttractionAPI {
         }
     }
     
+    /**
+     * Get several attractions by ID in one request
+     * @param {Array<string>} ids - The attraction IDs
+     * @returns {Promise<Object>} - Promise resolving to {attractions, etags, missing}
+     */
+    static async getAttractionsBatch(ids) {
+        try {
+            const response = await fetch('/api/attractions/batch-get', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ ids })
+            });
+            
+            if (!response.ok) {
+                const errorData = await response.json();
+                throw new Error(errorData.error || `Error: ${response.status}`);
+            }
+            
+            return await response.json();
+        } catch (error) {
+            console.error('Failed to fetch attractions batch:', error);
+            throw error;
+        }
+    }
+    
     /**
      * Create a new attraction
      * @param {Object} attractionData - The attraction data to create
@@ -140,4 +216,31 @@ class AttractionAPI {
             throw error;
         }
     }
+    
+    /**
+     * Apply many updates and deletes atomically
+     * @param {Array<Object>} operations - Items like {op: 'update', id, fields} or {op: 'delete', id}
+     * @returns {Promise<Object>} - Promise resolving to {applied, results}; nothing is applied if any item fails
+     */
+    static async updateAttractionsBatch(operations) {
+        try {
+            const response = await fetch('/api/attractions/batch', {
+                method: 'PATCH',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ operations })
+            });
+            
+            if (!response.ok && response.status !== 409) {
+                const errorData = await response.json();
+                throw new Error(errorData.error || `Error: ${response.status}`);
+            }
+            
+            return await response.json();
+        } catch (error) {
+            console.error('Failed to apply attractions batch:', error);
+            throw error;
+        }
+    }
 }
@@ -33,8 +33,23 @@ let currentSortBy = 'name';
 let currentOrder = 'asc';
 let currentDeleteId = null;
 
+// Infinite scroll state
+const PAGE_SIZE = 24;
+const GRID_FIELDS = ['id', 'name', 'location', 'rating', 'image_url', 'website'];
+let nextCursor = null;
+let isLoadingPage = false;
+let loadGeneration = 0;
+const scrollSentinel = document.createElement('div');
+scrollSentinel.className = 'col-12';
+scrollSentinel.id = 'scrollSentinel';
+const scrollObserver = new IntersectionObserver(entries => {
+    if (entries.some(entry => entry.isIntersecting)) loadNextPage();
+}, { rootMargin: '400px' });
+
 // Initialize the application
 document.addEventListener('DOMContentLoaded', () => {
+    attractionsList.after(scrollSentinel);
+    scrollObserver.observe(scrollSentinel);
     loadAttractions();
     
     // Event Listeners
@@ -63,19 +78,27 @@ document.addEventListener('DOMContentLoaded', () => {
 });
 
 /**
- * Loads attractions from the API with current search and sort parameters
+ * Loads the first page of attractions with current search and sort parameters
  */
 async function loadAttractions() {
+    const generation = ++loadGeneration;
+    nextCursor = null;
     showLoading(true);
     
     try {
-        const attractions = await AttractionAPI.getAttractions(
+        const page = await AttractionAPI.getAttractionsPage(
             currentSearchTerm, 
             currentSortBy, 
-            currentOrder
+            currentOrder,
+            null,
+            PAGE_SIZE,
+            GRID_FIELDS
         );
         
-        renderAttractions(attractions);
+        // Ignore responses for a search or sort the user has already replaced
+        if (generation !== loadGeneration) return;
+        nextCursor = page.next_cursor;
+        renderAttractions(page.items);
     } catch (error) {
         showToast('Error', `Failed to load attractions: ${error.message}`, true);
     } finally {
@@ -83,23 +106,49 @@ async function loadAttractions() {
     }
 }
 
+/**
+ * Appends the next page of attractions when the user scrolls near the end
+ */
+async function loadNextPage() {
+    if (!nextCursor || isLoadingPage) return;
+    
+    const generation = loadGeneration;
+    isLoadingPage = true;
+    
+    try {
+        const page = await AttractionAPI.getAttractionsPage(
+            currentSearchTerm, 
+            currentSortBy, 
+            currentOrder,
+            nextCursor,
+            PAGE_SIZE,
+            GRID_FIELDS
+        );
+        
+        if (generation !== loadGeneration) return;
+        nextCursor = page.next_cursor;
+        renderAttractions(page.items, true);
+    } catch (error) {
+        showToast('Error', `Failed to load more attractions: ${error.message}`, true);
+    } finally {
+        isLoadingPage = false;
+    }
+}
+
 /**
  * Renders attractions to the DOM
  * @param {Array} attractions - Array of attraction objects to render
+ * @param {boolean} append - Add to the attractions already shown instead of replacing them
  */
-function renderAttractions(attractions) {
+function renderAttractions(attractions, append = false) {
     // Clear existing attractions
-    while (attractionsList.firstChild) {
-        if (attractionsList.firstChild.id === 'loadingIndicator' || 
-            attractionsList.firstChild.id === 'noAttractionsMessage') {
-            break;
-        }
-        attractionsList.removeChild(attractionsList.firstChild);
+    if (!append) {
+        attractionsList.querySelectorAll('.attraction-item').forEach(el => el.remove());
     }
     
     // Show no attractions message if empty
     if (attractions.length === 0) {
-        noAttractionsMessage.classList.remove('d-none');
+        if (!append) noAttractionsMessage.classList.remove('d-none');
         return;
     }
     
@@ -108,7 +157,7 @@ function renderAttractions(attractions) {
     // Render each attraction
     attractions.forEach(attraction => {
         const col = document.createElement('div');
-        col.className = 'col-md-4 mb-4';
+        col.className = 'col-md-4 mb-4 attraction-item';
         
         // Format the rating as stars
         const ratingStars = generateRatingStars(attraction.rating);
@@ -135,7 +184,7 @@ function renderAttractions(attractions) {
                     <div class="attraction-rating">
                         ${ratingStars}
                     </div>
-                    <p class="card-text">${truncateText(attraction.description, 120)}</p>
+                    ${attraction.description ? `<p class="card-text">${truncateText(attraction.description, 120)}</p>` : ''}
                     
                     <div class="card-actions">
                         <div>
@@ -0,0 +1,140 @@
+import os
+import re
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib codec is always available
+    orjson = None
+
+# Pretty output keeps the data file layout json.dump(data, f, indent=4) has always
+# written: four-space indents and non-ASCII characters escaped as \uXXXX
+INDENT = 4
+
+# Characters json.dumps escapes as \uXXXX that orjson writes raw: non-ASCII and DEL
+_NON_ASCII = re.compile('[^\x00-\x7e]')
+
+
+def _plain_floats(obj):
+    """Whether orjson writes every float in a list or dict as repr() does: finite, and zero or 1e-4 <= |x| < 1e16.
+
+    Outside that range repr() switches to an exponent (1e-05, 1e+16) which
+    orjson writes differently (0.00001, 1e16), and orjson writes NaN and
+    infinities as null.
+    """
+    stack = [obj]
+    while stack:
+        container = stack.pop()
+        for value in container.values() if isinstance(container, dict) else container:
+            if type(value) is float:
+                if value and not 1e-4 <= abs(value) < 1e16:
+                    return False
+            elif isinstance(value, (dict, list, tuple)):
+                stack.append(value)
+    return True
+
+
+def _escape_non_ascii(match):
+    """The \\uXXXX escape (a surrogate pair beyond the BMP) json.dumps writes for a character"""
+    code = ord(match.group())
+    if code < 0x10000:
+        return '\\u{0:04x}'.format(code)
+    code -= 0x10000
+    return '\\u{0:04x}\\u{1:04x}'.format(0xd800 | (code >> 10), 0xdc00 | (code & 0x3ff))
+
+
+class StdlibCodec:
+    """JSON codec built on the standard library json module"""
+
+    name = 'stdlib'
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+    @staticmethod
+    def dumps(obj, pretty=False, sort_keys=False):
+        """Encode obj as compact UTF-8 bytes, or pretty in the data file layout"""
+        if pretty:
+            text = json.dumps(obj, indent=INDENT, sort_keys=sort_keys)
+        else:
+            text = json.dumps(obj, separators=(',', ':'), ensure_ascii=False, sort_keys=sort_keys)
+        return text.encode('utf-8')
+
+
+class OrjsonCodec:
+    """JSON codec built on orjson.
+
+    Pretty output is byte-for-byte what StdlibCodec writes, so the data
+    file does not change when orjson is installed or removed: data holding
+    floats orjson formats differently from repr(), or values it cannot
+    encode at all, is written by the stdlib codec. Compact output decodes to
+    the same values, though a float can be spelt differently (1e16 for
+    1e+16).
+    """
+
+    name = 'orjson'
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+    @staticmethod
+    def dumps(obj, pretty=False, sort_keys=False):
+        if pretty and not _plain_floats(obj):
+            return StdlibCodec.dumps(obj, pretty, sort_keys)
+        option = (orjson.OPT_INDENT_2 if pretty else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            data = orjson.dumps(obj, option=option)
+        except orjson.JSONEncodeError:
+            return StdlibCodec.dumps(obj, pretty, sort_keys)
+        return OrjsonCodec._file_layout(data) if pretty else data
+
+    @staticmethod
+    def _file_layout(data):
+        """Turn orjson's two-space, UTF-8 output into the stdlib's indent=4, ASCII-escaped layout.
+
+        Strings escape newlines, so every indent follows a newline. Pass
+        ``level`` adds two spaces to each line at least that deep: before it
+        such a line starts with ``4 * level - 2`` or more spaces, while a
+        line one level shallower is already final at ``4 * level - 4``.
+        Only strings hold non-ASCII characters or DEL, so escaping them all
+        is safe.
+        """
+        level = 1
+        while b'\n' + b' ' * (4 * level - 2) in data:
+            data = data.replace(b'\n' + b' ' * (4 * level - 2), b'\n' + b' ' * (4 * level))
+            level += 1
+        if not data.isascii() or b'\x7f' in data:
+            data = _NON_ASCII.sub(_escape_non_ascii, data.decode('utf-8')).encode('ascii')
+        return data
+
+
+CODECS = {'stdlib': StdlibCodec}
+if orjson is not None:
+    CODECS['orjson'] = OrjsonCodec
+
+
+def select_codec(name=None):
+    """Return the named codec, or the fastest one installed"""
+    if name:
+        if name not in CODECS:
+            logging.error(f"JSON backend {name} is not available, using {StdlibCodec.name}")
+            return StdlibCodec
+        return CODECS[name]
+    return CODECS.get('orjson', StdlibCodec)
+
+
+# Process-wide codec; JSON_BACKEND=stdlib forces the standard library
+codec = select_codec(os.environ.get("JSON_BACKEND"))
+
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    return codec.loads(data)
+
+
+def dumps(obj, pretty=False, sort_keys=False):
+    """Encode obj as UTF-8 JSON bytes"""
+    return codec.dumps(obj, pretty, sort_keys)
@@ -0,0 +1,136 @@
+import json
+import re
+import sys
+
+from storage import codec
+
+# String fields whose values repeat across attractions and are kept once. Not
+# descriptions: nearly every one is unique, so interning them only adds the intern
+# table and a lookup per record (1M synthetic attractions: +59 MiB RSS and +1.0 s
+# load, 1176 MiB / 12.7 s against 1117 MiB / 11.6 s with locations alone)
+INTERNED_FIELDS = ('location',)
+
+# Records encoded per codec call when a compact list is written out
+ENCODE_CHUNK = 4096
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class CompactRecords:
+    """List of attractions held as tuples instead of dicts.
+
+    Each record is stored as ``(keys, value, value, ...)`` where ``keys``
+    is one tuple shared by every record with the same fields in the same
+    order, so an eight-field attraction costs a 9-slot tuple rather than a
+    dict and its hash table. Values of ``interned`` fields are interned so
+    repeated locations are stored once. Reads hand out a fresh dict with
+    the original key order, so serialising it gives exactly the JSON that
+    was loaded.
+
+    Supports the list operations the stores use: ``len``, indexing,
+    assignment, ``append``, iteration and ``copy``. Assigning None leaves
+    a hole, read back as None, until ``without_holes`` drops it.
+    """
+
+    def __init__(self, records=(), interned=INTERNED_FIELDS):
+        self.interned = frozenset(interned)
+        self._shapes = {}
+        self._packed = [self.pack(record) for record in records]
+
+    @classmethod
+    def from_json(cls, data, interned=INTERNED_FIELDS):
+        """Parse a JSON array of attractions one record at a time.
+
+        Only one record exists as a dict at any moment, so loading never
+        holds the whole catalogue as dicts and memory freed by the parser
+        is reused instead of staying resident.
+        """
+        compact = cls(interned=interned)
+        compact._packed = [compact.pack(record) for record in _iter_array(data.decode('utf-8'))]
+        return compact
+
+    def pack(self, record):
+        """Return the tuple form of an attraction dict"""
+        keys = tuple(record)
+        shape = self._shapes.get(keys)
+        if shape is None:
+            shape = self._shapes[keys] = tuple(sys.intern(key) for key in keys)
+        interned = self.interned
+        return (shape,) + tuple(
+            sys.intern(value) if key in interned and type(value) is str else value
+            for key, value in zip(shape, record.values()))
+
+    @staticmethod
+    def unpack(packed):
+        """Return the attraction dict for a packed tuple"""
+        return dict(zip(packed[0], packed[1:]))
+
+    def __len__(self):
+        return len(self._packed)
+
+    def __getitem__(self, position):
+        packed = self._packed[position]
+        return None if packed is None else self.unpack(packed)
+
+    def __setitem__(self, position, record):
+        self._packed[position] = None if record is None else self.pack(record)
+
+    def __iter__(self):
+        return map(self.unpack, self._packed)
+
+    def append(self, record):
+        self._packed.append(self.pack(record))
+
+    def copy(self):
+        """Shallow copy; packed tuples are immutable so nothing is unpacked"""
+        compact = CompactRecords(interned=self.interned)
+        compact._shapes = self._shapes
+        compact._packed = list(self._packed)
+        return compact
+
+    def without_holes(self):
+        """Copy without the holes left by None assignments, keeping the order"""
+        compact = CompactRecords(interned=self.interned)
+        compact._shapes = self._shapes
+        compact._packed = [packed for packed in self._packed if packed is not None]
+        return compact
+
+    def iter_json(self):
+        """Yield the pretty JSON array codec.dumps(list(self), pretty=True) would write.
+
+        Records are unpacked and encoded ENCODE_CHUNK at a time so writing a
+        large catalogue never holds every record as a dict at once.
+        """
+        packed = self._packed
+        if not packed:
+            yield codec.dumps([], pretty=True)
+            return
+        yield b'[\n'
+        for start in range(0, len(packed), ENCODE_CHUNK):
+            chunk = codec.dumps([self.unpack(p) for p in packed[start:start + ENCODE_CHUNK]], pretty=True)
+            if start:
+                yield b',\n'
+            # Drop the chunk's own "[\n" and "\n]"
+            yield chunk[2:-2]
+        yield b'\n]'
+
+
+def _iter_array(text):
+    """Yield the elements of the JSON array in text"""
+    decoder = json.JSONDecoder()
+    position = _WHITESPACE.match(text).end()
+    if text[position:position + 1] != '[':
+        raise json.JSONDecodeError("Expecting '['", text, position)
+    position = _WHITESPACE.match(text, position + 1).end()
+    if text[position:position + 1] == ']':
+        return
+    while True:
+        value, position = decoder.raw_decode(text, position)
+        yield value
+        position = _WHITESPACE.match(text, position).end()
+        delimiter = text[position:position + 1]
+        if delimiter == ']':
+            return
+        if delimiter != ',':
+            raise json.JSONDecodeError("Expecting ',' delimiter", text, position)
+        position = _WHITESPACE.match(text, position + 1).end()
@@ -0,0 +1,31 @@
+"""Copy a JSON attractions file into the SQLite database used by STORAGE_MODE=sqlite.
+
+    python -m storage.import_sqlite data/attractions.json --db data/attractions.db
+
+Replaces whatever the database held. A new database is filled from the
+data file automatically, so this is only needed to re-import.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage.sqlite_store import SqliteAttractionStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('data_file', nargs='?', default='data/attractions.json')
+    parser.add_argument('--db', help="database path (default: data file with a .db extension)")
+    args = parser.parse_args()
+
+    store = SqliteAttractionStore(args.data_file, db_path=args.db)
+    start = time.perf_counter()
+    count = store.import_json()
+    print(f"imported {count} attractions into {store.db_path} in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from storage import codec
+from storage.compact import CompactRecords
+from storage.locking import FileLock
+
+# add_many() rebuilds the indexes instead of updating them record by record
+# once a batch is at least 1/REINDEX_RATIO of the resulting dataset
+REINDEX_RATIO = 64
+
+
+class AttractionStore:
+    """Keeps the parsed attractions file resident in memory.
+
+    The file is only re-parsed when its inode, size or mtime changes, so
+    edits made by other gunicorn workers or by hand are picked up on the
+    next access while unchanged data is served straight from memory.
+
+    An id -> position index is kept next to the list so single-record
+    lookups, updates and deletes cost O(1) instead of a scan. A delete
+    leaves a hole (None) in its slot rather than moving other records, so
+    the file and exports keep their order; holes are skipped when the list
+    is written out and closed once they make up 1/REINDEX_RATIO of it.
+
+    Secondary indexes (search, sorting, ...) register with ``ensure_index``
+    and are told about every load and mutation through ``reset``, ``put``
+    and ``delete`` calls, so they are never rebuilt per request.
+
+    With ``compact_records`` the list is a ``CompactRecords`` that holds
+    each attraction as a tuple and hands out dicts on access, trading a
+    little CPU per read for far less memory on large catalogues.
+
+    Writers serialise on ``write_lock()``, which also holds an advisory
+    lock on ``<data file>.lock`` so gunicorn workers never interleave a
+    read-modify-write. Readers never wait for it: while a writer in this
+    process is busy they are served the cached copy.
+    """
+
+    # Queries are answered by the in-memory indexes, not by the store
+    native_queries = False
+
+    def __init__(self, path, compact_records=False):
+        self.path = path
+        self.compact_records = compact_records
+        self._records = []
+        self._positions = {}
+        # Positions of deleted records still holding a None slot in the list
+        self._holes = []
+        self._stat_key = None
+        self._loaded = False
+        # Bumped whenever the cached data changes, from any source
+        self.version = 0
+        self.indexes = {}
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path + '.lock')
+
+    def _current_stat_key(self):
+        """Return (inode, size, mtime) for the data file, or None if missing"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def refresh(self):
+        """Re-read the file if it changed since it was last loaded"""
+        key = self._current_stat_key()
+        if self._loaded and key == self._stat_key:
+            return
+        # Only the very first load waits; otherwise a busy writer means we
+        # serve the cached copy rather than block
+        if not self._lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            # Stat again under the lock; another thread may have reloaded
+            key = self._current_stat_key()
+            if key is None:
+                self._set_records([])
+                self._stat_key = None
+                self._loaded = True
+            elif key != self._stat_key or not self._loaded:
+                self._load(key)
+        finally:
+            self._lock.release()
+
+    def _load(self, key):
+        """Parse the data file and remember the stat key it was read at"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = self._parse(f.read())
+        except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
+            # Keep serving the last good copy and retry on the next access
+            logging.error(f"Error reading from {self.path}. Keeping {len(self._records)} cached records.")
+            return
+        self._set_records(data)
+        self._stat_key = key
+        self._loaded = True
+
+    def _parse(self, data):
+        """Parse data file bytes into the cached list representation"""
+        if self.compact_records:
+            return CompactRecords.from_json(data)
+        return codec.loads(data)
+
+    def _set_records(self, records):
+        """Adopt records as the cached list and rebuild the id index"""
+        self._positions = {a.get('id'): i for i, a in enumerate(records)}
+        self._holes = []
+        for index in self.indexes.values():
+            index.reset(records)
+        if self.compact_records and not isinstance(records, CompactRecords):
+            records = CompactRecords(records)
+        self._records = records
+        self.version += 1
+
+    def ensure_index(self, name, factory):
+        """Return the named index, building it from factory() on first use"""
+        index = self.indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = self.indexes.get(name)
+                if index is None:
+                    self.refresh()
+                    index = factory()
+                    index.reset(self._live(self._records))
+                    self.indexes[name] = index
+        return index
+
+    def invalidate(self):
+        """Drop the cached copy so the next access re-reads the file"""
+        with self._lock:
+            self._loaded = False
+
+    @contextmanager
+    def write_lock(self):
+        """Hold the cross-process write lock with the cache brought up to date.
+
+        Re-entrant, so a handler can read, check and mutate in one critical
+        section while add/replace/remove take the lock again inside it.
+        """
+        with self._lock, self._file_lock:
+            self.refresh()
+            yield self
+
+    def current_version(self):
+        """Return the dataset version after picking up any outside changes"""
+        self.refresh()
+        return self.version
+
+    def records(self):
+        """Return the cached attraction list (callers must not mutate it)"""
+        self.refresh()
+        return self._live(self._records)
+
+    def count(self):
+        """Return the number of attractions"""
+        self.refresh()
+        return len(self._records) - len(self._holes)
+
+    def get(self, attraction_id):
+        """Return the attraction with the given id, or None"""
+        self.refresh()
+        records, position = self._records, self._positions.get(attraction_id)
+        if position is None:
+            return None
+        if position < len(records):
+            record = records[position]
+            if record is not None and record.get('id') == attraction_id:
+                return record
+        # A concurrent reload swapped the list under us; look again under the lock
+        with self._lock:
+            position = self._positions.get(attraction_id)
+            return None if position is None else self._records[position]
+
+    def iter_records(self):
+        """Iterate over a snapshot of the attractions without copying the records"""
+        return iter(self.records().copy())
+
+    def lookup(self, ids):
+        """Return the attractions for ids in the same order, skipping unknown ids"""
+        self.refresh()
+        records, positions = self._records, self._positions
+        return [records[position] for position in map(positions.get, ids) if position is not None]
+
+    def iter_lookup(self, ids):
+        """Iterate over the attractions for ids in the same order, skipping unknown ids.
+
+        Positions are resolved up front against a snapshot of the list, but
+        compact records are only unpacked as the caller reaches them.
+        """
+        self.refresh()
+        records, positions = self._records.copy(), self._positions
+        found = [position for position in map(positions.get, ids) if position is not None]
+        return map(records.__getitem__, found)
+
+    def add(self, attraction):
+        """Append a new attraction and persist"""
+        with self.write_lock():
+            self._apply_put(attraction)
+            self._persist_put(attraction)
+
+    def add_many(self, attractions):
+        """Append new attractions and persist them with a single write"""
+        with self.write_lock():
+            if len(attractions) * REINDEX_RATIO >= len(self._records) + len(attractions):
+                # One index rebuild beats many ordered inserts into large lists
+                self._drop_holes()
+                records, positions = self._records.copy(), dict(self._positions)
+                for attraction in attractions:
+                    position = positions.get(attraction['id'])
+                    if position is None:
+                        positions[attraction['id']] = len(records)
+                        records.append(attraction)
+                    else:
+                        records[position] = attraction
+                self._set_records(records)
+            else:
+                for attraction in attractions:
+                    self._apply_put(attraction)
+            self._persist_changes([('put', attraction) for attraction in attractions])
+
+    def apply_changes(self, changes):
+        """Apply ('put', attraction) and ('delete', id) changes and persist them with one write"""
+        with self.write_lock():
+            applied = []
+            for op, value in changes:
+                if op == 'put':
+                    self._apply_put(value)
+                elif not self._apply_delete(value):
+                    continue
+                applied.append((op, value))
+            if applied:
+                self._persist_changes(applied)
+
+    def replace(self, attraction_id, attraction):
+        """Swap in a new version of an attraction; False if it does not exist"""
+        with self.write_lock():
+            if attraction_id not in self._positions:
+                return False
+            self._apply_put(attraction)
+            self._persist_put(attraction)
+            return True
+
+    def remove(self, attraction_id):
+        """Delete an attraction by id; False if it does not exist"""
+        with self.write_lock():
+            if not self._apply_delete(attraction_id):
+                return False
+            self._persist_delete(attraction_id)
+            return True
+
+    def save(self, records):
+        """Atomically replace the data file and adopt records as the cache"""
+        with self.write_lock():
+            self._stat_key = self._write_file(records)
+            self._set_records(records)
+            self._loaded = True
+
+    def _apply_put(self, attraction):
+        """Insert or replace an attraction in the in-memory list"""
+        position = self._positions.get(attraction['id'])
+        if position is None:
+            old = None
+            self._positions[attraction['id']] = len(self._records)
+            self._records.append(attraction)
+        else:
+            old = self._records[position]
+            self._records[position] = attraction
+        for index in self.indexes.values():
+            index.put(old, attraction)
+        self.version += 1
+
+    def _apply_delete(self, attraction_id):
+        """Remove an attraction from the in-memory list; False if absent"""
+        position = self._positions.pop(attraction_id, None)
+        if position is None:
+            return False
+        old = self._records[position]
+        # Leave a hole instead of shifting every later record and its position
+        self._holes.append(position)
+        self._records[position] = None
+        for index in self.indexes.values():
+            index.delete(old)
+        self.version += 1
+        if len(self._holes) * REINDEX_RATIO >= len(self._records):
+            self._drop_holes()
+        return True
+
+    def _live(self, records):
+        """Return records without the holes left by deletes"""
+        if not self._holes:
+            return records
+        if isinstance(records, CompactRecords):
+            return records.without_holes()
+        return [record for record in records if record is not None]
+
+    def _drop_holes(self):
+        """Close the holes in the list, moving later records up in order"""
+        if not self._holes:
+            return
+        holes = sorted(self._holes)
+        records = self._live(self._records)
+        # Install the positions first: a reader pairing them with the old list
+        # lands on a hole or a wrong id, which get() checks for, never past the end
+        self._positions = {attraction_id: position - bisect_left(holes, position)
+                           for attraction_id, position in self._positions.items()}
+        self._records = records
+        self._holes = []
+
+    def _persist_put(self, attraction):
+        """Persist an added or replaced attraction"""
+        self._persist()
+
+    def _persist_changes(self, changes):
+        """Persist a batch of puts and deletes"""
+        self._persist()
+
+    def _persist_delete(self, attraction_id):
+        """Persist the removal of an attraction"""
+        self._persist()
+
+    def _persist(self):
+        """Write the in-memory list back after an in-place mutation"""
+        try:
+            # Holes stay in memory until _apply_delete closes them all at once
+            self._stat_key = self._write_file(self._live(self._records))
+        except Exception:
+            # The file still holds the previous state; reload it next time
+            self.invalidate()
+            raise
+
+    def _write_file(self, records):
+        """Write records via temp file + rename and return the new stat key"""
+        tmp_path, key = self._write_temp(records)
+        os.replace(tmp_path, self.path)
+        return key
+
+    def _write_temp(self, records):
+        """Write records to a fsynced temp file next to the data file.
+
+        Returns the temp path and the stat key the data file will have once
+        the temp file is renamed over it (rename keeps inode, size and mtime).
+        """
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.attractions-', suffix='.tmp')
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(records, CompactRecords):
+                    f.writelines(records.iter_json())
+                else:
+                    f.write(codec.dumps(records, pretty=True))
+                f.flush()
+                os.fsync(f.fileno())
+                st = os.fstat(f.fileno())
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        return tmp_path, (st.st_ino, st.st_size, st.st_mtime_ns)
+
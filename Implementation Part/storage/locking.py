@@ -0,0 +1,54 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no advisory locks
+    fcntl = None
+
+
+class FileLock:
+    """Re-entrant exclusive lock shared by every process using the same file.
+
+    Combines an in-process lock (threads) with an fcntl advisory lock on
+    ``path`` (gunicorn workers). The lock file is opened per process so a
+    descriptor inherited across fork() never shares lock state with the
+    parent. Without fcntl only the in-process lock applies.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+        self._fd_pid = None
+
+    def _lock_fd(self):
+        """Open the lock file once per process"""
+        if self._fd is None or self._fd_pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                fcntl.flock(self._lock_fd(), fcntl.LOCK_EX)
+            except Exception:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -0,0 +1,480 @@
+import os
+import logging
+from bisect import bisect_left, bisect_right
+from collections import Counter
+
+from indexes.geo_index import GeoIndex
+from indexes.sorted_index import sort_key
+from indexes.stats_index import StatsIndex
+from indexes.text_index import TextIndex
+from query.filters import matching_ids
+from query.pagination import position_after
+from storage import codec
+from storage.snapshot import Snapshot, build_snapshot
+from storage.sqlite_store import DEFAULT_SEARCH_FIELDS, DEFAULT_SORT_FIELDS
+from storage.wal_store import DEFAULT_COMPACT_BYTES, WalAttractionStore
+
+
+class LayeredRecords:
+    """The attractions of a mapped snapshot with later mutations layered on top.
+
+    ``overlay`` maps an id to its current record, or to None when a record
+    of the snapshot has been deleted; ids absent from it are read from the
+    snapshot. Iteration follows snapshot order, with records created since
+    the snapshot at the end, as the JSON stores list them.
+    """
+
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+        self.overlay = {}
+        # Ids in the overlay that the snapshot does not have, in creation order
+        self._created = {}
+        self._count = len(snapshot) if snapshot is not None else 0
+
+    def __len__(self):
+        return self._count
+
+    def _base_position(self, attraction_id):
+        return None if self.snapshot is None else self.snapshot.find(attraction_id)
+
+    def __contains__(self, attraction_id):
+        if attraction_id in self.overlay:
+            return self.overlay[attraction_id] is not None
+        return self._base_position(attraction_id) is not None
+
+    def get(self, attraction_id):
+        """Return the current record for an id, or None"""
+        if attraction_id in self.overlay:
+            return self.overlay[attraction_id]
+        position = self._base_position(attraction_id)
+        return None if position is None else self.snapshot.record(position)
+
+    def put(self, attraction):
+        """Layer a created or updated record; returns the record it replaces"""
+        attraction_id = attraction['id']
+        old = self.get(attraction_id)
+        if old is None:
+            self._count += 1
+            if self._base_position(attraction_id) is None:
+                self._created[attraction_id] = None
+        self.overlay[attraction_id] = attraction
+        return old
+
+    def delete(self, attraction_id):
+        """Hide a record; returns the deleted record, or None if absent"""
+        old = self.get(attraction_id)
+        if old is None:
+            return None
+        self._count -= 1
+        if attraction_id in self._created:
+            del self._created[attraction_id]
+            del self.overlay[attraction_id]
+        else:
+            self.overlay[attraction_id] = None
+        return old
+
+    def __iter__(self):
+        snapshot, overlay = self.snapshot, self.overlay
+        if snapshot is not None:
+            for position in range(len(snapshot)):
+                if overlay:
+                    attraction_id = snapshot.id_at(position)
+                    if attraction_id in overlay:
+                        if overlay[attraction_id] is not None:
+                            yield overlay[attraction_id]
+                        continue
+                yield snapshot.record(position)
+        for attraction_id in list(self._created):
+            yield overlay[attraction_id]
+
+    def copy(self):
+        """Copy of the overlay over the same snapshot; nothing is decoded"""
+        layered = LayeredRecords(self.snapshot)
+        layered.overlay = dict(self.overlay)
+        layered._created = dict(self._created)
+        layered._count = self._count
+        return layered
+
+
+class MmapAttractionStore(WalAttractionStore):
+    """Serves attractions from a memory-mapped binary snapshot.
+
+    The snapshot (``<data file>.snap``, see ``storage.snapshot``) holds every
+    record with an id table and one precomputed ordering per sort field.
+    Opening it maps the file and reads a few bytes of header, so a worker
+    is ready at once whatever the size of the catalogue, and every worker
+    shares the same page-cache pages instead of a private parsed copy.
+    Records are decoded only when a request reads them.
+
+    Mutations go to the write-ahead log exactly as in ``'wal'`` mode and
+    are held in memory as an overlay on the snapshot; log compaction writes
+    a new snapshot, which every worker maps on its next access.
+
+    ``query`` pages through the stored orderings in O(log n + page size).
+    A search builds the in-memory text index on first use, so that cost is
+    paid by the first search rather than at startup, and ``nearby`` builds
+    the grid spatial index on its first use in the same way, as does
+    ``stats`` with its rollups. On first use the snapshot is built from
+    the JSON data file.
+    """
+
+    native_queries = True
+
+    def __init__(self, path, compact_bytes=DEFAULT_COMPACT_BYTES, snapshot_path=None,
+                 sort_fields=DEFAULT_SORT_FIELDS, search_fields=None):
+        super().__init__(snapshot_path or path + '.snap', compact_bytes)
+        self.source_path = path
+        self.sort_fields = tuple(sort_fields)
+        self.search_fields = dict(search_fields or DEFAULT_SEARCH_FIELDS)
+        self._records = LayeredRecords()
+        self._overlay_orders = {}
+
+    def _reload(self):
+        """Map the snapshot (building it if needed) and replay the whole log"""
+        while True:
+            snapshot_key = self._current_stat_key()
+            try:
+                snapshot = None if snapshot_key is None else Snapshot(self.path)
+                if snapshot is None or not self._usable(snapshot):
+                    self._build()
+                    continue
+            except (ValueError, OSError) as e:
+                logging.error(f"Error reading snapshot {self.path}: {e}. Retrying on next access.")
+                self._loaded = False
+                return
+            self._adopt(snapshot)
+            self._log_ino, self._log_offset = None, 0
+            self._replay_tail()
+            # A compaction may have swapped snapshot and log while we read them
+            if self._current_stat_key() == snapshot_key:
+                self._stat_key = snapshot_key
+                self._loaded = True
+                return
+
+    def _usable(self, snapshot):
+        """True if the snapshot has an ordering for every configured sort field"""
+        return set(self.sort_fields) <= set(snapshot.sort_fields)
+
+    def _build(self):
+        """Write a snapshot from the JSON data file, or rebuild one lacking a sort field"""
+        with self._file_lock:
+            # Another worker may have built it while we waited for the lock
+            if self._current_stat_key() is not None:
+                snapshot = Snapshot(self.path)
+                if self._usable(snapshot):
+                    return
+                records = LayeredRecords(snapshot)
+            elif os.path.exists(self.source_path):
+                with open(self.source_path, 'rb') as f:
+                    records = codec.loads(f.read())
+            else:
+                records = []
+            tmp_path, _ = self._write_temp(records)
+            os.replace(tmp_path, self.path)
+            logging.info(f"Built snapshot {self.path} with {len(records)} attractions")
+
+    def _adopt(self, snapshot):
+        """Serve snapshot with an empty overlay"""
+        self._records = LayeredRecords(snapshot)
+        for index in self.indexes.values():
+            index.reset(self._records)
+        self.version += 1
+
+    def _write_temp(self, records):
+        return build_snapshot(self.path, records, self.sort_fields)
+
+    def _write_snapshot(self):
+        """Write the current records as the new snapshot, map it and start an empty log"""
+        self._install(self._records)
+
+    def save(self, records):
+        """Replace the snapshot and start an empty log"""
+        with self.write_lock():
+            self._install(records)
+
+    def _install(self, records):
+        try:
+            tmp_path, snapshot_key = self._write_temp(records)
+            os.replace(tmp_path, self.path)
+            self._truncate_log(b'')
+            self._adopt(Snapshot(self.path))
+        except Exception:
+            self.invalidate()
+            raise
+        self._stat_key = snapshot_key
+        self._loaded = True
+
+    def compact(self):
+        """Fold the log into a new snapshot, then map it on the next access"""
+        super().compact()
+        # The overlay already matches the new snapshot; dropping it frees its memory
+        self.invalidate()
+
+    def get(self, attraction_id):
+        """Return the attraction with the given id, or None"""
+        self.refresh()
+        return self._records.get(attraction_id)
+
+    def lookup(self, ids):
+        """Return the attractions for ids in the same order, skipping unknown ids"""
+        self.refresh()
+        records = self._records
+        return [record for record in map(records.get, ids) if record is not None]
+
+    def iter_lookup(self, ids):
+        """Iterate over the attractions for ids in the same order, decoding each as it is reached"""
+        self.refresh()
+        records = self._records
+        return (record for record in map(records.get, ids) if record is not None)
+
+    def add_many(self, attractions):
+        """Add attractions and persist them with a single write"""
+        with self.write_lock():
+            for attraction in attractions:
+                self._apply_put(attraction)
+            self._persist_changes([('put', attraction) for attraction in attractions])
+
+    def replace(self, attraction_id, attraction):
+        """Swap in a new version of an attraction; False if it does not exist"""
+        with self.write_lock():
+            if attraction_id not in self._records:
+                return False
+            self._apply_put(attraction)
+            self._persist_put(attraction)
+            return True
+
+    def _apply_put(self, attraction):
+        old = self._records.put(attraction)
+        for index in self.indexes.values():
+            index.put(old, attraction)
+        self.version += 1
+
+    def _apply_delete(self, attraction_id):
+        old = self._records.delete(attraction_id)
+        if old is None:
+            return False
+        for index in self.indexes.values():
+            index.delete(old)
+        self.version += 1
+        return True
+
+    def query(self, search_term=None, sort_by='name', reverse=False, limit=None, after=None, filters=(),
+              fuzzy=False, lazy=False):
+        """Run a list query and return (attractions, total, last_position, has_more).
+
+        Takes the same arguments and returns the same positions as the
+        in-memory indexes: ``(sort_key(value), id)`` for a sort field and
+        ``(score, id)`` for relevance. Filters are answered from the sort
+        orderings, so each filtered field must be a sort field. ``fuzzy``
+        makes the search typo-tolerant, as ``TextIndex.search`` does.
+        With ``lazy`` and no limit the attractions are an iterator that
+        decodes one record at a time, and there is no last position.
+        """
+        if sort_by != 'relevance' and sort_by not in self.sort_fields:
+            raise ValueError(f"Unknown sort field: {sort_by}")
+        if sort_by == 'relevance' and not search_term:
+            raise ValueError("Relevance ordering needs a search term")
+        scores = self._search(search_term, fuzzy) if search_term else None
+        self.refresh()
+        records = self._records
+        hits = scores.ids if scores is not None else None
+        matched = matching_ids(SnapshotSource(records), filters, hits) if filters else hits
+        if matched is not None:
+            return self._order_matches(matched, scores, sort_by, reverse, limit, after, lazy)
+        if lazy and not limit:
+            walk = self._walk(records, sort_by, reverse, after, None)
+            return (record for _, record in walk), len(records), None, False
+        page = list(self._walk(records, sort_by, reverse, after, limit + 1 if limit else None))
+        has_more = bool(limit) and len(page) > limit
+        page = page[:limit] if limit else page
+        last = page[-1][0] if page else None
+        return [record for _, record in page], len(records), last, has_more
+
+    def facets(self, field, search_term=None, filters=(), fuzzy=False):
+        """Return {value: count} for the string values of field among the matching attractions"""
+        if field not in self.sort_fields:
+            raise ValueError(f"Unknown facet field: {field}")
+        scores = self._search(search_term, fuzzy) if search_term else None
+        self.refresh()
+        source = SnapshotSource(self._records)
+        return source.counts(field, matching_ids(source, filters, scores.ids if scores is not None else None))
+
+    def nearby(self, lat, lon, limit=None, radius_km=None):
+        """Return up to limit (distance_km, attraction) pairs nearest to (lat, lon), closest first"""
+        index = self.ensure_index('geo', GeoIndex)
+        self.refresh()
+        nearest = index.nearest(lat, lon, limit, radius_km)
+        records = self._records
+        hits = [(distance, records.get(attraction_id)) for distance, attraction_id in nearest]
+        return [(distance, record) for distance, record in hits if record is not None]
+
+    def stats(self):
+        """Return count, rating, location and creation statistics from rollups built on first use"""
+        index = self.ensure_index('stats', StatsIndex)
+        self.refresh()
+        return index.summary()
+
+    def _walk(self, records, field, reverse, after, count):
+        """Yield up to count (position, record) pairs in field order after ``after``.
+
+        Merges the snapshot's stored ordering, skipping records the overlay
+        shadows, with the overlay's own records ordered the same way.
+        """
+        snapshot, overlay = records.snapshot, records.overlay
+        entries, layered = self._overlay_order(records, field)
+        if snapshot is not None:
+            order = snapshot.order(field)
+            size = len(order)
+        else:
+            order, size = None, 0
+
+        def base(i):
+            record = snapshot.record(order[i])
+            return (sort_key(record.get(field)), record['id']), record
+
+        base_key = lambda i: base(i)[0]
+        step = -1 if reverse else 1
+        if after is None:
+            i, j = (size - 1, len(entries) - 1) if reverse else (0, 0)
+        elif reverse:
+            i = bisect_left(range(size), after, key=base_key) - 1
+            j = bisect_left(entries, after) - 1
+        else:
+            i = bisect_right(range(size), after, key=base_key)
+            j = bisect_right(entries, after)
+        produced = 0
+        while count is None or produced < count:
+            while 0 <= i < size and overlay and snapshot.id_at(order[i]) in overlay:
+                i += step
+            has_base, has_layered = 0 <= i < size, 0 <= j < len(entries)
+            if not has_base and not has_layered:
+                return
+            if has_base:
+                position, record = base(i)
+            if has_layered and (not has_base or (entries[j] < position) != reverse):
+                yield entries[j], layered[j]
+                j += step
+            else:
+                yield position, record
+                i += step
+            produced += 1
+
+    def _overlay_order(self, records, field):
+        """Overlay records as sorted (positions, records), cached per version"""
+        key = (field, id(records), self.version)
+        cached = self._overlay_orders.get(field)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        pairs = sorted(((sort_key(record.get(field)), attraction_id), record)
+                       for attraction_id, record in list(records.overlay.items()) if record is not None)
+        result = [position for position, _ in pairs], [record for _, record in pairs]
+        self._overlay_orders[field] = (key, result)
+        return result
+
+    def _search(self, search_term, fuzzy=False):
+        """Score matches with the text index, built on the first search"""
+        return self.ensure_index('text', lambda: TextIndex(self.search_fields)).search(search_term, fuzzy)
+
+    def _order_matches(self, matched, scores, sort_by, reverse, limit, after, lazy=False):
+        """Page through a set of matching ids ordered by score or by field"""
+        if sort_by == 'relevance' and limit:
+            # Rank just the page, not every match
+            top = scores.top(limit + 1, after, matched)
+            page_ids = [doc_id for _, doc_id in top[:limit]]
+            last = (scores[page_ids[-1]], page_ids[-1]) if page_ids else None
+            return self.lookup(page_ids), len(matched), last, len(top) > limit
+        if sort_by == 'relevance':
+            ids = TextIndex.rank({i: scores[i] for i in matched})
+            key_of, descending = (lambda i: (scores[i], i)), True
+        else:
+            positions = {record['id']: (sort_key(record.get(sort_by)), record['id'])
+                         for record in self.iter_lookup(matched)}
+            ids = sorted(positions, key=positions.get, reverse=reverse)
+            key_of, descending = positions.get, reverse
+        total = len(ids)
+        start = position_after(ids, key_of, after, descending) if after is not None else 0
+        page_ids = ids[start:start + limit] if limit else ids[start:]
+        has_more = bool(limit) and start + limit < total
+        last = key_of(page_ids[-1]) if page_ids else None
+        if lazy and not limit:
+            return self.iter_lookup(page_ids), total, None, False
+        return self.lookup(page_ids), total, last, has_more
+
+
+class SnapshotSource:
+    """Answers query filters from a snapshot's sort orderings and its overlay.
+
+    A filter on a field is a contiguous span of that field's ordering,
+    found by binary search and counted without decoding the records in it.
+    Records in the overlay are checked one by one.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        self.snapshot = records.snapshot
+
+    def _key(self, order, field):
+        """Sort key of the record at a position of an ordering, decoded from the snapshot"""
+        return lambda i: sort_key(self.snapshot.record(order[i]).get(field))
+
+    def _spans(self, f):
+        """(ordering, start, end) spans of snapshot positions the filter covers"""
+        if self.snapshot is None:
+            return []
+        order = self.snapshot.order(f.field)
+        key, size = self._key(order, f.field), len(order)
+        if f.kind == 'in':
+            bounds = [(sort_key(value), sort_key(value), False) for value in f.values]
+        else:
+            bounds = [(f.low, f.high, f.exclusive)]
+        spans = []
+        for low, high, exclusive in bounds:
+            if exclusive:
+                start, end = bisect_right(range(size), low, key=key), bisect_left(range(size), high, key=key)
+            else:
+                start, end = bisect_left(range(size), low, key=key), bisect_right(range(size), high, key=key)
+            spans.append((order, start, end))
+        return spans
+
+    def estimate(self, f):
+        return sum(max(0, end - start) for _, start, end in self._spans(f)) + len(self.records.overlay)
+
+    def ids(self, f):
+        overlay, snapshot = self.records.overlay, self.snapshot
+        for order, start, end in self._spans(f):
+            for i in range(start, end):
+                attraction_id = snapshot.id_at(order[i])
+                if attraction_id not in overlay:
+                    yield attraction_id
+        for attraction_id, record in list(overlay.items()):
+            if record is not None and f.matches(record):
+                yield attraction_id
+
+    def contains(self, f, attraction_id):
+        record = self.records.get(attraction_id)
+        return record is not None and f.matches(record)
+
+    def counts(self, field, ids=None):
+        """Facet counts for field over ids, or over every record"""
+        if ids is not None:
+            values = (record.get(field) for record in map(self.records.get, ids) if record is not None)
+            return dict(Counter(value for value in values if isinstance(value, str)))
+        counts, snapshot = Counter(), self.snapshot
+        if snapshot is not None:
+            # Walk the ordering one run of equal values at a time
+            order = snapshot.order(field)
+            key, size, start = self._key(order, field), len(order), 0
+            while start < size:
+                value = snapshot.record(order[start]).get(field)
+                end = bisect_right(range(size), sort_key(value), lo=start, key=key)
+                if isinstance(value, str):
+                    counts[value] += end - start
+                start = end
+        for attraction_id, record in list(self.records.overlay.items()):
+            position = None if snapshot is None else snapshot.find(attraction_id)
+            for replaced, change in ((None if position is None else snapshot.record(position), -1),
+                                     (record, 1)):
+                value = None if replaced is None else replaced.get(field)
+                if isinstance(value, str):
+                    counts[value] += change
+        return {value: count for value, count in counts.items() if count > 0}
@@ -0,0 +1,32 @@
+import os
+import threading
+
+from storage.json_store import AttractionStore
+from storage.mmap_store import MmapAttractionStore
+from storage.sqlite_store import SqliteAttractionStore
+from storage.wal_store import WalAttractionStore
+
+# Storage modes selectable through app.config['STORAGE_MODE']
+STORE_CLASSES = {
+    'json': AttractionStore,
+    'wal': WalAttractionStore,
+    'sqlite': SqliteAttractionStore,
+    'mmap': MmapAttractionStore,
+}
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path, mode='json', **options):
+    """Return the process-wide store for a data file path and storage mode"""
+    if mode not in STORE_CLASSES:
+        raise ValueError(f"Unknown storage mode: {mode}")
+    key = (os.path.abspath(path), mode)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = _stores[key] = STORE_CLASSES[mode](key[0], **options)
+    return store
@@ -0,0 +1,153 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+
+from indexes.sorted_index import sort_key
+from storage import codec
+
+MAGIC = b'ATSNAP01'
+
+# magic, offset of the metadata JSON, length of the metadata JSON
+HEADER = struct.Struct('<8sQQ')
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a snapshot this code can read"""
+
+
+def write_snapshot(f, records, sort_fields):
+    """Write records to the open binary file f in the snapshot format.
+
+    Layout: a fixed header, then a heap holding each record's id followed
+    by its compact JSON, then fixed-width tables: ``offsets`` (u64 start of
+    each record in the heap, plus the end), ``id_lengths`` (u32),
+    ``by_id`` (u32 record numbers ordered by id) and one ``sort:<field>``
+    permutation (u32 record numbers ordered like a SortedIndex) per sort
+    field. A small JSON block at the end says where each table starts.
+    Records are streamed to the heap, so only ids and sort keys are held
+    in memory while writing.
+    """
+    f.write(HEADER.pack(MAGIC, 0, 0))
+    position = HEADER.size
+    offsets, id_lengths, ids = array('Q'), array('I'), []
+    keys = {field: [] for field in sort_fields}
+    for record in records:
+        attraction_id = record['id']
+        id_bytes = attraction_id.encode('utf-8')
+        body = codec.dumps(record)
+        offsets.append(position)
+        id_lengths.append(len(id_bytes))
+        f.write(id_bytes)
+        f.write(body)
+        position += len(id_bytes) + len(body)
+        ids.append(attraction_id)
+        for field, values in keys.items():
+            values.append(sort_key(record.get(field)))
+    offsets.append(position)
+
+    sections = {}
+
+    def write_table(name, table):
+        nonlocal position
+        padding = -position % 8
+        f.write(b'\0' * padding)
+        position += padding
+        sections[name] = [position, len(table)]
+        f.write(table.tobytes())
+        position += len(table) * table.itemsize
+
+    write_table('offsets', offsets)
+    write_table('id_lengths', id_lengths)
+    count = len(ids)
+    write_table('by_id', array('I', sorted(range(count), key=ids.__getitem__)))
+    for field, values in keys.items():
+        write_table(f'sort:{field}', array('I', sorted(range(count), key=lambda i: (values[i], ids[i]))))
+    meta = json.dumps({'count': count, 'byteorder': sys.byteorder, 'sort_fields': list(sort_fields),
+                       'sections': sections}).encode('utf-8')
+    f.write(meta)
+    f.seek(0)
+    f.write(HEADER.pack(MAGIC, position, len(meta)))
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file.
+
+    Opening reads only the header and the table positions, whatever the
+    number of records. Records are decoded from the mapping when asked
+    for, and every process mapping the same file shares its pages through
+    the page cache. The mapping stays valid after the file is replaced on
+    disk, so readers holding an old Snapshot are unaffected by a rebuild.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            raise SnapshotError(f"{path} is too short to be a snapshot")
+        magic, meta_offset, meta_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a snapshot")
+        meta = json.loads(self._map[meta_offset:meta_offset + meta_length])
+        if meta['byteorder'] != sys.byteorder:
+            raise SnapshotError(f"{path} was written on a {meta['byteorder']}-endian machine")
+        self.sort_fields = meta['sort_fields']
+        self._count = meta['count']
+        view = memoryview(self._map)
+        self._tables = {}
+        for name, (start, length) in meta['sections'].items():
+            itemsize = 8 if name == 'offsets' else 4
+            self._tables[name] = view[start:start + length * itemsize].cast('Q' if itemsize == 8 else 'I')
+        self._offsets = self._tables['offsets']
+        self._id_lengths = self._tables['id_lengths']
+        self._by_id = self._tables['by_id']
+
+    def __len__(self):
+        return self._count
+
+    def record(self, number):
+        """Decode the record stored at position number"""
+        start = self._offsets[number] + self._id_lengths[number]
+        return codec.loads(self._map[start:self._offsets[number + 1]])
+
+    def id_at(self, number):
+        """Return the id of the record at position number without decoding it"""
+        start = self._offsets[number]
+        return str(self._map[start:start + self._id_lengths[number]], 'utf-8')
+
+    def find(self, attraction_id):
+        """Return the position of the record with the given id, or None"""
+        by_id = self._by_id
+        i = bisect_left(range(len(by_id)), attraction_id, key=lambda k: self.id_at(by_id[k]))
+        if i < len(by_id) and self.id_at(by_id[i]) == attraction_id:
+            return by_id[i]
+        return None
+
+    def order(self, field):
+        """Record positions ordered by (sort_key(field), id)"""
+        return self._tables[f'sort:{field}']
+
+
+def build_snapshot(path, records, sort_fields):
+    """Write a snapshot to a fsynced temp file next to path.
+
+    Returns the temp path and the stat key path will have once the temp
+    file is renamed over it.
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-', suffix='.tmp')
+    try:
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'w+b') as f:
+            write_snapshot(f, records, sort_fields)
+            f.flush()
+            os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, (st.st_ino, st.st_size, st.st_mtime_ns)
@@ -0,0 +1,641 @@
+import os
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from indexes.geo_index import HALF_CIRCUMFERENCE_KM, bounding_boxes, haversine_km
+from indexes.stats_index import summarise
+from indexes.text_index import FUZZY_MIN_LENGTH, TrigramIndex, tokenize
+from storage import codec
+
+# Columns every store keeps sortable, each with a (column, id) index
+DEFAULT_SORT_FIELDS = ('name', 'location', 'rating', 'created_at')
+
+# Columns indexed by FTS5 and the weight bm25() gives a match in each
+DEFAULT_SEARCH_FIELDS = {'name': 3.0, 'location': 2.0, 'description': 1.0}
+
+# Rows written per executemany() batch during an import
+IMPORT_BATCH = 5000
+
+# Page cache used while bulk loading, in KiB (SQLite's default is 2000)
+BULK_CACHE_KIB = 64 * 1024
+
+# Triggers that mirror row changes into the FTS table and bump the version
+TRIGGERS = ('attractions_ai', 'attractions_ad', 'attractions_au')
+
+# Radius of the first box a nearby query searches; each miss doubles it
+NEARBY_START_KM = 1.0
+# Fewest seconds between background rebuilds of the fuzzy search vocabulary
+VOCABULARY_REBUILD_SECONDS = 10.0
+
+
+def column_value(value):
+    """A field value as bound to its column.
+
+    Numbers and strings bind as they are; anything else (None, a list, an
+    object, a boolean) as the text ``sort_key`` orders it by, so SQL sorts
+    and filters it the way the in-memory indexes do. A missing value is
+    ``''``, never NULL, which would drop rows from keyset comparisons.
+    """
+    if isinstance(value, str) or (isinstance(value, (int, float)) and not isinstance(value, bool)):
+        return value
+    return '' if value is None else str(value)
+
+
+def holds_text(column, field):
+    """SQL condition that a text column's row holds an actual string, not a missing value stored as ''"""
+    return f"({column} != '' OR json_type(a.doc, '$.{field}') = 'text')"
+
+
+def match_expression(search_term, similar=None):
+    """FTS5 query requiring every term, each matching as a word prefix or as one of its similar tokens"""
+    def alternatives(term):
+        options = [f'"{term}"*'] + [f'"{token}"' for token in (similar or {}).get(term, ())]
+        return options[0] if len(options) == 1 else f"({' OR '.join(options)})"
+    return ' AND '.join(map(alternatives, search_term.split()))
+
+
+def geo_rows(seq, doc, source=''):
+    """SELECT of the attractions_geo rows for documents with valid lat/lon.
+
+    JSON booleans are not numbers here, matching ``valid_coordinates``.
+    """
+    lat, lon = f"json_extract({doc}, '$.lat')", f"json_extract({doc}, '$.lon')"
+    return (f"SELECT {seq}, {lat}, {lat}, {lon}, {lon}, {lat}, {lon} {source} "
+            f"WHERE json_type({doc}, '$.lat') IN ('integer', 'real') "
+            f"AND json_type({doc}, '$.lon') IN ('integer', 'real') "
+            f"AND {lat} BETWEEN -90 AND 90 AND {lon} BETWEEN -180 AND 180")
+
+
+def rollup_upsert(doc, sign, source='', where='true'):
+    """INSERT adding (sign 1) or subtracting (sign -1) documents' shares to the rollups table.
+
+    Each document counts towards the 'all' row, its numeric rating, its
+    text location (with the rating summed) and the calendar day its
+    created_at starts with, the values ``StatsIndex`` rolls up. ``date()``
+    accepts days 29-31 of any month; the modifier normalises them so a
+    date that does not exist never equals itself.
+    """
+    rating, location = f"json_extract({doc}, '$.rating')", f"json_extract({doc}, '$.location')"
+    rated = f"ifnull(json_type({doc}, '$.rating') IN ('integer', 'real'), 0)"
+    day = f"substr(json_extract({doc}, '$.created_at'), 1, 10)"
+    shares = " UNION ALL ".join((
+        f"SELECT 'all' AS kind, '' AS key, 0.0 AS rating_sum, 0 AS rated {source} WHERE {where}",
+        f"SELECT 'rating', {rating}, 0.0, 0 {source} WHERE {where} AND {rated}",
+        f"SELECT 'location', {location}, CASE WHEN {rated} THEN {rating} ELSE 0.0 END, {rated} {source} "
+        f"WHERE {where} AND json_type({doc}, '$.location') = 'text'",
+        f"SELECT 'day', {day}, 0.0, 0 {source} WHERE {where} AND json_type({doc}, '$.created_at') = 'text' "
+        f"AND {day} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' AND date({day}, '+0 days') = {day}"))
+    return (f"INSERT INTO rollups SELECT kind, key, {sign} * count(*), {sign} * sum(rating_sum), "
+            f"{sign} * sum(rated) FROM ({shares}) WHERE true GROUP BY kind, key "
+            f"ON CONFLICT(kind, key) DO UPDATE SET count = count + excluded.count, "
+            f"rating_sum = CASE WHEN rated + excluded.rated THEN rating_sum + excluded.rating_sum ELSE 0.0 END, "
+            f"rated = rated + excluded.rated")
+
+
+class SqliteAttractionStore:
+    """Keeps attractions in an SQLite database next to the JSON data file.
+
+    Each record is stored whole as JSON in ``doc``, with the sortable and
+    searchable fields copied into real columns: a ``(column, id)`` index per
+    sort field, an FTS5 table over the search fields and an R*Tree over
+    ``lat``/``lon``, kept in sync by triggers, which also maintain the
+    ``rollups`` table that ``stats`` reads. ``query`` runs search,
+    sorting and keyset pagination as a single SQL statement, so nothing is
+    held in memory per record.
+
+    The database runs in WAL mode: readers in any worker never block the
+    single writer. ``write_lock()`` opens an immediate transaction on the
+    calling thread's connection, which is the cross-process write lock.
+
+    On first use an empty database is filled from the JSON data file.
+    """
+
+    # Search, sort and pagination run in SQL instead of in-memory indexes
+    native_queries = True
+
+    def __init__(self, path, db_path=None, sort_fields=DEFAULT_SORT_FIELDS,
+                 search_fields=None):
+        self.path = path
+        self.db_path = db_path or os.path.splitext(path)[0] + '.db'
+        self.sort_fields = tuple(sort_fields)
+        self.search_fields = dict(search_fields or DEFAULT_SEARCH_FIELDS)
+        self.columns = list(dict.fromkeys([*self.sort_fields, *self.search_fields]))
+        self.indexes = {}
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        # (dataset version, TrigramIndex over the FTS vocabulary) for fuzzy search
+        self._vocabulary = None
+        self._vocabulary_lock = threading.Lock()
+        self._vocabulary_built = 0.0
+        self._vocabulary_rebuild = None
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use"""
+        local = self._local
+        # A connection must never be shared with a forked child process
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA synchronous=FULL")
+            local.conn, local.pid, local.depth = conn, os.getpid(), 0
+            if not self._schema_ready:
+                self._create_schema(conn)
+        return local.conn
+
+    def _create_schema(self, conn):
+        """Create tables, indexes and triggers, importing the JSON file into a new database"""
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            # WAL mode is stored in the file; switch once, not from every thread at once
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                created = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'attractions'").fetchone() is None
+                geo_created = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'attractions_geo'").fetchone() is None
+                rollups_created = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'rollups'").fetchone() is None
+                conn.execute(f"CREATE TABLE IF NOT EXISTS attractions (seq INTEGER PRIMARY KEY, "
+                             f"id TEXT NOT NULL UNIQUE, {', '.join(self.columns)}, doc TEXT NOT NULL)")
+                for c in self.sort_fields:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS attractions_{c} ON attractions({c}, id)")
+                conn.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS attractions_fts USING "
+                             f"fts5({', '.join(self.search_fields)}, content='attractions', "
+                             f"content_rowid='seq', tokenize='unicode61 remove_diacritics 2')")
+                conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS attractions_vocab USING "
+                             "fts5vocab(attractions_fts, 'row')")
+                # Box columns for range search, plus the exact position as auxiliary columns
+                conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS attractions_geo USING "
+                             "rtree(seq, min_lat, max_lat, min_lon, max_lon, +lat, +lon)")
+                # Running counts and rating sums per rating value, location and creation day
+                conn.execute("CREATE TABLE IF NOT EXISTS rollups (kind TEXT NOT NULL, key, count INTEGER NOT NULL, "
+                             "rating_sum REAL NOT NULL, rated INTEGER NOT NULL, PRIMARY KEY (kind, key))")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'blank_nulls'").fetchone() is None:
+                    # Databases from before column_value stored missing values as NULL
+                    for c in self.columns:
+                        conn.execute(f"UPDATE attractions SET {c} = '' WHERE {c} IS NULL")
+                    conn.execute("INSERT INTO meta VALUES ('blank_nulls', 1)")
+                if created and os.path.exists(self.path):
+                    with open(self.path, 'rb') as f:
+                        records = codec.loads(f.read())
+                    self._bulk_load(conn, records)
+                    logging.info(f"Imported {len(records)} attractions from {self.path} into {self.db_path}")
+                else:
+                    if geo_created:
+                        # A database from before the R*Tree: index the positions it already holds
+                        for name in TRIGGERS:
+                            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                        conn.execute(f"INSERT INTO attractions_geo {geo_rows('seq', 'doc', 'FROM attractions')}")
+                    if rollups_created:
+                        # A database from before the rollups: count the rows it already holds
+                        for name in TRIGGERS:
+                            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+                        conn.execute(rollup_upsert('doc', 1, 'FROM attractions'))
+                self._create_triggers(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._schema_ready = True
+
+    def _create_triggers(self, conn):
+        """Keep the FTS table, the R*Tree, the rollups and the dataset version in step with every row written"""
+        text = ', '.join(self.search_fields)
+        new = ', '.join(f'new.{c}' for c in self.search_fields)
+        old = ', '.join(f'old.{c}' for c in self.search_fields)
+        insert = (f"INSERT INTO attractions_fts(rowid, {text}) VALUES (new.seq, {new}); "
+                  f"INSERT INTO attractions_geo {geo_rows('new.seq', 'new.doc')}; "
+                  f"{rollup_upsert('new.doc', 1)};")
+        delete = (f"INSERT INTO attractions_fts(attractions_fts, rowid, {text}) "
+                  f"VALUES ('delete', old.seq, {old}); "
+                  f"DELETE FROM attractions_geo WHERE seq = old.seq; "
+                  f"{rollup_upsert('old.doc', -1)};")
+        bump = "UPDATE meta SET value = value + 1 WHERE key = 'version';"
+        for name, event, body in (('attractions_ai', 'INSERT', insert),
+                                  ('attractions_ad', 'DELETE', delete),
+                                  ('attractions_au', 'UPDATE', delete + ' ' + insert)):
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON attractions "
+                         f"BEGIN {body} {bump} END")
+
+    def _bulk_load(self, conn, records):
+        """Replace every row inside the caller's transaction.
+
+        The per-row triggers are dropped for the duration and the FTS index,
+        R*Tree and rollups rebuilt once at the end, which is several times faster
+        than maintaining them row by row. The caller recreates the triggers.
+        """
+        for name in TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        with self._bulk_cache(conn):
+            conn.execute("DELETE FROM attractions")
+            self._insert(conn, records)
+            conn.execute("INSERT INTO attractions_fts(attractions_fts) VALUES ('rebuild')")
+            conn.execute("DELETE FROM attractions_geo")
+            conn.execute(f"INSERT INTO attractions_geo {geo_rows('seq', 'doc', 'FROM attractions')}")
+            conn.execute("DELETE FROM rollups")
+            conn.execute(rollup_upsert('doc', 1, 'FROM attractions'))
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    @contextmanager
+    def _bulk_cache(self, conn):
+        """Give the connection a large page cache while it writes many rows.
+
+        Inserting random uuids touches index pages all over the file; with
+        SQLite's 2 MB default cache most of those touches miss.
+        """
+        conn.execute(f"PRAGMA cache_size=-{BULK_CACHE_KIB}")
+        try:
+            yield
+        finally:
+            conn.execute("PRAGMA cache_size=-2000")
+
+    def _row(self, attraction):
+        """Column values for one attraction, in table order"""
+        return (attraction['id'], *(column_value(attraction.get(c)) for c in self.columns),
+                codec.dumps(attraction).decode('utf-8'))
+
+    def _insert(self, conn, records, upsert=True):
+        """Insert (or, with upsert, overwrite) records in batches"""
+        placeholders = ', '.join('?' * (len(self.columns) + 2))
+        columns = ', '.join(self.columns)
+        statement = f"INSERT INTO attractions (id, {columns}, doc) VALUES ({placeholders})"
+        if upsert:
+            statement += (" ON CONFLICT(id) DO UPDATE SET "
+                          + ', '.join(f'{c} = excluded.{c}' for c in [*self.columns, 'doc']))
+        for start in range(0, len(records), IMPORT_BATCH):
+            conn.executemany(statement, map(self._row, records[start:start + IMPORT_BATCH]))
+
+    def ensure_index(self, name, factory):
+        """Queries run in SQL, so no in-memory index is built"""
+        return None
+
+    def refresh(self):
+        """Nothing is cached; every read sees the latest committed data"""
+        self._connection()
+
+    def invalidate(self):
+        """Nothing is cached; kept for interface parity with the JSON stores"""
+
+    @contextmanager
+    def write_lock(self):
+        """Hold an immediate (write) transaction on this thread's connection.
+
+        Re-entrant, so a handler can read, check and mutate in one critical
+        section while add/replace/remove take the lock again inside it. The
+        transaction commits when the outermost block exits normally.
+        """
+        conn = self._connection()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield self
+            finally:
+                local.depth -= 1
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        local.depth = 1
+        try:
+            yield self
+        except BaseException:
+            local.depth = 0
+            conn.execute("ROLLBACK")
+            raise
+        local.depth = 0
+        conn.execute("COMMIT")
+
+    def current_version(self):
+        """Return the dataset version, bumped by triggers on every write"""
+        return self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def records(self):
+        """Return every attraction in insertion order"""
+        rows = self._connection().execute("SELECT doc FROM attractions ORDER BY seq")
+        return [codec.loads(doc) for doc, in rows]
+
+    def iter_records(self):
+        """Iterate over every attraction in insertion order, one row at a time"""
+        for doc, in self._connection().execute("SELECT doc FROM attractions ORDER BY seq"):
+            yield codec.loads(doc)
+
+    def count(self):
+        """Return the number of attractions"""
+        return self._connection().execute("SELECT count(*) FROM attractions").fetchone()[0]
+
+    def get(self, attraction_id):
+        """Return the attraction with the given id, or None"""
+        row = self._connection().execute(
+            "SELECT doc FROM attractions WHERE id = ?", (attraction_id,)).fetchone()
+        return codec.loads(row[0]) if row else None
+
+    def lookup(self, ids):
+        """Return the attractions for ids in the same order, skipping unknown ids"""
+        conn, found = self._connection(), {}
+        ids = list(ids)
+        # Stay well under SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(f"SELECT id, doc FROM attractions WHERE id IN "
+                                f"({', '.join('?' * len(chunk))})", chunk)
+            found.update(rows)
+        return [codec.loads(found[i]) for i in ids if i in found]
+
+    def query(self, search_term=None, sort_by='name', reverse=False, limit=None, after=None, filters=(),
+              fuzzy=False, lazy=False):
+        """Run a list query and return (attractions, total, last_position, has_more).
+
+        ``sort_by`` is a sort field or 'relevance' (best bm25 match first,
+        requires a search term). ``after`` is the ``last_position`` of the
+        previous page; positions are ``(sort value, id)`` pairs, or
+        ``(score, rowid)`` when ordering by relevance. ``filters`` are
+        ``query.filters`` objects, answered by the column indexes. With
+        ``fuzzy`` each term also matches its most similar indexed tokens.
+        With ``lazy`` and no limit the attractions are an iterator over the
+        cursor that decodes one row at a time, and there is no last position.
+        """
+        conn = self._connection()
+        params, where = [], []
+        match = self._match(search_term, fuzzy)
+        if sort_by == 'relevance':
+            if not search_term:
+                raise ValueError("Relevance ordering needs a search term")
+            weights = ', '.join(str(w) for w in self.search_fields.values())
+            source = (f"(SELECT rowid AS seq, bm25(attractions_fts, {weights}) AS score "
+                      f"FROM attractions_fts WHERE attractions_fts MATCH ?) AS hits "
+                      f"JOIN attractions AS a ON a.seq = hits.seq")
+            params.append(match)
+            key, direction, compare = ('hits.score', 'a.seq'), 'ASC', '>'
+        else:
+            if sort_by not in self.sort_fields:
+                raise ValueError(f"Unknown sort field: {sort_by}")
+            source = self._search_source(match, where, params)
+            key = (f'a.{sort_by}', 'a.id')
+            direction, compare = ('DESC', '<') if reverse else ('ASC', '>')
+        self._filter_clauses(filters, where, params)
+
+        total = conn.execute(f"SELECT count(*) FROM {source}"
+                             + (f" WHERE {' AND '.join(where)}" if where else ""), params).fetchone()[0]
+        if after is not None:
+            where.append(f"({key[0]}, {key[1]}) {compare} (?, ?)")
+            params.extend(after)
+        sql = (f"SELECT a.doc, {key[0]}, {key[1]} FROM {source}"
+               + (f" WHERE {' AND '.join(where)}" if where else "")
+               + f" ORDER BY {key[0]} {direction}, {key[1]} {direction}")
+        if lazy and not limit:
+            rows = conn.execute(sql, params)
+            return (codec.loads(doc) for doc, _, _ in rows), total, None, False
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        rows = conn.execute(sql, params).fetchall()
+        has_more = bool(limit) and len(rows) > limit
+        rows = rows[:limit] if limit else rows
+        last = (rows[-1][1], rows[-1][2]) if rows else None
+        return [codec.loads(doc) for doc, _, _ in rows], total, last, has_more
+
+    def facets(self, field, search_term=None, filters=(), fuzzy=False):
+        """Return {value: count} for the string values of field among the matching attractions"""
+        if field not in self.columns:
+            raise ValueError(f"Unknown facet field: {field}")
+        params, where = [], [f"typeof(a.{field}) = 'text'", holds_text(f'a.{field}', field)]
+        source = self._search_source(self._match(search_term, fuzzy), where, params)
+        self._filter_clauses(filters, where, params)
+        rows = self._connection().execute(f"SELECT a.{field}, count(*) FROM {source} "
+                                          f"WHERE {' AND '.join(where)} GROUP BY a.{field}", params)
+        return dict(rows.fetchall())
+
+    def nearby(self, lat, lon, limit=None, radius_km=None):
+        """Return up to limit (distance_km, attraction) pairs nearest to (lat, lon), closest first.
+
+        Reads the R*Tree one bounding box at a time, starting at
+        ``NEARBY_START_KM`` and doubling the radius until its circle holds
+        limit points or reaches radius_km. Once a box holds limit points,
+        the limit-th closest of them bounds the answer, so one last box of
+        that radius finishes the search. The rows read follow the density
+        around the point rather than the size of the catalogue.
+        """
+        conn = self._connection()
+        cap = HALF_CIRCUMFERENCE_KM if radius_km is None else min(radius_km, HALF_CIRCUMFERENCE_KM)
+        radius = min(NEARBY_START_KM, cap)
+        while True:
+            found = []
+            for box in bounding_boxes(lat, lon, radius):
+                rows = conn.execute("SELECT g.lat, g.lon, a.id FROM attractions_geo AS g "
+                                    "JOIN attractions AS a ON a.seq = g.seq WHERE g.max_lat >= ? "
+                                    "AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?", box)
+                found.extend((haversine_km(lat, lon, p_lat, p_lon), attraction_id)
+                             for p_lat, p_lon, attraction_id in rows)
+            found.sort()
+            hits = [hit for hit in found if hit[0] <= radius]
+            if radius >= cap or (limit is not None and len(hits) >= limit):
+                break
+            if limit is not None and len(found) >= limit:
+                radius = min(found[limit - 1][0], cap)
+            else:
+                radius = min(radius * 2, cap)
+        hits = hits[:limit]
+        records = {a['id']: a for a in self.lookup([attraction_id for _, attraction_id in hits])}
+        return [(distance, records[attraction_id]) for distance, attraction_id in hits
+                if attraction_id in records]
+
+    def stats(self):
+        """Return count, rating, location and creation statistics from the rollups table"""
+        rows = self._connection().execute(
+            "SELECT kind, key, count, rating_sum, rated FROM rollups WHERE count > 0").fetchall()
+        count, ratings, locations, days = 0, {}, {}, {}
+        for kind, key, n, rating_sum, rated in rows:
+            if kind == 'all':
+                count = n
+            elif kind == 'rating':
+                ratings[key] = n
+            elif kind == 'location':
+                locations[key] = (n, rating_sum, rated)
+            else:
+                days[key] = n
+        return summarise(count, ratings, locations, days)
+
+    def _match(self, search_term, fuzzy):
+        """FTS5 MATCH expression for a search term, or None without one"""
+        if not search_term:
+            return None
+        return match_expression(search_term, self._similar_tokens(search_term) if fuzzy else None)
+
+    def _similar_tokens(self, search_term):
+        """Map each long enough search term to its most similar tokens in the FTS vocabulary.
+
+        The vocabulary's trigram index is built on the first fuzzy search.
+        Writes through this store add their tokens to it as they happen;
+        once the dataset version moves on (other workers' writes, deleted
+        tokens) it is rebuilt in the background, at most every
+        ``VOCABULARY_REBUILD_SECONDS``, and the current index keeps
+        answering until the new one is ready.
+        """
+        version = self.current_version()
+        with self._vocabulary_lock:
+            if self._vocabulary is None:
+                self._vocabulary = (version, self._read_vocabulary())
+                self._vocabulary_built = time.monotonic()
+            elif self._vocabulary[0] != version:
+                self._schedule_vocabulary_rebuild()
+            index = self._vocabulary[1]
+        return {term: [token for token, _ in index.similar(term)]
+                for term in search_term.split() if len(term) >= FUZZY_MIN_LENGTH}
+
+    def _read_vocabulary(self):
+        """A TrigramIndex over every token in the FTS table"""
+        index = TrigramIndex()
+        for term, in self._connection().execute("SELECT term FROM attractions_vocab"):
+            index.add(term)
+        return index
+
+    def _schedule_vocabulary_rebuild(self):
+        """Start a background rebuild unless one is running or the last was too recent; holds the lock"""
+        running = self._vocabulary_rebuild is not None and self._vocabulary_rebuild.is_alive()
+        if running or time.monotonic() - self._vocabulary_built < VOCABULARY_REBUILD_SECONDS:
+            return
+        self._vocabulary_rebuild = threading.Thread(target=self._rebuild_vocabulary, daemon=True)
+        self._vocabulary_rebuild.start()
+
+    def _rebuild_vocabulary(self):
+        try:
+            # The version is read first, so a write racing the scan only triggers another rebuild
+            version = self.current_version()
+            index = self._read_vocabulary()
+        except sqlite3.Error:
+            logging.exception("Rebuilding the fuzzy search vocabulary failed")
+            return
+        with self._vocabulary_lock:
+            self._vocabulary = (version, index)
+            self._vocabulary_built = time.monotonic()
+
+    def _note_vocabulary(self, records):
+        """Add the search tokens of written records to the fuzzy vocabulary, once it is built"""
+        if self._vocabulary is None:
+            return
+        with self._vocabulary_lock:
+            index = self._vocabulary[1]
+            for record in records:
+                for field in self.search_fields:
+                    value = record.get(field)
+                    if isinstance(value, str):
+                        for token in tokenize(value):
+                            index.add(token)
+
+    @staticmethod
+    def _search_source(match, where, params):
+        """FROM clause for an optionally searched query, adding the MATCH condition to where"""
+        if match is None:
+            return "attractions AS a"
+        where.append("attractions_fts MATCH ?")
+        params.append(match)
+        return "attractions AS a JOIN attractions_fts ON attractions_fts.rowid = a.seq"
+
+    def _filter_clauses(self, filters, where, params):
+        """Add SQL conditions for range and value filters.
+
+        Values are type-checked the way sort keys order them, so a numeric
+        range never matches text and a text range never matches numbers.
+        """
+        for f in filters:
+            if f.field not in self.columns:
+                raise ValueError(f"Cannot filter on {f.field}")
+            column = f'a.{f.field}'
+            if f.kind == 'in':
+                values = sorted(f.values)
+                where.append(f"{column} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+                if '' in f.values:
+                    where.append(holds_text(column, f.field))
+                continue
+            numeric = f.low[0] == 0
+            where.append(f"typeof({column}) IN ('integer', 'real')" if numeric else f"typeof({column}) = 'text'")
+            if not numeric and f.low_value is None:
+                # An open text range starts after the empty string, as its (1, '\0') bound does
+                where.append(f"{column} > ''")
+            for value, operator in ((f.low_value, '>' if f.exclusive else '>='),
+                                    (f.high_value, '<' if f.exclusive else '<=')):
+                if value is not None:
+                    where.append(f"{column} {operator} ?")
+                    params.append(value)
+
+    def add(self, attraction):
+        """Insert a new attraction"""
+        with self.write_lock():
+            self._insert(self._connection(), [attraction])
+            self._note_vocabulary([attraction])
+
+    def add_many(self, attractions):
+        """Insert new attractions in one transaction; an existing id fails the whole batch.
+
+        The FTS, R*Tree and rollup rows for the batch are added with one
+        INSERT ... SELECT each instead of a trigger call per row.
+        """
+        with self.write_lock():
+            conn = self._connection()
+            for name in TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            last_seq = conn.execute("SELECT coalesce(max(seq), 0) FROM attractions").fetchone()[0]
+            text = ', '.join(self.search_fields)
+            with self._bulk_cache(conn):
+                self._insert(conn, attractions, upsert=False)
+                conn.execute(f"INSERT INTO attractions_fts(rowid, {text}) "
+                             f"SELECT seq, {text} FROM attractions WHERE seq > ?", (last_seq,))
+                conn.execute(f"INSERT INTO attractions_geo {geo_rows('seq', 'doc', 'FROM attractions')} "
+                             f"AND seq > ?", (last_seq,))
+                conn.execute(rollup_upsert('doc', 1, 'FROM attractions', 'seq > ?'), (last_seq,) * 4)
+            conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+            self._create_triggers(conn)
+            self._note_vocabulary(attractions)
+
+    def apply_changes(self, changes):
+        """Apply ('put', attraction) and ('delete', id) changes in one transaction"""
+        with self.write_lock():
+            conn = self._connection()
+            for op, value in changes:
+                if op == 'put':
+                    self._insert(conn, [value])
+                else:
+                    conn.execute("DELETE FROM attractions WHERE id = ?", (value,))
+            self._note_vocabulary([value for op, value in changes if op == 'put'])
+
+    def replace(self, attraction_id, attraction):
+        """Swap in a new version of an attraction; False if it does not exist"""
+        with self.write_lock():
+            conn = self._connection()
+            assignments = ', '.join(f'{c} = ?' for c in self.columns)
+            row = self._row(attraction)
+            cursor = conn.execute(f"UPDATE attractions SET id = ?, {assignments}, doc = ? WHERE id = ?",
+                                  (*row, attraction_id))
+            self._note_vocabulary([attraction])
+            return cursor.rowcount > 0
+
+    def remove(self, attraction_id):
+        """Delete an attraction by id; False if it does not exist"""
+        with self.write_lock():
+            cursor = self._connection().execute(
+                "DELETE FROM attractions WHERE id = ?", (attraction_id,))
+            return cursor.rowcount > 0
+
+    def save(self, records):
+        """Replace the whole dataset in one transaction"""
+        with self.write_lock():
+            conn = self._connection()
+            self._bulk_load(conn, records)
+            self._create_triggers(conn)
+            self._note_vocabulary(records)
+
+    def import_json(self, json_path=None):
+        """Replace the database contents with a JSON data file; returns the record count"""
+        with open(json_path or self.path, 'rb') as f:
+            records = codec.loads(f.read())
+        self.save(records)
+        return len(records)
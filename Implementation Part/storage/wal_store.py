@@ -0,0 +1,226 @@
+import os
+import json
+import logging
+import threading
+
+from storage import codec
+from storage.json_store import AttractionStore, REINDEX_RATIO
+
+# Compact the log into the snapshot once it grows past this many bytes
+DEFAULT_COMPACT_BYTES = 4 * 1024 * 1024
+
+
+class WalAttractionStore(AttractionStore):
+    """Attraction store that appends mutations to a write-ahead log.
+
+    The data file becomes a snapshot and every create, update or delete is
+    appended to ``<data file>.wal`` as one compact JSON line, so a write
+    costs O(record) instead of re-serialising the whole catalogue. Loading
+    replays the log over the snapshot; other processes only read the bytes
+    appended since they last looked. Once the log passes ``compact_bytes``
+    a background thread folds it into a fresh snapshot.
+
+    Replay is idempotent (``put`` is an upsert, ``delete`` of a missing id
+    is a no-op), so a crash between the snapshot rename and the log
+    truncation only means some entries are applied twice.
+    """
+
+    def __init__(self, path, compact_bytes=DEFAULT_COMPACT_BYTES, compact_records=False):
+        super().__init__(path, compact_records)
+        self.log_path = path + '.wal'
+        self.compact_bytes = compact_bytes
+        self._log_ino = None
+        self._log_offset = 0
+        self._compacting = False
+
+    def _log_stat(self):
+        """Return (inode, size) of the log, or None if it does not exist"""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size)
+
+    def _expected_log_stat(self):
+        """The log (inode, size) we would see if nobody else had written"""
+        return None if self._log_ino is None else (self._log_ino, self._log_offset)
+
+    def refresh(self):
+        """Reload the snapshot if it changed, else replay new log entries"""
+        if (self._loaded and self._current_stat_key() == self._stat_key
+                and self._log_stat() == self._expected_log_stat()):
+            return
+        if not self._lock.acquire(blocking=not self._loaded):
+            return
+        try:
+            log_stat = self._log_stat()
+            if not self._loaded or self._current_stat_key() != self._stat_key:
+                self._reload()
+            elif log_stat is None:
+                if self._log_ino is not None:
+                    self._reload()
+            elif self._log_ino is not None and (log_stat[0] != self._log_ino or log_stat[1] < self._log_offset):
+                # The log was swapped by a compaction we did not see
+                self._reload()
+            elif log_stat != self._expected_log_stat():
+                self._replay_tail()
+        finally:
+            self._lock.release()
+
+    def _reload(self):
+        """Read the snapshot and replay the whole log on top of it"""
+        while True:
+            snapshot_key = self._current_stat_key()
+            if snapshot_key is None:
+                self._set_records([])
+            else:
+                try:
+                    with open(self.path, 'rb') as f:
+                        self._set_records(self._parse(f.read()))
+                except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
+                    logging.error(f"Error reading snapshot {self.path}. Retrying on next access.")
+                    self._loaded = False
+                    return
+            self._log_ino, self._log_offset = None, 0
+            self._replay_tail()
+            # A compaction may have swapped snapshot and log while we read them
+            if self._current_stat_key() == snapshot_key:
+                self._stat_key = snapshot_key
+                self._loaded = True
+                return
+
+    def _replay_tail(self):
+        """Apply complete log lines appended since the last replay"""
+        try:
+            f = open(self.log_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            ino = os.fstat(f.fileno()).st_ino
+            if ino != self._log_ino:
+                self._log_ino, self._log_offset = ino, 0
+            f.seek(self._log_offset)
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1
+        # Anything after the last newline is a write still in progress
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                self._apply_entry(line)
+        self._log_offset += end
+
+    def _apply_entry(self, line):
+        """Apply one log line to the in-memory list"""
+        try:
+            entry = codec.loads(line)
+        except json.JSONDecodeError:
+            logging.error(f"Skipping corrupt entry in {self.log_path}")
+            return
+        if entry.get('op') == 'put':
+            self._apply_put(entry['record'])
+        elif entry.get('op') == 'delete':
+            self._apply_delete(entry['id'])
+
+    def _persist_put(self, attraction):
+        self._append({'op': 'put', 'record': attraction})
+
+    def _persist_delete(self, attraction_id):
+        self._append({'op': 'delete', 'id': attraction_id})
+
+    def _persist_changes(self, changes):
+        if len(changes) * REINDEX_RATIO >= len(self._records):
+            # A batch this large is cheaper to write as a new snapshot than to log
+            self._write_snapshot()
+        else:
+            self._append(*({'op': 'put', 'record': value} if op == 'put' else {'op': 'delete', 'id': value}
+                           for op, value in changes))
+
+    def _append(self, *entries):
+        """Append entries to the log with a single write and fsync"""
+        line = b''.join(codec.dumps(entry) + b'\n' for entry in entries)
+        try:
+            fd = os.open(self.log_path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                st = os.fstat(fd)
+                # Never glue an entry onto a line torn by a crashed writer
+                if st.st_size and os.pread(fd, 1, st.st_size - 1) != b'\n':
+                    line = b'\n' + line
+                os.write(fd, line)
+                os.fsync(fd)
+                end = os.lseek(fd, 0, os.SEEK_CUR)
+            finally:
+                os.close(fd)
+        except Exception:
+            self.invalidate()
+            raise
+        if self._log_ino in (None, st.st_ino) and end - len(line) == self._log_offset:
+            # Nobody else appended since our last replay; our entry is applied
+            self._log_ino, self._log_offset = st.st_ino, end
+        if end > self.compact_bytes and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    def save(self, records):
+        """Replace the snapshot and start an empty log"""
+        with self.write_lock():
+            self._set_records(records)
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        """Write the cached records as the new snapshot and start an empty log"""
+        self._drop_holes()
+        try:
+            tmp_path, snapshot_key = self._write_temp(self._records)
+            os.replace(tmp_path, self.path)
+            self._truncate_log(b'')
+        except Exception:
+            self.invalidate()
+            raise
+        self._stat_key = snapshot_key
+        self._loaded = True
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logging.error(f"Error compacting {self.log_path}: {str(e)}")
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """Fold the log into a new snapshot written with temp + fsync + rename"""
+        with self.write_lock():
+            self._drop_holes()
+            records = self._records.copy()
+            offset = self._log_offset
+            base = (self._stat_key, self._log_ino)
+        # Serialise outside the lock so writers are not held up
+        tmp_path, snapshot_key = self._write_temp(records)
+        with self.write_lock():
+            if (self._stat_key, self._log_ino) != base:
+                # Another worker compacted first; its snapshot already covers ours
+                os.remove(tmp_path)
+                return
+            consumed = self._log_offset
+            try:
+                with open(self.log_path, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+            except FileNotFoundError:
+                tail = b''
+            os.replace(tmp_path, self.path)
+            # Keep entries appended while the snapshot was being written
+            self._truncate_log(tail)
+            self._stat_key = snapshot_key
+            self._log_offset = consumed - offset
+        logging.debug(f"Compacted {self.log_path} into {self.path}")
+
+    def _truncate_log(self, contents):
+        """Atomically replace the log with contents"""
+        tmp_path = self.log_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(contents)
+            f.flush()
+            os.fsync(f.fileno())
+            ino = os.fstat(f.fileno()).st_ino
+        os.replace(tmp_path, self.log_path)
+        self._log_ino, self._log_offset = ino, len(contents)
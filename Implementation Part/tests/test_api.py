@@ -1,3 +1,4 @@
+import gzip
 import json
 import os
 import sys
@@ -224,3 +225,349 @@ def test_sort_attractions(client):
     assert len(data) == 2
     assert data[0]['name'] == "Blarney Castle"  # Higher rating
     assert data[1]['name'] == "Test Attraction"
+
+def test_update_with_stale_etag(client):
+    """Test that If-Match rejects updates based on an old version"""
+    response = client.get('/api/attractions/12345-test-id')
+    etag = response.headers['ETag']
+    
+    response = client.put('/api/attractions/12345-test-id',
+                         data=json.dumps({"name": "First Edit"}),
+                         content_type='application/json',
+                         headers={'If-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    
+    # A second writer still holding the original ETag loses
+    response = client.put('/api/attractions/12345-test-id',
+                         data=json.dumps({"name": "Second Edit"}),
+                         content_type='application/json',
+                         headers={'If-Match': etag})
+    assert response.status_code == 412
+    
+    response = client.delete('/api/attractions/12345-test-id', headers={'If-Match': etag})
+    assert response.status_code == 412
+    assert client.get('/api/attractions/12345-test-id').status_code == 200
+
+def test_search_ranks_by_relevance(client):
+    """Test that search results come back most relevant first by default"""
+    client.post('/api/attractions',
+               data=json.dumps({
+                   "name": "Malahide Castle",
+                   "location": "Dublin",
+                   "description": "Castle with a test garden",
+                   "rating": 4.2
+               }),
+               content_type='application/json')
+    
+    # "Test Attraction" matches in its name, Malahide only in its description
+    response = client.get('/api/attractions?search=test')
+    data = json.loads(response.data)
+    
+    assert [a['name'] for a in data] == ["Test Attraction", "Malahide Castle"]
+    
+    # Prefixes and text inside words still match
+    response = client.get('/api/attractions?search=mala')
+    assert len(json.loads(response.data)) == 1
+    response = client.get('/api/attractions?search=hide')
+    assert len(json.loads(response.data)) == 1
+
+def test_paginate_attractions(client):
+    """Test walking the list a page at a time with a cursor"""
+    for name, rating in [("Blarney Castle", 4.8), ("Kylemore Abbey", 4.6), ("Rock of Cashel", 4.7)]:
+        client.post('/api/attractions',
+                   data=json.dumps({"name": name, "location": "Ireland",
+                                    "description": "Test", "rating": rating}),
+                   content_type='application/json')
+    
+    names = []
+    url = '/api/attractions?sort_by=rating&order=desc&limit=2&fields=id,name,rating'
+    while url:
+        response = client.get(url)
+        page = json.loads(response.data)
+        assert response.status_code == 200
+        assert page['total'] == 4
+        assert len(page['items']) <= 2
+        assert all(set(a) == {'id', 'name', 'rating'} for a in page['items'])
+        names += [a['name'] for a in page['items']]
+        url = None
+        if page['next_cursor']:
+            url = ('/api/attractions?sort_by=rating&order=desc&limit=2&fields=id,name,rating'
+                   f"&cursor={page['next_cursor']}")
+    
+    assert names == ["Blarney Castle", "Rock of Cashel", "Kylemore Abbey", "Test Attraction"]
+
+def test_invalid_pagination_parameters(client):
+    """Test that bad limits and cursors are rejected"""
+    assert client.get('/api/attractions?limit=0').status_code == 400
+    assert client.get('/api/attractions?limit=abc').status_code == 400
+    assert client.get('/api/attractions?limit=1&cursor=not-a-cursor').status_code == 400
+    
+    # A cursor cannot be replayed against a different sort
+    client.post('/api/attractions',
+               data=json.dumps({"name": "Blarney Castle", "location": "Cork",
+                                "description": "Test", "rating": 4.8}),
+               content_type='application/json')
+    cursor = json.loads(client.get('/api/attractions?limit=1').data)['next_cursor']
+    assert client.get(f'/api/attractions?limit=1&sort_by=rating&cursor={cursor}').status_code == 400
+
+def test_list_etag_and_not_modified(client):
+    """Test that repeated list requests are served from cache with 304 support"""
+    response = client.get('/api/attractions?sort_by=rating')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    
+    response = client.get('/api/attractions?sort_by=rating', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    
+    stats = json.loads(client.get('/api/cache/stats').data)
+    assert stats['hits'] >= 1
+    
+    # A write bumps the dataset version, so the old ETag no longer matches
+    client.put('/api/attractions/12345-test-id',
+              data=json.dumps({"name": "Renamed Attraction"}),
+              content_type='application/json')
+    response = client.get('/api/attractions?sort_by=rating', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert json.loads(response.data)[0]['name'] == "Renamed Attraction"
+
+def test_compressed_and_streamed_lists(client):
+    """Test gzip negotiation for cached lists and streaming of large lists"""
+    for i in range(5):
+        client.post('/api/attractions',
+                   data=json.dumps({"name": f"Attraction {i}", "location": "Kerry",
+                                    "description": "Lakes and mountains " * 20, "rating": 4.0}),
+                   content_type='application/json')
+    
+    plain = client.get('/api/attractions')
+    response = client.get('/api/attractions', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] != plain.headers['ETag']
+    assert gzip.decompress(response.data) == plain.data
+    
+    app.config['STREAM_MIN_RECORDS'] = 1
+    try:
+        response = client.get('/api/attractions?fields=id,name')
+        assert response.is_streamed
+        data = json.loads(response.data)
+        assert len(data) == 6
+        assert set(data[0]) == {'id', 'name'}
+    finally:
+        app.config['STREAM_MIN_RECORDS'] = 5000
+
+def test_bulk_create_attractions(client):
+    """Test NDJSON and JSON array bulk creates with per-row errors"""
+    rows = [{"name": f"Bulk {i}", "location": "Sligo", "description": "Bulk", "rating": 3}
+            for i in range(3)]
+    body = '\n'.join([json.dumps(rows[0]), '{not json', json.dumps(rows[1]),
+                      json.dumps({"name": "No rating", "location": "Sligo", "description": "x"}),
+                      '', json.dumps(rows[2])])
+    response = client.post('/api/attractions/bulk', data=body, content_type='application/x-ndjson')
+    data = json.loads(response.data)
+    
+    assert response.status_code == 201
+    assert data['created'] == 3
+    assert data['failed'] == 2
+    assert data['errors'] == [{"row": 2, "error": "Invalid JSON"},
+                              {"row": 4, "error": "Missing required field: rating"}]
+    
+    response = client.post('/api/attractions/bulk', data=json.dumps(rows[:2]),
+                           content_type='application/json')
+    assert json.loads(response.data)['created'] == 2
+    assert len(read_data()) == 6
+    
+    response = client.post('/api/attractions/bulk', data=json.dumps({"name": "x"}),
+                           content_type='application/json')
+    assert response.status_code == 400
+    response = client.post('/api/attractions/bulk', data='x', content_type='text/plain')
+    assert response.status_code == 415
+
+def test_export_attractions(client):
+    """Test that export streams one attraction per line"""
+    client.post('/api/attractions/bulk', content_type='application/x-ndjson',
+                data=json.dumps({"name": "Export", "location": "Mayo",
+                                 "description": "x", "rating": 2}))
+    response = client.get('/api/attractions/export')
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    lines = response.data.decode('utf-8').splitlines()
+    assert [json.loads(line)['name'] for line in lines] == ["Test Attraction", "Export"]
+    
+    response = client.get('/api/attractions/export', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(response.data).decode('utf-8').splitlines() == lines
+
+def test_batch_get_attractions(client):
+    """Test fetching several attractions by id in one request"""
+    response = client.post('/api/attractions/batch-get',
+                           data=json.dumps({"ids": ["12345-test-id", "missing-id"]}),
+                           content_type='application/json')
+    data = json.loads(response.data)
+    
+    assert response.status_code == 200
+    assert list(data['attractions']) == ["12345-test-id"]
+    assert data['attractions']["12345-test-id"]['name'] == "Test Attraction"
+    assert data['etags']["12345-test-id"] == client.get('/api/attractions/12345-test-id').headers['ETag'].strip('"')
+    assert data['missing'] == ["missing-id"]
+    
+    response = client.post('/api/attractions/batch-get', data=json.dumps({"ids": "12345-test-id"}),
+                           content_type='application/json')
+    assert response.status_code == 400
+
+def test_batch_update_attractions(client):
+    """Test that batch PATCH applies updates and deletes in one write"""
+    created = json.loads(client.post('/api/attractions', content_type='application/json',
+                                     data=json.dumps({"name": "Second", "location": "Cork",
+                                                      "description": "x", "rating": 3})).data)
+    etag = client.get('/api/attractions/12345-test-id').headers['ETag'].strip('"')
+    
+    response = client.patch('/api/attractions/batch', content_type='application/json',
+                            data=json.dumps({"operations": [
+                                {"op": "update", "id": "12345-test-id", "fields": {"rating": 5}, "if_match": etag},
+                                {"op": "delete", "id": created['id']}
+                            ]}))
+    data = json.loads(response.data)
+    
+    assert response.status_code == 200
+    assert data['applied']
+    assert [r['status'] for r in data['results']] == [200, 200]
+    assert data['results'][0]['attraction']['rating'] == 5
+    assert [a['id'] for a in read_data()] == ["12345-test-id"]
+    assert read_data()[0]['rating'] == 5
+
+def test_batch_update_is_atomic(client):
+    """Test that one failing operation leaves every attraction unchanged"""
+    response = client.patch('/api/attractions/batch', content_type='application/json',
+                            data=json.dumps({"operations": [
+                                {"op": "update", "id": "12345-test-id", "fields": {"name": "Changed"}},
+                                {"op": "update", "id": "12345-test-id", "fields": {"rating": 9}},
+                                {"op": "delete", "id": "missing-id"},
+                                {"op": "update", "id": "12345-test-id", "fields": {}, "if_match": "stale"}
+                            ]}))
+    data = json.loads(response.data)
+    
+    assert response.status_code == 409
+    assert not data['applied']
+    assert [r['status'] for r in data['results']] == [424, 400, 404, 412]
+    assert read_data()[0]['name'] == "Test Attraction"
+    
+    response = client.patch('/api/attractions/batch', content_type='application/json',
+                            data=json.dumps({"operations": []}))
+    assert response.status_code == 400
+
+def test_filter_attractions(client):
+    """Test rating, location and created_at filters with facet counts"""
+    records = TEST_DATA + [
+        {"id": f"f{i}", "name": name, "location": location, "description": "Test", "rating": rating,
+         "created_at": created_at}
+        for i, (name, location, rating, created_at) in enumerate([
+            ("Blarney Castle", "County Cork", 4.8, "2024-03-01T09:00:00"),
+            ("Fota Wildlife Park", "County Cork", 4.2, "2024-06-01T09:00:00"),
+            ("Kylemore Abbey", "County Galway", 4.6, "2024-09-01T09:00:00")])]
+    with open(TEST_DATA_FILE, 'w') as f:
+        json.dump(records, f)
+    
+    names = lambda url: [a['name'] for a in json.loads(client.get(url).data)]
+    assert names('/api/attractions?min_rating=4.5&sort_by=rating') == [
+        "Test Attraction", "Kylemore Abbey", "Blarney Castle"]
+    assert names('/api/attractions?min_rating=4.5&max_rating=4.7&location=County%20Galway') == ["Kylemore Abbey"]
+    assert names('/api/attractions?location=County%20Cork&location=Test%20Location&sort_by=rating'
+                 '&order=desc') == ["Blarney Castle", "Test Attraction", "Fota Wildlife Park"]
+    assert names('/api/attractions?created_after=2024-01-01&created_before=2024-07-01') == [
+        "Blarney Castle", "Fota Wildlife Park"]
+    assert names('/api/attractions?search=castle&location=County%20Galway') == []
+    
+    # Facet counts ignore the facet's own filter but apply every other one
+    page = json.loads(client.get('/api/attractions?facets=location&location=County%20Cork&min_rating=4.3').data)
+    assert [a['name'] for a in page['items']] == ["Blarney Castle"] and page['total'] == 1
+    assert page['facets'] == {"location": {"County Cork": 1, "County Galway": 1, "Test Location": 1}}
+    
+    # Cursors carry the filters they were issued for
+    page = json.loads(client.get('/api/attractions?location=County%20Cork&limit=1').data)
+    assert page['total'] == 2 and page['next_cursor']
+    url = f"/api/attractions?location=County%20Cork&limit=1&cursor={page['next_cursor']}"
+    assert [a['name'] for a in json.loads(client.get(url).data)['items']] == ["Fota Wildlife Park"]
+    assert client.get(f"/api/attractions?limit=1&cursor={page['next_cursor']}").status_code == 400
+    
+    for query in ('min_rating=high', 'max_rating=nan', 'created_after=yesterday', 'facets=rating'):
+        assert client.get(f'/api/attractions?{query}').status_code == 400
+
+def test_nearby_attractions(client):
+    """Test nearest-first search by position, kept current through updates"""
+    base = {"description": "Test", "rating": 4.0, "location": "Test Location"}
+    places = [("Cliffs of Moher", 52.9715, -9.4309), ("Blarney Castle", 51.9291, -8.5709),
+              ("Newgrange", 53.6947, -6.4755), ("Giant's Causeway", 55.2408, -6.5116)]
+    ids = {}
+    for name, lat, lon in places:
+        response = client.post('/api/attractions', json=dict(base, name=name, lat=lat, lon=lon))
+        assert response.status_code == 201
+        ids[name] = json.loads(response.data)['id']
+    
+    # From Dublin: Newgrange 41 km, Causeway 211 km, Cliffs 216 km, Blarney 222 km
+    data = json.loads(client.get('/api/attractions/nearby?lat=53.3498&lon=-6.2603').data)
+    assert [a['name'] for a in data['items']] == [
+        "Newgrange", "Giant's Causeway", "Cliffs of Moher", "Blarney Castle"]
+    assert 40 < data['items'][0]['distance_km'] < 42
+    assert data['total'] == 4 and data['limit'] == 20
+    
+    data = json.loads(client.get('/api/attractions/nearby?lat=53.3498&lon=-6.2603&radius_km=100'
+                                 '&fields=name').data)
+    assert data['items'] == [{"name": "Newgrange", "distance_km": data['items'][0]['distance_km']}]
+    data = json.loads(client.get('/api/attractions/nearby?lat=52&lon=-8.6&limit=1').data)
+    assert [a['name'] for a in data['items']] == ["Blarney Castle"]
+    
+    # Moving an attraction moves it in the index
+    response = client.put(f"/api/attractions/{ids['Blarney Castle']}", json={"lat": 53.35, "lon": -6.26})
+    assert response.status_code == 200
+    data = json.loads(client.get('/api/attractions/nearby?lat=53.3498&lon=-6.2603&limit=1').data)
+    assert [a['name'] for a in data['items']] == ["Blarney Castle"]
+    
+    for body in ({"lat": 53.0}, {"lat": 95, "lon": -6.0}, {"lat": "53", "lon": -6.0}):
+        assert client.post('/api/attractions', json=dict(base, name="Bad", **body)).status_code == 400
+    assert client.put(f"/api/attractions/{ids['Newgrange']}", json={"lon": 200}).status_code == 400
+    for query in ('lat=53', 'lat=91&lon=0', 'lat=x&lon=0', 'lat=53&lon=-6&radius_km=0', 'lat=53&lon=-6&limit=0'):
+        assert client.get(f'/api/attractions/nearby?{query}').status_code == 400
+
+def test_attraction_stats(client):
+    """Test the statistics endpoint following creates, updates and deletes"""
+    data = json.loads(client.get('/api/attractions/stats').data)
+    assert data == {
+        "count": 1,
+        "rating": {"count": 1, "mean": 4.5, "min": 4.5, "max": 4.5, "histogram": {"4": 1}},
+        "locations": {"Test Location": {"count": 1, "mean_rating": 4.5}},
+        "created": {"per_day": {"2023-01-01": 1}, "per_month": {"2023-01": 1}},
+    }
+    
+    response = client.post('/api/attractions', json={"name": "Blarney Castle", "location": "County Cork",
+                                                     "description": "Test", "rating": 3.5})
+    new_id = json.loads(response.data)['id']
+    client.put('/api/attractions/12345-test-id', json={"location": "County Cork", "rating": 5})
+    data = json.loads(client.get('/api/attractions/stats').data)
+    assert data['count'] == 2 and data['rating']['mean'] == 4.25
+    assert data['rating']['histogram'] == {"3": 1, "5": 1}
+    assert data['locations'] == {"County Cork": {"count": 2, "mean_rating": 4.25}}
+    assert sum(data['created']['per_month'].values()) == 2
+    
+    client.delete(f'/api/attractions/{new_id}')
+    data = json.loads(client.get('/api/attractions/stats').data)
+    assert data['count'] == 1 and data['created']['per_day'] == {"2023-01-01": 1}
+
+def test_fuzzy_search_attractions(client):
+    """Test typo-tolerant search with ?fuzzy=1, including Irish fadas"""
+    for name, location in (("Killarney National Park", "County Kerry"), ("Giant's Causeway", "County Antrim"),
+                           ("Dún Aonghasa", "Inis Mór")):
+        client.post('/api/attractions', json={"name": name, "location": location, "description": "Test",
+                                              "rating": 4.0})
+    names = lambda url: [a['name'] for a in json.loads(client.get(url).data)]
+    assert names('/api/attractions?search=Killarny') == []
+    assert names('/api/attractions?search=Killarny&fuzzy=1') == ["Killarney National Park"]
+    assert names('/api/attractions?search=Giants%20Causway&fuzzy=true') == ["Giant's Causeway"]
+    assert names('/api/attractions?search=dun%20aonghusa&fuzzy=1') == ["Dún Aonghasa"]
+    assert names('/api/attractions?search=D%C3%9AN') == ["Dún Aonghasa"]
+    
+    # Cursors are tied to the search mode they were issued for
+    page = json.loads(client.get('/api/attractions?search=test&fuzzy=1&limit=1').data)
+    assert page['next_cursor']
+    assert client.get(f"/api/attractions?search=test&limit=1&cursor={page['next_cursor']}").status_code == 400
@@ -0,0 +1,49 @@
+import gc
+import json
+import logging
+import os
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from storage.registry import get_store
+
+@pytest.fixture
+def root_level():
+    """Restore the root log level changed by create_app"""
+    level = logging.getLogger().level
+    yield
+    logging.getLogger().setLevel(level)
+
+def test_data_file_comes_from_config(tmp_path, root_level):
+    """DATA_FILE passed to create_app is created and served"""
+    data_file = tmp_path / "nested" / "attractions.json"
+    app = create_app({'DATA_FILE': str(data_file), 'TESTING': True})
+    assert json.loads(data_file.read_text()) == []
+    assert app.config['APP_PROFILE'] == 'development' and not app.config['PRELOAD_DATA']
+    with app.test_client() as client:
+        assert client.post('/api/attractions', json={"name": "Newgrange", "location": "County Meath",
+                                                     "description": "Passage tomb", "rating": 5}).status_code == 201
+    assert json.loads(data_file.read_text())[0]['name'] == "Newgrange"
+
+def test_production_profile_preloads(tmp_path, root_level):
+    """The production profile indexes the data up front and logs at INFO"""
+    data_file = tmp_path / "attractions.json"
+    data_file.write_text(json.dumps([{"id": "a1", "name": "Cliffs of Moher", "location": "County Clare",
+                                      "description": "Sea cliffs", "rating": 4.9}]))
+    try:
+        app = create_app({'APP_PROFILE': 'production', 'DATA_FILE': str(data_file)})
+        assert gc.get_freeze_count() > 0
+    finally:
+        gc.unfreeze()
+    assert logging.getLogger().level == logging.INFO
+    store = get_store(app.config['DATA_FILE'])
+    assert 'text' in store.indexes and 'sort:rating' in store.indexes
+
+def test_unknown_profile_is_rejected():
+    """A misspelt APP_PROFILE fails at startup rather than running as development"""
+    with pytest.raises(ValueError):
+        create_app({'APP_PROFILE': 'prod'})
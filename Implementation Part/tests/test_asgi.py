@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from serving.asgi import WsgiToAsgi
+
+TEST_RECORDS = [
+    {"id": str(i), "name": f"Attraction {i}", "location": "County Kerry",
+     "description": "Lakes", "rating": 4, "created_at": "2025-01-01T10:00:00"}
+    for i in range(3)
+]
+
+@pytest.fixture
+def application(tmp_path):
+    """ASGI adapter around the app, backed by a temporary data file"""
+    data_file = tmp_path / "attractions.json"
+    data_file.write_text(json.dumps(TEST_RECORDS))
+    saved = dict(app.config)
+    app.config.update(TESTING=True, DATA_FILE=str(data_file))
+    adapter = WsgiToAsgi(app, max_workers=2)
+    yield adapter
+    adapter.shutdown()
+    app.config.clear()
+    app.config.update(saved)
+
+async def call(application, method, path, query=b'', body_chunks=(b'',), headers=(), delay=0):
+    """Send one request through the adapter; delay simulates a slow client on both sides"""
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(k.encode(), v.encode()) for k, v in headers], 'http_version': '1.1'}
+    pending = list(body_chunks)
+    messages = []
+
+    async def receive():
+        await asyncio.sleep(delay)
+        chunk = pending.pop(0)
+        return {'type': 'http.request', 'body': chunk, 'more_body': bool(pending)}
+
+    async def send(message):
+        messages.append(message)
+        if not message.get('more_body', True):
+            await asyncio.sleep(delay)
+
+    await application(scope, receive, send)
+    start = messages[0]
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+    return start['status'], dict(start['headers']), body, messages
+
+def test_get_and_post(application):
+    """Query strings, headers and chunked request bodies reach the app"""
+    status, headers, body, _ = asyncio.run(call(application, 'GET', '/api/attractions',
+                                                query=b'sort_by=name&order=desc'))
+    assert status == 200 and headers[b'content-type'] == b'application/json'
+    assert [a['id'] for a in json.loads(body)] == ["2", "1", "0"]
+
+    payload = json.dumps({"name": "Skellig Michael", "location": "County Kerry",
+                          "description": "Island", "rating": 5}).encode()
+    status, _, body, _ = asyncio.run(call(application, 'POST', '/api/attractions',
+                                          body_chunks=(payload[:10], payload[10:]),
+                                          headers=[('Content-Type', 'application/json')]))
+    assert status == 201 and json.loads(body)['name'] == "Skellig Michael"
+
+def test_streamed_response_is_sent_in_chunks(application, monkeypatch):
+    """A streaming response is forwarded as several body messages"""
+    monkeypatch.setattr('serving.asgi.SEND_CHUNK_BYTES', 1)
+    status, _, body, messages = asyncio.run(call(application, 'GET', '/api/attractions/export'))
+    assert status == 200
+    assert [json.loads(line)['id'] for line in body.splitlines()] == ["0", "1", "2"]
+    assert len(messages) > 2 and messages[-1]['more_body'] is False
+
+def test_streamed_body_stays_on_the_request_thread(monkeypatch):
+    """Every chunk of a response is pulled on the thread that ran the app, as a SQLite cursor needs"""
+    import threading
+    monkeypatch.setattr('serving.asgi.SEND_CHUNK_BYTES', 1)
+
+    def wsgi_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        owner = threading.get_ident()
+
+        def body():
+            for _ in range(20):
+                time.sleep(0.001)
+                yield b'same' if threading.get_ident() == owner else b'moved'
+        return body()
+
+    adapter = WsgiToAsgi(wsgi_app, max_workers=3)
+
+    async def many():
+        return await asyncio.gather(*(call(adapter, 'GET', '/', delay=0.01) for _ in range(12)))
+    try:
+        results = asyncio.run(many())
+    finally:
+        adapter.shutdown()
+    assert all(body == b'same' * 20 for _, _, body, _ in results)
+
+def test_slow_clients_do_not_hold_threads(application):
+    """With 2 threads, 40 clients that each take 0.1 s to send and read finish together"""
+    async def many():
+        return await asyncio.gather(*(call(application, 'GET', '/api/attractions/1', delay=0.1)
+                                      for _ in range(40)))
+    start = time.perf_counter()
+    results = asyncio.run(many())
+    assert all(status == 200 for status, *_ in results)
+    # A 2-worker sync server would need 40 / 2 * 0.2 = 4 s
+    assert time.perf_counter() - start < 2
+
+def test_lifespan(application):
+    """Startup and shutdown are acknowledged"""
+    incoming = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(application({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
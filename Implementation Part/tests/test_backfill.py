@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from geo.backfill import backfill_coordinates
+from storage.json_store import AttractionStore
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+TEST_RECORDS = [
+    {"id": "a1", "name": "Cliffs of Moher", "location": "County Clare", "rating": 4.9},
+    {"id": "b2", "name": "Titanic Belfast", "location": "Belfast, Northern Ireland", "rating": 4.7},
+    {"id": "c3", "name": "Spike Island", "location": "County Cork", "rating": 4.6, "lat": 51.8346, "lon": -8.2838},
+    {"id": "d4", "name": "Somewhere", "location": "Test Location", "rating": 3.0},
+]
+
+def write_records(tmp_path):
+    path = tmp_path / "attractions.json"
+    path.write_text(json.dumps(TEST_RECORDS))
+    return str(path)
+
+def test_backfill_sets_county_centroids(tmp_path):
+    """Records without coordinates get their county's centroid; others are left alone"""
+    store = AttractionStore(write_records(tmp_path))
+    updated, unmatched = backfill_coordinates(store, dry_run=True)
+    assert updated == 2 and [a['id'] for a in unmatched] == ["d4"]
+    assert 'lat' not in store.get("a1")
+    
+    assert backfill_coordinates(store)[0] == 2
+    assert (store.get("a1")['lat'], store.get("a1")['lon']) == (52.86, -8.98)
+    assert (store.get("b2")['lat'], store.get("b2")['lon']) == (54.86, -6.28)
+    assert store.get("c3")['lat'] == 51.8346 and 'lat' not in store.get("d4")
+    assert backfill_coordinates(store)[0] == 0
+    assert backfill_coordinates(store, overwrite=True)[0] == 3
+    assert store.get("c3")['lat'] == 51.95
+
+def test_backfill_command(tmp_path):
+    """python -m geo.backfill updates the configured data file"""
+    data_file = write_records(tmp_path)
+    env = dict(os.environ, DATA_FILE=data_file, STORAGE_MODE='wal')
+    result = subprocess.run([sys.executable, '-m', 'geo.backfill'], cwd=APP_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    assert "set coordinates on 2 attractions, 1 without a recognised county" in result.stdout
+    assert "d4" in result.stdout
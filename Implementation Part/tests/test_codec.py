@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path so we can import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage.codec import CODECS, StdlibCodec, select_codec
+
+RECORDS = [
+    {"id": "1", "name": "Cliffs of Moher", "location": "County Clare", "rating": 4.8},
+    {"id": "2", "name": "Dún Aonghasa", "location": "Inis Mór", "rating": 4, "tags": []},
+    {"id": "3", "name": "Sceilg Mhichíl \u2028 🐦", "description": "Tabs\tand\nlines  ",
+     "geo": {"lat": 51.77, "lon": -10.54, "seen": [{"by": "monks"}, {}]}},
+]
+
+
+@pytest.mark.parametrize('name', sorted(CODECS))
+@pytest.mark.parametrize('pretty', [False, True])
+def test_codecs_write_identical_bytes(name, pretty):
+    """Every backend writes the file in the same format"""
+    data = CODECS[name].dumps(RECORDS, pretty=pretty)
+    assert data == StdlibCodec.dumps(RECORDS, pretty=pretty)
+    assert CODECS[name].loads(data) == RECORDS
+
+
+@pytest.mark.parametrize('name', sorted(CODECS))
+def test_pretty_output_keeps_the_data_file_layout(name):
+    """The data file is written as json.dump(data, f, indent=4) always wrote it"""
+    assert CODECS[name].dumps(RECORDS, pretty=True) == json.dumps(RECORDS, indent=4).encode('ascii')
+    assert CODECS[name].dumps([], pretty=True) == b'[]'
+
+
+@pytest.mark.parametrize('name', sorted(CODECS))
+def test_pretty_output_matches_for_exponent_floats_and_delete(name):
+    """Floats repr() writes with an exponent and the DEL character keep the stdlib layout and round-trip"""
+    records = [{"id": "4", "rating": 1e16, "small": 1e-05, "tiny": 2.5e-07, "huge": -1.5e+300,
+                "edge": 0.0001, "note": "rubout \x7f here"}]
+    data = CODECS[name].dumps(records, pretty=True)
+    assert data == json.dumps(records, indent=4).encode('ascii')
+    assert b'1e+16' in data and b'\\u007f' in data
+    assert CODECS[name].loads(data) == records
+
+
+def test_codec_sort_keys():
+    """sort_keys gives a canonical encoding for ETags"""
+    for codec in CODECS.values():
+        assert codec.dumps({"b": 1, "a": 2}, sort_keys=True) == b'{"a":2,"b":1}'
+
+
+def test_select_unknown_codec_falls_back():
+    """An unknown JSON_BACKEND falls back to the standard library"""
+    assert select_codec('nope') is StdlibCodec
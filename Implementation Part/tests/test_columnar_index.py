@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import random
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip('numpy')
+
+from app import create_app
+from indexes.columnar_index import ColumnarIndex, epoch_micros
+from indexes.sorted_index import sort_key
+from query.filters import RangeFilter, ValueFilter
+
+LOCATIONS = ["County Clare", "County Cork", "County Kerry", "", None]
+
+def make_records(rng, count):
+    """Records with many tied values, some missing ones and ids and names sharing long prefixes"""
+    records = []
+    for i in range(count):
+        record = {"id": f"{rng.choice(['attraction-', 'a', 'b'])}{rng.randrange(1000)}-{i}",
+                  "rating": rng.choice([1, 2.5, 4, 4.0, 4.5, 5, None]),
+                  "created_at": rng.choice([None, f"2024-0{rng.randrange(1, 10)}-01T10:00:00",
+                                            f"2024-01-01T00:00:00.{rng.randrange(100000, 999999)}"]),
+                  "location": rng.choice(LOCATIONS),
+                  "name": rng.choice([None, "", "Dún Aonghasa", f"Ancient Castle of the Kings {rng.randrange(20)}",
+                                      f"Ancient Castle of the Kings {rng.randrange(20)}b", "Ancient"])}
+        records.append({k: v for k, v in record.items() if v is not None or rng.random() < 0.5})
+    return records
+
+def expected_page(records, sort_by, candidates, filters, reverse, limit, after):
+    """The page the sorted indexes give: (sort_key, id) order, keyset after ``after``"""
+    entries = sorted((sort_key(r.get(sort_by)), r['id']) for r in records
+                     if all(f.matches(r) for f in filters) and (candidates is None or r['id'] in candidates))
+    if reverse:
+        entries.reverse()
+    total = len(entries)
+    if after is not None:
+        entries = [e for e in entries if (e < after if reverse else e > after)]
+    return [doc_id for _, doc_id in entries[:limit]], total, len(entries) > limit
+
+def test_pages_match_the_sorted_indexes():
+    """Every page, cursor and total agrees with sorting the records by sort_key"""
+    rng = random.Random(5)
+    records = make_records(rng, 400)
+    columns = ColumnarIndex()
+    columns.reset(records)
+    by_id = {r['id']: r for r in records}
+    filter_sets = [[], [RangeFilter('rating', low=2.5, high=4.5)], [RangeFilter('rating', low=4, exclusive=True)],
+                   [ValueFilter('location', ["County Cork", ""])],
+                   [RangeFilter('created_at', "2024-03-01T00:00:00", exclusive=True),
+                    ValueFilter('location', ["County Kerry", "County Clare"])],
+                   [RangeFilter('created_at', high="2024-01-01T00:00:00.500000")]]
+    for sort_by in ('rating', 'created_at', 'location', 'name'):
+        for filters in filter_sets:
+            for reverse in (False, True):
+                candidates = set(rng.sample(sorted(by_id), 200)) if rng.random() < 0.3 else None
+                after, seen = None, []
+                while True:
+                    result = columns.page(sort_by, candidates, filters, reverse, 7, after)
+                    assert result == expected_page(records, sort_by, candidates, filters, reverse, 7, after)
+                    ids, total, has_more = result
+                    seen.extend(ids)
+                    if not has_more:
+                        break
+                    after = (sort_key(by_id[ids[-1]].get(sort_by)), ids[-1])
+                assert len(seen) == total == len(set(seen))
+
+def test_updates_deletes_and_growth():
+    """Rows are rewritten on update, reused after delete and the columns grow as needed"""
+    rng = random.Random(9)
+    records = make_records(rng, 50)
+    columns = ColumnarIndex()
+    columns.reset(records[:10])
+    for record in records[10:]:
+        columns.put(None, record)
+    for record in records[:20]:
+        columns.delete(record)
+    live = records[20:]
+    for i, record in enumerate(live[:10]):
+        updated = dict(record, rating=5, location="County Kerry")
+        columns.put(record, updated)
+        live[i] = updated
+    extra = make_records(random.Random(10), 3000)
+    for record in extra:
+        record['id'] += '-new'
+        columns.put(None, record)
+    live += extra
+    assert len(columns) == len(live)
+    filters = [ValueFilter('location', ["County Kerry"])]
+    assert columns.page('rating', None, filters, True, 20, None) == expected_page(
+        live, 'rating', None, filters, True, 20, None)
+    counts = columns.counts('location')
+    assert counts == {value: sum(1 for r in live if r.get('location') == value)
+                      for value in LOCATIONS if value is not None and any(r.get('location') == value for r in live)}
+
+def test_values_the_columns_cannot_order_are_left_to_the_indexes():
+    """Odd values make the queries depending on them return None instead of a wrong answer"""
+    columns = ColumnarIndex()
+    columns.reset([{"id": "a", "rating": "n/a", "created_at": "2024-01-01 10:00", "location": 3, "name": 7},
+                   {"id": "b", "rating": 4, "created_at": "2024-01-02T10:00:00", "location": "County Cork"}])
+    assert columns.page('rating', None, [], False, 10, None) is None
+    assert columns.page('created_at', None, [], False, 10, None) is None
+    assert columns.page('location', None, [], False, 10, None) is None
+    assert columns.page('name', None, [], False, 10, None) is None
+    assert columns.page('description', None, [], False, 10, None) is None
+    assert columns.page('rating', None, [], False, None, None) is None
+    assert columns.page('rating', None, [RangeFilter('rating', low=1)], False, 10, None) is None
+    # A numeric range never matches a string rating, so it can still be answered
+    assert columns.matches([RangeFilter('rating', low=1)]).tolist() == [False, True]
+    assert columns.matches([RangeFilter('created_at', "2024-01-01T00:00:00")]) is None
+    columns.delete({"id": "a"})
+    assert columns.matches([RangeFilter('created_at', "2024-01-01T00:00:00")]).tolist() == [False, True]
+    assert columns.matches([RangeFilter('created_at', "2024-01-01T00:00:00.5")]) is None
+    assert epoch_micros("2024-01-01T00:00:00.000001") - epoch_micros("2024-01-01T00:00:00") == 1
+    assert epoch_micros("2024-01-01T00:00:00+00:00") is None and epoch_micros(None) is None
+
+def test_query_engine_gives_the_same_responses(tmp_path):
+    """The API answers identically with QUERY_ENGINE=numpy and the default engine"""
+    level = logging.getLogger().level
+    rng = random.Random(2)
+    records = [dict(r, description=rng.choice(["castle by the sea", "abbey ruins"])) for r in make_records(rng, 300)]
+    queries = ['min_rating=2&sort_by=rating&limit=10', 'location=County%20Cork&sort_by=created_at&order=desc&limit=5',
+               'search=castle&sort_by=rating&limit=20&facets=location', 'max_rating=4&facets=location&limit=3',
+               'created_after=2024-02-01&sort_by=location&limit=50', 'search=abbey&location=County%20Kerry']
+    responses = {}
+    try:
+        for engine in ('index', 'numpy'):
+            data_file = tmp_path / engine / "attractions.json"
+            data_file.parent.mkdir()
+            data_file.write_text(json.dumps(records))
+            client = create_app({'DATA_FILE': str(data_file), 'QUERY_ENGINE': engine, 'TESTING': True}).test_client()
+            pages = responses[engine] = []
+            for query in queries:
+                body = json.loads(client.get(f'/api/attractions?{query}').data)
+                pages.append(body)
+                while isinstance(body, dict) and body['next_cursor']:
+                    body = json.loads(client.get(f"/api/attractions?{query}&cursor={body['next_cursor']}").data)
+                    pages.append(body)
+        assert responses['numpy'] == responses['index']
+        with pytest.raises(ValueError):
+            create_app({'DATA_FILE': str(tmp_path / "attractions.json"), 'QUERY_ENGINE': 'pandas'})
+    finally:
+        logging.getLogger().setLevel(level)
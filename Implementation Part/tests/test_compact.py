@@ -0,0 +1,75 @@
+import os
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage import codec
+from storage.compact import CompactRecords
+from storage.json_store import AttractionStore
+from storage.wal_store import WalAttractionStore
+
+TEST_RECORDS = [
+    {"id": str(i), "name": f"Attraction {i}", "location": f"County {'Kerry' if i % 2 else 'Cork'}",
+     "description": "Lakes and mountains", "rating": i % 5, "image_url": "", "website": "",
+     "created_at": f"2025-01-0{i % 9 + 1}T10:00:00"}
+    for i in range(10)
+] + [{"rating": 4.5, "id": "x", "name": "Odd key order", "tags": ["a", None], "updated_at": "2025-02-01"}]
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Write the test records to a temporary data file"""
+    path = tmp_path / "attractions.json"
+    path.write_bytes(codec.dumps(TEST_RECORDS, pretty=True))
+    return str(path)
+
+def test_round_trip_is_exact():
+    """Unpacked records equal the originals, key order included"""
+    compact = CompactRecords(TEST_RECORDS)
+    assert len(compact) == len(TEST_RECORDS)
+    assert [list(r.items()) for r in compact] == [list(r.items()) for r in TEST_RECORDS]
+    assert compact[10] == TEST_RECORDS[10]
+
+def test_shapes_and_interned_values_are_shared():
+    """Records with the same fields share one key tuple and repeated strings"""
+    records = [dict(r, location=''.join(r['location'])) for r in TEST_RECORDS[:4]]
+    compact = CompactRecords(records)
+    packed = compact._packed
+    assert packed[0][0] is packed[1][0]
+    assert compact[1]['location'] is compact[3]['location']
+
+@pytest.mark.parametrize('chunk', [1, 3, 4096])
+def test_iter_json_matches_codec(monkeypatch, chunk):
+    """Chunked encoding writes the same bytes as one codec.dumps call"""
+    monkeypatch.setattr('storage.compact.ENCODE_CHUNK', chunk)
+    assert b''.join(CompactRecords(TEST_RECORDS).iter_json()) == codec.dumps(TEST_RECORDS, pretty=True)
+    assert b''.join(CompactRecords().iter_json()) == codec.dumps([], pretty=True)
+
+@pytest.mark.parametrize('store_class', [AttractionStore, WalAttractionStore])
+def test_compact_store_behaves_like_plain(data_file, store_class):
+    """Mutations through a compact store leave the same data as a plain one"""
+    store = store_class(data_file, compact_records=True)
+    assert isinstance(store.records(), CompactRecords)
+    store.add({"id": "new", "name": "New", "location": "County Kerry"})
+    assert store.replace("3", dict(TEST_RECORDS[3], name="Renamed"))
+    assert store.remove("0")
+    assert store.get("3")['name'] == "Renamed" and store.get("0") is None
+    assert [a['id'] for a in store.lookup(["new", "x"])] == ["new", "x"]
+    assert list(store.iter_lookup(["x", "0", "new"])) == store.lookup(["x", "new"])
+    if store_class is WalAttractionStore:
+        store.compact()
+    expected = [a for a in (TEST_RECORDS[10:] + TEST_RECORDS[1:10]) if a['id'] != "0"]
+    reloaded = list(store_class(data_file).records())
+    assert sorted(a['id'] for a in reloaded) == sorted([a['id'] for a in expected] + ["new"])
+    assert next(a for a in reloaded if a['id'] == "x") == TEST_RECORDS[10]
+
+def test_unchanged_compact_rewrite_is_identical(data_file, monkeypatch):
+    """Rewriting the file from packed records reproduces it byte for byte"""
+    monkeypatch.setattr('storage.compact.ENCODE_CHUNK', 4)
+    with open(data_file, 'rb') as f:
+        original = f.read()
+    store = AttractionStore(data_file, compact_records=True)
+    assert store.replace("5", store.get("5"))
+    with open(data_file, 'rb') as f:
+        assert f.read() == original
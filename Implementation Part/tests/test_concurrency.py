@@ -0,0 +1,63 @@
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+
+PROCESSES = 4
+CREATES_PER_PROCESS = 25
+
+def create_many(worker):
+    """Issue a batch of creates from one process (or thread)"""
+    with app.test_client() as client:
+        for i in range(CREATES_PER_PROCESS):
+            response = client.post('/api/attractions',
+                                   data=json.dumps({
+                                       "name": f"Worker {worker} Attraction {i}",
+                                       "location": "County Kerry",
+                                       "description": "Stress test",
+                                       "rating": 3.0
+                                   }),
+                                   content_type='application/json')
+            assert response.status_code == 201
+
+@pytest.fixture(params=['json', 'wal', 'sqlite', 'mmap'])
+def storage_mode(request, tmp_path):
+    """Point the app at an empty data file in each storage mode"""
+    data_file = tmp_path / "attractions.json"
+    data_file.write_text("[]")
+    saved = dict(app.config)
+    app.config.update(TESTING=True, DATA_FILE=str(data_file), STORAGE_MODE=request.param)
+    yield request.param
+    app.config.clear()
+    app.config.update(saved)
+
+def saved_names():
+    with app.test_client() as client:
+        return {a['name'] for a in json.loads(client.get('/api/attractions').data)}
+
+def test_concurrent_creates_from_processes(storage_mode):
+    """Creates from several worker processes all survive"""
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=create_many, args=(w,)) for w in range(PROCESSES)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(60)
+        assert p.exitcode == 0
+    assert len(saved_names()) == PROCESSES * CREATES_PER_PROCESS
+
+def test_concurrent_creates_from_threads(storage_mode):
+    """Creates from several threads in one worker all survive"""
+    threads = [threading.Thread(target=create_many, args=(w,)) for w in range(PROCESSES)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(60)
+    assert len(saved_names()) == PROCESSES * CREATES_PER_PROCESS
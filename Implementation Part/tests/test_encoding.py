@@ -0,0 +1,39 @@
+import gzip
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from query import encoding
+from query.encoding import stream_json_array, stream_ndjson, compress
+
+RECORDS = [{"id": str(i), "name": f"Attraction {i}", "description": "x" * 100} for i in range(2000)]
+
+def test_stream_matches_full_encoding():
+    """Streaming yields the same array json.dumps would build"""
+    chunks = list(stream_json_array(RECORDS, json.dumps))
+    assert len(chunks) > 1
+    assert json.loads(b''.join(chunks)) == RECORDS
+
+def test_stream_gzip():
+    """A gzip stream decompresses to the full array"""
+    body = b''.join(stream_json_array(RECORDS, json.dumps, 'gzip'))
+    assert json.loads(gzip.decompress(body)) == RECORDS
+
+def test_empty_stream():
+    assert json.loads(b''.join(stream_json_array([], json.dumps))) == []
+
+def test_brotli_when_available():
+    """Brotli is offered only when the module is installed"""
+    if encoding.brotli is None:
+        assert encoding.available_encodings() == ['gzip']
+    else:
+        body = compress(b'[1,2,3]' * 100, 'br')
+        assert encoding.brotli.decompress(body) == b'[1,2,3]' * 100
+
+def test_stream_ndjson():
+    """NDJSON streaming yields one record per line"""
+    data = gzip.decompress(b''.join(stream_ndjson(RECORDS, json.dumps, 'gzip')))
+    assert [json.loads(line) for line in data.splitlines()] == RECORDS
@@ -0,0 +1,107 @@
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from indexes.facet_index import FacetIndex
+from indexes.sorted_index import SortedIndex
+from query.filters import IndexSource, RangeFilter, ValueFilter, matching_ids
+
+RECORDS = [
+    {"id": "a", "location": "County Clare", "rating": 4.9, "created_at": "2025-01-01T10:00:00"},
+    {"id": "b", "location": "County Antrim", "rating": 4.8, "created_at": "2025-01-05T11:30:00"},
+    {"id": "c", "location": "County Cork", "rating": 4.5, "created_at": "2025-01-03T09:00:00"},
+    {"id": "d", "location": "County Cork", "rating": 3.9},
+    {"id": "e", "location": 7, "rating": "n/a", "created_at": "2025-02-01T00:00:00"},
+]
+
+def make_source(records=RECORDS):
+    indexes = {'sort:rating': SortedIndex('rating'), 'sort:created_at': SortedIndex('created_at'),
+               'facet:location': FacetIndex('location')}
+    for index in indexes.values():
+        index.reset(records)
+    return IndexSource(indexes)
+
+def brute_force(filters, records=RECORDS):
+    return {r['id'] for r in records if all(f.matches(r) for f in filters)}
+
+def test_facet_index_groups_string_values():
+    """Values map to id sets that follow puts and deletes; non-strings are skipped"""
+    index = FacetIndex('location')
+    index.reset(RECORDS)
+    assert index.ids("County Cork") == {"c", "d"}
+    assert index.counts() == {"County Clare": 1, "County Antrim": 1, "County Cork": 2}
+    index.put(RECORDS[2], dict(RECORDS[2], location="County Kerry"))
+    index.delete(RECORDS[0])
+    assert index.counts() == {"County Antrim": 1, "County Cork": 1, "County Kerry": 1}
+    assert index.counts({"b", "c", "e"}) == {"County Antrim": 1, "County Kerry": 1}
+    assert index.value("e") is None
+
+def test_range_filters_keep_to_one_type():
+    """Open ends stay numeric or textual, and missing values never match"""
+    assert brute_force([RangeFilter('rating', low=4.5)]) == {"a", "b", "c"}
+    assert brute_force([RangeFilter('created_at', high="2025-01-04", exclusive=True)]) == {"a", "c"}
+    source = make_source()
+    for f in (RangeFilter('rating', low=4.5), RangeFilter('rating', 3.9, 4.8, exclusive=True),
+              RangeFilter('created_at', high="2025-01-04", exclusive=True), ValueFilter('location', ["County Cork"])):
+        assert set(source.ids(f)) == brute_force([f])
+        assert source.estimate(f) == len(brute_force([f]))
+
+def test_planner_matches_brute_force():
+    """Any combination of filters and candidates gives the same answer as a scan"""
+    source = make_source()
+    filters = [RangeFilter('rating', low=4.0), ValueFilter('location', ["County Cork", "County Clare"]),
+               RangeFilter('created_at', "2025-01-02", exclusive=True)]
+    assert matching_ids(source, filters) == brute_force(filters) == {"c"}
+    assert matching_ids(source, filters[:2]) == {"a", "c"}
+    assert matching_ids(source, filters[:2], candidates={"a", "b"}) == {"a"}
+    assert matching_ids(source, []) is None
+    assert matching_ids(source, [], candidates={"b"}) == {"b"}
+
+def test_planner_starts_from_most_selective_filter():
+    """Only the smallest filter's ids are collected; larger ones are probed"""
+    records = [{"id": str(i), "location": "County Cork" if i == 7 else "County Kerry", "rating": i % 5}
+               for i in range(1000)]
+    source = make_source(records)
+    collected = []
+    ids = source.ids
+    source.ids = lambda f: collected.append(f.field) or ids(f)
+    filters = [RangeFilter('rating', low=1), ValueFilter('location', ["County Cork"])]
+    assert matching_ids(source, filters) == {"7"}
+    assert collected == ['location']
+
+def test_facet_reads_survive_concurrent_writes():
+    """Filters and counts read while another thread moves records between values"""
+    import threading
+    index = FacetIndex('location')
+    index.reset({"id": f"r{i}", "location": "Cork"} for i in range(2000))
+    source = IndexSource({'facet:location': index})
+    done, errors = threading.Event(), []
+
+    def write():
+        i = 0
+        while not done.is_set():
+            # Grow and shrink both the 'Cork' group and the set of values
+            index.put(None, {"id": f"w{i}", "location": "Cork"})
+            index.put(None, {"id": f"v{i}", "location": f"Town {i}"})
+            if i >= 50:
+                index.delete({"id": f"w{i - 50}"})
+                index.delete({"id": f"v{i - 50}"})
+            i += 1
+
+    writer = threading.Thread(target=write)
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer.start()
+    try:
+        for _ in range(300):
+            matching_ids(source, [ValueFilter('location', ['Cork'])])
+            index.counts()
+    except RuntimeError as e:
+        errors.append(e)
+    finally:
+        done.set()
+        writer.join()
+        sys.setswitchinterval(switch)
+    assert errors == []
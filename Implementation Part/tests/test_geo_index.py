@@ -0,0 +1,115 @@
+import os
+import random
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from geo.counties import county_centroid, county_of
+from indexes.geo_index import GeoIndex, bounding_boxes, haversine_km
+
+def brute_force(records, lat, lon, limit=None, radius_km=None):
+    """Every record's distance, closest first, cut to the radius and limit"""
+    found = sorted((haversine_km(lat, lon, r['lat'], r['lon']), r['id']) for r in records)
+    if radius_km is not None:
+        found = [pair for pair in found if pair[0] <= radius_km]
+    return found[:limit]
+
+def assert_same(found, expected):
+    assert [i for _, i in found] == [i for _, i in expected]
+    assert all(abs(a - b) < 1e-6 for (a, _), (b, _) in zip(found, expected))
+
+def random_points(rng, count, lat_range, lon_range):
+    return [{"id": f"p{i}", "lat": rng.uniform(*lat_range), "lon": rng.uniform(*lon_range)}
+            for i in range(count)]
+
+def test_nearest_matches_brute_force():
+    """k-nearest and radius queries agree with a full scan, locally and across the globe"""
+    rng = random.Random(7)
+    for lat_range, lon_range in (((51.4, 55.4), (-10.5, -5.4)), ((-90, 90), (-180, 180))):
+        records = random_points(rng, 500, lat_range, lon_range)
+        for cell_degrees in (0.05, 1.0, 10.0):
+            index = GeoIndex(cell_degrees=cell_degrees)
+            index.reset(records)
+            for _ in range(20):
+                lat, lon = rng.uniform(*lat_range), rng.uniform(*lon_range)
+                limit = rng.choice([None, 1, 10])
+                radius_km = rng.choice([None, 5, 100, 5000])
+                assert_same(index.nearest(lat, lon, limit, radius_km),
+                            brute_force(records, lat, lon, limit, radius_km))
+
+def test_nearest_across_the_antimeridian_and_poles():
+    """Cells wrap in longitude, so neighbours across ±180° and over a pole are found"""
+    records = [{"id": "fiji", "lat": -17.7, "lon": 179.9}, {"id": "samoa", "lat": -13.8, "lon": -171.8},
+               {"id": "north", "lat": 89.9, "lon": 10.0}, {"id": "far", "lat": 0.0, "lon": 0.0}]
+    index = GeoIndex()
+    index.reset(records)
+    assert [i for _, i in index.nearest(-17.7, -179.9, 1)] == ["fiji"]
+    assert [i for _, i in index.nearest(89.9, -170.0, 1)] == ["north"]
+    assert_same(index.nearest(-15.0, 180.0), brute_force(records, -15.0, 180.0))
+
+def test_updates_move_points():
+    """Puts move a record between cells and deletes and invalid positions drop it"""
+    records = [{"id": "a", "lat": 53.35, "lon": -6.26}, {"id": "b", "lat": 51.90, "lon": -8.47}]
+    index = GeoIndex()
+    index.reset(records + [{"id": "c", "name": "no position"}, {"id": "d", "lat": True, "lon": 1}])
+    assert len(index) == 2
+    index.put(records[1], dict(records[1], lat=53.34, lon=-6.25))
+    assert [i for _, i in index.nearest(53.34, -6.25)] == ["b", "a"]
+    index.put(records[0], {"id": "a", "lat": 200, "lon": 0})
+    index.delete({"id": "b"})
+    assert index.nearest(53.34, -6.25) == [] and len(index) == 0
+    assert index.nearest(53.34, -6.25, limit=0) == []
+
+def test_bounding_boxes_cover_the_circle():
+    """Every point within the radius falls inside one of the boxes"""
+    rng = random.Random(3)
+    for _ in range(2000):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        radius_km = rng.choice([1, 50, 500, 3000])
+        p_lat, p_lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        if haversine_km(lat, lon, p_lat, p_lon) > radius_km:
+            continue
+        assert any(low <= p_lat <= high and west <= p_lon <= east
+                   for low, high, west, east in bounding_boxes(lat, lon, radius_km))
+    assert len(bounding_boxes(0, 179.99, 10)) == 2
+
+def test_county_of_locations():
+    """Counties are read from the free-text location field"""
+    assert county_of("County Antrim, Northern Ireland") == "Antrim"
+    assert county_of("Co. Cork") == "Cork"
+    assert county_of("Belfast, Northern Ireland") == "Antrim"
+    assert county_of("dublin") == "Dublin"
+    assert county_of("Test Location") is None and county_of(None) is None
+    assert county_centroid("County Clare") == (52.86, -8.98)
+
+def test_queries_survive_concurrent_writes():
+    """nearest() reads cells and points while another thread adds and removes them"""
+    import threading
+    rng = random.Random(4)
+    index = GeoIndex(cell_degrees=1.0)
+    index.reset(random_points(rng, 2000, (-60, 60), (-180, 180)))
+    done, errors = threading.Event(), []
+
+    def write():
+        i = 0
+        while not done.is_set():
+            index.put(None, {"id": f"w{i}", "lat": rng.uniform(-60, 60), "lon": rng.uniform(-180, 180)})
+            if i >= 50:
+                index.delete({"id": f"w{i - 50}"})
+            i += 1
+
+    writer = threading.Thread(target=write)
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    writer.start()
+    try:
+        for _ in range(100):
+            index.nearest(rng.uniform(-60, 60), rng.uniform(-180, 180), 50)
+    except (RuntimeError, KeyError) as e:
+        errors.append(e)
+    finally:
+        done.set()
+        writer.join()
+        sys.setswitchinterval(switch)
+    assert errors == []
@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from benchmarks.loadtest import compare, main, percentile
+
+def test_percentile_interpolates():
+    """Percentiles interpolate between the nearest samples"""
+    values = [1, 2, 3, 4, 5]
+    assert percentile(values, 0.5) == 3
+    assert percentile(values, 0.95) == 4.8
+    assert percentile([], 0.5) is None
+
+def test_compare_flags_regressions():
+    """Slower p95 or lower throughput beyond the tolerance is a regression"""
+    baseline = {'endpoints': {'get': {'p95_ms': 10.0, 'throughput_rps': 100.0}}}
+    ok = {'endpoints': {'get': {'p95_ms': 11.0, 'throughput_rps': 95.0}}}
+    slow = {'endpoints': {'get': {'p95_ms': 15.0, 'throughput_rps': 70.0},
+                          'new': {'p95_ms': 1.0, 'throughput_rps': 1.0}}}
+    assert compare(ok, baseline, 0.2) == []
+    assert [r['metric'] for r in compare(slow, baseline, 0.2)] == ['p95_ms', 'throughput_rps']
+
+def test_in_process_run_reports_every_endpoint(tmp_path, capsys):
+    """A small in-process run reports percentiles per endpoint and compares with itself"""
+    saved = dict(app.config)
+    output = tmp_path / "report.json"
+    try:
+        assert main(['--size', '50', '--requests', '200', '--warmup', '0', '--workload', 'mixed',
+                     '--output', str(output)]) == 0
+        assert main(['--size', '50', '--requests', '20', '--warmup', '0',
+                     '--baseline', str(output), '--tolerance', '1000']) == 0
+    finally:
+        app.config.clear()
+        app.config.update(saved)
+    report = json.loads(output.read_text())
+    assert report['total']['requests'] == 200
+    assert report['total']['errors'] == 0
+    assert {'page', 'search', 'get', 'create', 'update'} <= set(report['endpoints'])
+    assert set(report['endpoints']['get']) >= {'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'}
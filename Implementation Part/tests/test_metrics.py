@@ -0,0 +1,67 @@
+import logging
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from monitoring.metrics import MetricsRegistry
+from monitoring.write_log import SampledWriteLog
+
+def test_histogram_renders_cumulative_buckets():
+    """Buckets are cumulative and end with +Inf, sum and count"""
+    registry = MetricsRegistry()
+    histogram = registry.histogram('latency_seconds', "Latency", ('route',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, '/a"b')
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a\\"b"} 2.65',
+        'latency_seconds_count{route="/a\\"b"} 4',
+    ]
+
+def test_disabled_registry_records_nothing():
+    """A disabled registry hands out a no-op timer"""
+    registry = MetricsRegistry(enabled=False)
+    histogram = registry.histogram('phase_seconds', "Phase", ('phase',))
+    with registry.timer(histogram, 'read_data'):
+        pass
+    assert 'phase_seconds_count' not in registry.render()
+
+def test_write_log_sampling(caplog):
+    """Rate 0 logs nothing and rate 1 logs every write as JSON"""
+    logger = logging.getLogger('test.writes')
+    assert not SampledWriteLog(logger, 0).sampled()
+    log = SampledWriteLog(logger, 1)
+    assert log.sampled()
+    with caplog.at_level(logging.INFO, logger='test.writes'):
+        log.emit(event="write", records=3)
+    assert caplog.records[-1].getMessage() == '{"event": "write", "records": 3, "sample_rate": 1}'
+
+def test_metrics_endpoint(tmp_path):
+    """Requests show up on /metrics by route, with phases and dataset size"""
+    data_file = tmp_path / "attractions.json"
+    data_file.write_text("[]")
+    saved = dict(app.config)
+    app.config.update(TESTING=True, DATA_FILE=str(data_file))
+    try:
+        with app.test_client() as client:
+            client.post('/api/attractions', json={"name": "Metrics", "location": "Louth",
+                                                  "description": "x", "rating": 3})
+            client.get('/api/attractions/missing-id')
+            response = client.get('/metrics')
+    finally:
+        app.config.clear()
+        app.config.update(saved)
+    text = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/attractions",status="201"}' in text
+    assert 'route="/api/attractions/<attraction_id>",status="404"' in text
+    assert 'app_phase_duration_seconds_count{phase="write_data"}' in text
+    assert 'attractions_dataset_size 1' in text
@@ -0,0 +1,232 @@
+import json
+import os
+import random
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from indexes.sorted_index import sort_key
+from storage.mmap_store import MmapAttractionStore
+from storage.snapshot import Snapshot, SnapshotError, write_snapshot
+
+TEST_RECORDS = [
+    {"id": "a1", "name": "Cliffs of Moher", "location": "County Clare",
+     "description": "Sea cliffs on the Atlantic", "rating": 4.9, "created_at": "2025-01-01T10:00:00"},
+    {"id": "b2", "name": "Giant's Causeway", "location": "County Antrim",
+     "description": "Basalt columns by the sea", "rating": 4.8, "created_at": "2025-01-05T11:30:00"},
+    {"id": "c3", "name": "Blarney Castle", "location": "County Cork",
+     "description": "Medieval castle and gardens", "rating": 4.5, "created_at": "2025-01-03T09:00:00"},
+]
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Write the test records to a temporary data file"""
+    path = tmp_path / "attractions.json"
+    path.write_text(json.dumps(TEST_RECORDS))
+    return str(path)
+
+def page_through(store, sort_by, reverse, limit):
+    """Follow query() positions page by page and return every id seen"""
+    ids, after = [], None
+    while True:
+        page, total, last, has_more = store.query(sort_by=sort_by, reverse=reverse, limit=limit, after=after)
+        ids.extend(a['id'] for a in page)
+        if not has_more:
+            return ids, total
+        after = last
+
+def test_snapshot_format_round_trip(tmp_path):
+    """Records, id lookups and sort orderings read back from the mapped file"""
+    path = str(tmp_path / "data.snap")
+    records = TEST_RECORDS + [{"id": "d4", "name": "Newgrange", "rating": None}]
+    with open(path, 'w+b') as f:
+        write_snapshot(f, records, ['name', 'rating'])
+    snapshot = Snapshot(path)
+    assert len(snapshot) == 4
+    assert [snapshot.record(i) for i in range(4)] == records
+    assert snapshot.id_at(3) == "d4"
+    assert snapshot.find("c3") == 2 and snapshot.find("zz") is None
+    assert [records[i]['id'] for i in snapshot.order('rating')] == ["c3", "b2", "a1", "d4"]
+    assert [records[i]['id'] for i in snapshot.order('name')] == ["c3", "a1", "b2", "d4"]
+
+    (tmp_path / "bad.snap").write_bytes(b"[not a snapshot]" * 4)
+    with pytest.raises(SnapshotError):
+        Snapshot(str(tmp_path / "bad.snap"))
+
+def test_snapshot_is_built_from_the_data_file(data_file):
+    """The first open writes <data file>.snap; records read back unchanged"""
+    store = MmapAttractionStore(data_file)
+    assert store.count() == 3
+    assert os.path.exists(data_file + '.snap')
+    assert list(store.records()) == TEST_RECORDS
+    assert store.get("b2") == TEST_RECORDS[1]
+    assert store.get("missing") is None
+    assert [a['id'] for a in store.lookup(["c3", "zz", "a1"])] == ["c3", "a1"]
+
+def test_mutations_are_layered_and_shared(data_file):
+    """Writes go to the log and show up in other processes' stores"""
+    writer, reader = MmapAttractionStore(data_file), MmapAttractionStore(data_file)
+    version = reader.current_version()
+    writer.add({"id": "d4", "name": "Newgrange", "location": "County Meath", "rating": 4.7})
+    assert writer.replace("a1", dict(TEST_RECORDS[0], name="Moher"))
+    assert not writer.replace("zz", {"id": "zz"})
+    assert writer.remove("b2")
+    assert not writer.remove("b2")
+    assert reader.current_version() > version
+    assert [a['id'] for a in reader.records()] == ["a1", "c3", "d4"]
+    assert reader.count() == 3
+    assert reader.get("a1")['name'] == "Moher"
+    assert reader.get("b2") is None
+    # Nothing was rewritten yet; the snapshot still holds the original records
+    assert len(Snapshot(data_file + '.snap')) == 3
+
+def test_query_pages_merge_snapshot_and_overlay(data_file):
+    """Keyset pages walk snapshot and overlay together, each record exactly once"""
+    store = MmapAttractionStore(data_file, compact_bytes=10 ** 9)
+    rng = random.Random(7)
+    records = [dict(r, rating=rng.choice([1, 2.5, 3, None, "n/a"])) for r in
+               ({"id": f"r{i:03d}", "name": f"Place {rng.randint(0, 50)}"} for i in range(150))]
+    store.save(records)
+    for i in range(0, 150, 7):
+        store.remove(f"r{i:03d}")
+    for i in range(1, 150, 5):
+        store.replace(f"r{i:03d}", dict(records[i], name=f"Renamed {rng.randint(0, 50)}", rating=rng.random()))
+    for i in range(20):
+        store.add({"id": f"n{i:02d}", "name": f"Place {rng.randint(0, 50)}", "rating": rng.choice([2, "x"])})
+
+    live = list(store.records())
+    for sort_by in ('name', 'rating'):
+        for reverse in (False, True):
+            expected = [a['id'] for a in sorted(live, key=lambda a: (sort_key(a.get(sort_by)), a['id']),
+                                                 reverse=reverse)]
+            for limit in (1, 7, 50, None):
+                ids, total = page_through(store, sort_by, reverse, limit)
+                assert ids == expected and total == len(live)
+
+def test_lazy_query_decodes_records_as_read(data_file):
+    """Unpaginated lazy queries walk the snapshot and overlay, or the matches, one record at a time"""
+    store = MmapAttractionStore(data_file)
+    store.add({"id": "d4", "name": "Sea Life", "rating": 1})
+    store.remove("b2")
+    for search_term in (None, "sea"):
+        eager, total, *_ = store.query(search_term, sort_by='name', reverse=True)
+        lazy, lazy_total, last, has_more = store.query(search_term, sort_by='name', reverse=True, lazy=True)
+        assert not isinstance(lazy, list) and list(lazy) == eager
+        assert (lazy_total, last, has_more) == (total, None, False)
+
+def test_search_matches_and_pages(data_file):
+    """Searches build the text index lazily and order by relevance or by field"""
+    store = MmapAttractionStore(data_file)
+    assert 'text' not in store.indexes
+    page, total, last, has_more = store.query("sea", sort_by='relevance', limit=1)
+    assert total == 2 and has_more and 'text' in store.indexes
+    rest, _, _, has_more = store.query("sea", sort_by='relevance', limit=1, after=last)
+    assert {page[0]['id'], rest[0]['id']} == {"a1", "b2"} and not has_more
+    store.add({"id": "d4", "name": "Sea Life", "location": "County Kerry", "rating": 1})
+    page, total, *_ = store.query("sea", sort_by='rating', reverse=True)
+    assert [a['id'] for a in page] == ["a1", "b2", "d4"] and total == 3
+
+def test_fuzzy_search_follows_the_overlay(data_file):
+    """Typo-tolerant search covers snapshot records and later mutations alike"""
+    store = MmapAttractionStore(data_file)
+    page, total, *_ = store.query("causway", sort_by='relevance', fuzzy=True)
+    assert [a['id'] for a in page] == ["b2"] and total == 1
+    store.add({"id": "d4", "name": "Killarney National Park", "location": "County Kerry"})
+    assert [a['id'] for a in store.query("killarny", sort_by='name', fuzzy=True)[0]] == ["d4"]
+    assert store.facets('location', "killarny", fuzzy=True) == {"County Kerry": 1}
+
+def test_compaction_writes_a_new_snapshot(data_file):
+    """Compacting folds the overlay into the snapshot other stores then map"""
+    writer, reader = MmapAttractionStore(data_file), MmapAttractionStore(data_file)
+    reader.count()
+    writer.add({"id": "d4", "name": "Newgrange"})
+    writer.remove("a1")
+    writer.compact()
+    assert len(Snapshot(data_file + '.snap')) == 3
+    assert os.path.getsize(data_file + '.snap.wal') == 0
+    assert [a['id'] for a in reader.records()] == ["b2", "c3", "d4"]
+    assert not reader._records.overlay
+    assert [a['id'] for a in writer.query(sort_by='name')[0]] == ["c3", "b2", "d4"]
+
+def test_missing_sort_field_rebuilds_snapshot(data_file):
+    """A snapshot written for other sort fields is rebuilt, keeping its records"""
+    MmapAttractionStore(data_file, sort_fields=('name',)).add({"id": "d4", "name": "Newgrange"})
+    store = MmapAttractionStore(data_file, sort_fields=('name', 'rating'))
+    assert [a['id'] for a in store.query(sort_by='rating')[0]] == ["c3", "b2", "a1", "d4"]
+    assert Snapshot(data_file + '.snap').sort_fields == ['name', 'rating']
+
+def test_api_in_mmap_mode(data_file):
+    """The list endpoint answers from the snapshot when STORAGE_MODE is mmap"""
+    saved = dict(app.config)
+    app.config.update(TESTING=True, DATA_FILE=data_file, STORAGE_MODE='mmap')
+    try:
+        with app.test_client() as client:
+            data = json.loads(client.get('/api/attractions?sort_by=rating&limit=2').data)
+            assert [a['id'] for a in data['items']] == ["c3", "b2"] and data['total'] == 3
+            after = json.loads(client.get(f"/api/attractions?sort_by=rating&limit=2"
+                                          f"&cursor={data['next_cursor']}").data)
+            assert [a['id'] for a in after['items']] == ["a1"] and after['next_cursor'] is None
+            assert client.delete('/api/attractions/a1').status_code == 200
+            data = json.loads(client.get('/api/attractions?search=sea').data)
+            assert [a['id'] for a in data] == ["b2"]
+            app.config['STREAM_MIN_RECORDS'] = 1
+            response = client.get('/api/attractions?sort_by=rating&fields=id')
+            assert response.is_streamed and json.loads(response.data) == [{"id": "c3"}, {"id": "b2"}]
+    finally:
+        app.config.clear()
+        app.config.update(saved)
+
+def test_filters_and_facets_follow_the_overlay(data_file):
+    """Filters span the stored orderings and agree with a scan after mutations"""
+    from query.filters import RangeFilter, ValueFilter
+    store = MmapAttractionStore(data_file)
+    store.add({"id": "d4", "name": "Sea Life", "location": "County Cork", "rating": "n/a",
+               "created_at": "2025-01-04T00:00:00"})
+    store.replace("b2", dict(TEST_RECORDS[1], location="County Cork", rating=4.0))
+    filter_sets = [[RangeFilter('rating', low=4.6)], [RangeFilter('rating', high=4.5)],
+                   [ValueFilter('location', ["County Cork", "County Clare"]),
+                    RangeFilter('created_at', "2025-01-01T10:00:00", exclusive=True)],
+                   [ValueFilter('location', ["County Antrim"])]]
+    for filters in filter_sets:
+        expected = sorted((a for a in store.records() if all(f.matches(a) for f in filters)),
+                          key=lambda a: (sort_key(a.get('name')), a['id']))
+        page, total, *_ = store.query(sort_by='name', filters=filters)
+        assert page == expected and total == len(expected)
+    page, total, *_ = store.query("sea", sort_by='relevance', filters=[RangeFilter('rating', low=4.5)])
+    assert [a['id'] for a in page] == ["a1"] and total == 1
+    assert store.facets('location') == {"County Clare": 1, "County Cork": 3}
+    assert store.facets('location', filters=[RangeFilter('rating', low=4.1)]) == {
+        "County Clare": 1, "County Cork": 1}
+
+def test_nearby_follows_the_overlay(data_file):
+    """Nearby search covers snapshot records and later mutations alike"""
+    records = [dict(TEST_RECORDS[0], lat=52.9715, lon=-9.4309), dict(TEST_RECORDS[1], lat=55.2408, lon=-6.5116),
+               TEST_RECORDS[2]]
+    with open(data_file, 'w') as f:
+        json.dump(records, f)
+    store = MmapAttractionStore(data_file)
+    assert [a['id'] for _, a in store.nearby(55.0, -6.5)] == ["b2", "a1"]
+    store.replace("c3", dict(TEST_RECORDS[2], lat=51.9291, lon=-8.5709))
+    store.remove("b2")
+    assert [(a['id'], round(d)) for d, a in store.nearby(51.93, -8.57, limit=1)] == [("c3", 0)]
+    assert [a['id'] for _, a in store.nearby(55.0, -6.5, radius_km=300)] == ["a1"]
+    store.compact()
+    assert [a['id'] for _, a in store.nearby(55.0, -6.5)] == ["a1", "c3"]
+
+def test_stats_follow_the_overlay(data_file):
+    """Rollups built on first use track mutations and survive compaction"""
+    store = MmapAttractionStore(data_file)
+    assert store.stats()["locations"] == {"County Antrim": {"count": 1, "mean_rating": 4.8},
+                                          "County Clare": {"count": 1, "mean_rating": 4.9},
+                                          "County Cork": {"count": 1, "mean_rating": 4.5}}
+    store.add({"id": "d4", "name": "Sea Life", "location": "County Cork", "rating": 3.5,
+               "created_at": "2025-01-04T00:00:00"})
+    store.remove("b2")
+    stats = store.stats()
+    assert stats["count"] == 3 and stats["locations"]["County Cork"] == {"count": 2, "mean_rating": 4.0}
+    assert stats["created"]["per_month"] == {"2025-01": 3}
+    store.compact()
+    assert store.stats() == stats
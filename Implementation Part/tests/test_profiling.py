@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from monitoring.profiling import RequestProfiler, list_profiles, profile_path
+
+@pytest.fixture
+def client(tmp_path):
+    """Test client with profiling on for every request and a temporary profile directory"""
+    data_file = tmp_path / "attractions.json"
+    data_file.write_text(json.dumps([{"id": "a1", "name": "Cliffs of Moher", "location": "County Clare",
+                                      "description": "Sea cliffs", "rating": 4.9}]))
+    saved = dict(app.config)
+    app.config.update(TESTING=True, DATA_FILE=str(data_file), PROFILE_ENABLED=True,
+                      PROFILE_THRESHOLD_MS=0, PROFILE_DIR=str(tmp_path / "profiles"),
+                      PROFILE_ENDPOINT_ENABLED=True)
+    try:
+        with app.test_client() as client:
+            yield client
+    finally:
+        app.config.clear()
+        app.config.update(saved)
+
+def test_slow_request_is_profiled(client):
+    """A request over the threshold is saved with its route, args and dataset version"""
+    client.get('/api/attractions?search=cliffs&sort_by=rating')
+    profiles = json.loads(client.get('/debug/profiles').data)
+    assert len(profiles) == 1
+    profile = profiles[0]
+    assert profile['route'] == '/api/attractions'
+    assert profile['args'] == {"search": ["cliffs"], "sort_by": ["rating"]}
+    assert profile['status'] == 200 and profile['dataset_version'] is not None
+    assert any('get_attractions' in f['function'] for f in profile['functions'])
+    download = client.get(f"/debug/profiles/{profile['name']}")
+    assert download.status_code == 200 and download.data
+    assert client.get('/debug/profiles/..%2Fattractions').status_code == 404
+
+def test_fast_and_unsampled_requests_are_not_saved(client):
+    """Requests under the threshold, or not picked by the sampler, leave no profile"""
+    app.config['PROFILE_THRESHOLD_MS'] = 60_000
+    client.get('/api/attractions')
+    app.config.update(PROFILE_THRESHOLD_MS=0, PROFILE_SAMPLER=lambda request: request.method == 'POST')
+    client.get('/api/attractions')
+    assert list_profiles(app.config['PROFILE_DIR']) == []
+
+def test_profiles_endpoint_is_gated(client):
+    """The listing is a 404 unless PROFILE_ENDPOINT_ENABLED is set"""
+    client.get('/api/attractions')
+    app.config['PROFILE_ENDPOINT_ENABLED'] = False
+    assert client.get('/debug/profiles').status_code == 404
+    name = list_profiles(app.config['PROFILE_DIR'])[0]['name']
+    assert client.get(f'/debug/profiles/{name}').status_code == 404
+
+def test_old_profiles_are_pruned(tmp_path):
+    """Only the newest `keep` profiles are kept"""
+    profiler = RequestProfiler(str(tmp_path), 0, lambda request: True, keep=2)
+    names = []
+    for _ in range(3):
+        profile = profiler.start(None)
+        profiler.stop(profile)
+        names.append(profiler.save(profile, 0.01, route='/x'))
+    assert [p['name'] for p in list_profiles(str(tmp_path))] == names[:0:-1]
+    assert profile_path(str(tmp_path), names[0]) is None
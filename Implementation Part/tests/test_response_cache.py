@@ -0,0 +1,37 @@
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from query.response_cache import ResponseCache
+
+def test_hit_and_miss_counters():
+    """Lookups are counted and entries carry a stable ETag"""
+    cache = ResponseCache()
+    assert cache.get(1, 'q') is None
+    stored = cache.put(1, 'q', b'[1, 2]')
+    assert cache.get(1, 'q') == stored
+    assert stored.etag == cache.put(1, 'other', b'[1, 2]').etag
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_new_generation_invalidates():
+    """Entries from an older dataset version are dropped"""
+    cache = ResponseCache()
+    cache.put(1, 'q', b'[]')
+    assert cache.get(2, 'q') is None
+    assert cache.stats()['entries'] == 0
+
+def test_lru_eviction_respects_byte_budget():
+    """The least recently used entries go first once over budget"""
+    cache = ResponseCache(max_bytes=10)
+    cache.put(1, 'a', b'aaaa')
+    cache.put(1, 'b', b'bbbb')
+    cache.get(1, 'a')
+    cache.put(1, 'c', b'cccc')
+    assert cache.get(1, 'b') is None
+    assert cache.get(1, 'a') is not None
+    assert cache.stats()['bytes'] <= 10
+    # Bodies bigger than the whole budget are never cached
+    cache.put(1, 'huge', b'x' * 11)
+    assert cache.get(1, 'huge') is None
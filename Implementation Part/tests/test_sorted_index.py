@@ -0,0 +1,58 @@
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from indexes.sorted_index import SortedIndex
+
+RECORDS = [
+    {"id": "a", "name": "Kylemore Abbey", "rating": 4.6},
+    {"id": "b", "name": "Blarney Castle", "rating": 4.8},
+    {"id": "c", "name": "Rock of Cashel", "rating": 4.7},
+]
+
+def make_index(field):
+    index = SortedIndex(field)
+    index.reset(RECORDS)
+    return index
+
+def test_ascending_and_descending():
+    """The index lists keys in field order both ways"""
+    index = make_index('rating')
+    assert index.ids() == ["a", "c", "b"]
+    assert index.ids(reverse=True) == ["b", "c", "a"]
+
+def test_incremental_updates_keep_order():
+    """Puts and deletes insert at the sorted position"""
+    index = make_index('name')
+    index.put(None, {"id": "d", "name": "Dublin Castle"})
+    index.put(RECORDS[0], dict(RECORDS[0], name="Adare Manor"))
+    index.delete(RECORDS[1])
+    assert index.ids() == ["a", "d", "c"]
+
+def test_order_subset():
+    """Subsets come back in index order whatever their size"""
+    index = make_index('rating')
+    index.reset(RECORDS + [{"id": f"x{i}", "rating": i % 5} for i in range(100)])
+    assert index.order({"b", "a"}) == ["a", "b"]
+    assert index.order({"b", "a"}, reverse=True) == ["b", "a"]
+    large = {f"x{i}" for i in range(50)} | {"c"}
+    assert index.order(large)[-1] == "c"
+    assert index.order(large) == [i for i in index.ids() if i in large]
+
+def test_missing_and_mixed_values():
+    """Missing fields sort without raising"""
+    index = SortedIndex('rating')
+    index.reset([{"id": "a", "rating": 3}, {"id": "b"}, {"id": "c", "rating": "n/a"}])
+    assert index.ids()[0] == "a"
+
+def test_range_of_keys():
+    """Ranges are answered by binary search and never mix numbers with strings"""
+    index = SortedIndex('rating')
+    index.reset(RECORDS + [{"id": "d", "rating": "n/a"}, {"id": "e"}])
+    assert index.range((0, 4.6), (0, 4.7)) == ["a", "c"]
+    assert index.range((0, 4.6), (0, 4.7), exclusive=True) == []
+    assert index.range((0, 4.65), (1,)) == ["c", "b"]
+    assert index.count_range((0,), (1,)) == 3
+    assert index.key_of("c") == (0, 4.7) and index.key_of("zz") is None
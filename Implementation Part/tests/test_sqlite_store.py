@@ -0,0 +1,292 @@
+import json
+import os
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+from storage.sqlite_store import SqliteAttractionStore
+
+TEST_RECORDS = [
+    {"id": "a1", "name": "Cliffs of Moher", "location": "County Clare",
+     "description": "Sea cliffs on the Atlantic", "rating": 4.9, "created_at": "2025-01-01T10:00:00"},
+    {"id": "b2", "name": "Giant's Causeway", "location": "County Antrim",
+     "description": "Basalt columns by the sea", "rating": 4.8, "created_at": "2025-01-05T11:30:00"},
+    {"id": "c3", "name": "Blarney Castle", "location": "County Cork",
+     "description": "Medieval castle and gardens", "rating": 4.5, "created_at": "2025-01-03T09:00:00"},
+]
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Write the test records to a temporary data file"""
+    path = tmp_path / "attractions.json"
+    path.write_text(json.dumps(TEST_RECORDS))
+    return str(path)
+
+def test_new_database_is_imported(data_file):
+    """The first open copies the JSON data file into the database"""
+    store = SqliteAttractionStore(data_file)
+    assert store.records() == TEST_RECORDS
+    assert os.path.exists(store.db_path)
+    assert store.get("b2") == TEST_RECORDS[1]
+    assert store.get("missing") is None
+
+def test_mutations_are_visible_to_other_connections(data_file):
+    """Writes commit to the database and bump the shared version"""
+    writer, reader = SqliteAttractionStore(data_file), SqliteAttractionStore(data_file)
+    version = reader.current_version()
+    writer.add({"id": "d4", "name": "Newgrange", "location": "County Meath",
+                "description": "Passage tomb", "rating": 4.7})
+    assert writer.replace("a1", dict(TEST_RECORDS[0], name="Moher"))
+    assert writer.remove("b2")
+    assert not writer.remove("b2")
+    assert reader.current_version() > version
+    assert [a['id'] for a in reader.records()] == ["a1", "c3", "d4"]
+    assert reader.get("a1")['name'] == "Moher"
+    assert reader.lookup(["d4", "zz", "a1"])[0]['name'] == "Newgrange"
+
+def test_write_lock_rolls_back_on_error(data_file):
+    """A failure inside write_lock() leaves no partial change behind"""
+    store = SqliteAttractionStore(data_file)
+    with pytest.raises(RuntimeError):
+        with store.write_lock():
+            store.remove("a1")
+            raise RuntimeError("boom")
+    assert store.get("a1") is not None
+
+def test_query_sorts_and_pages(data_file):
+    """Keyset pages in SQL cover the sorted list exactly once"""
+    store = SqliteAttractionStore(data_file)
+    page, total, last, has_more = store.query(sort_by='rating', limit=2)
+    assert total == 3 and has_more
+    assert [a['id'] for a in page] == ["c3", "b2"]
+    page, _, _, has_more = store.query(sort_by='rating', limit=2, after=last)
+    assert [a['id'] for a in page] == ["a1"] and not has_more
+    page, *_ = store.query(sort_by='name', reverse=True)
+    assert [a['id'] for a in page] == ["b2", "a1", "c3"]
+
+def test_query_searches_with_fts(data_file):
+    """Search terms match word prefixes, ranked by weighted bm25"""
+    store = SqliteAttractionStore(data_file)
+    page, total, _, _ = store.query("sea", sort_by='relevance')
+    assert total == 2 and {a['id'] for a in page} == {"a1", "b2"}
+    page, *_ = store.query("cast", sort_by='relevance')
+    assert [a['id'] for a in page] == ["c3"]
+    page, total, *_ = store.query("sea county", sort_by='name')
+    assert [a['id'] for a in page] == ["a1", "b2"] and total == 2
+
+def test_api_in_sqlite_mode(data_file, tmp_path):
+    """The list endpoint answers from SQL when STORAGE_MODE is sqlite"""
+    saved = dict(app.config)
+    app.config.update(TESTING=True, DATA_FILE=data_file, STORAGE_MODE='sqlite',
+                      SQLITE_FILE=str(tmp_path / "api.db"))
+    try:
+        with app.test_client() as client:
+            data = json.loads(client.get('/api/attractions?search=sea&sort_by=rating&limit=1').data)
+            assert [a['id'] for a in data['items']] == ["b2"] and data['total'] == 2
+            after = json.loads(client.get(f"/api/attractions?search=sea&sort_by=rating&limit=1"
+                                          f"&cursor={data['next_cursor']}").data)
+            assert [a['id'] for a in after['items']] == ["a1"] and after['next_cursor'] is None
+            response = client.delete('/api/attractions/a1')
+            assert response.status_code == 200
+            assert len(json.loads(client.get('/api/attractions').data)) == 2
+            assert json.loads(client.get('/api/attractions/stats').data)['count'] == 2
+            app.config['STREAM_MIN_RECORDS'] = 1
+            response = client.get('/api/attractions?sort_by=name&fields=id')
+            assert response.is_streamed and json.loads(response.data) == [{"id": "c3"}, {"id": "b2"}]
+    finally:
+        app.config.clear()
+        app.config.update(saved)
+
+def test_lazy_query_decodes_rows_as_read(data_file):
+    """An unpaginated lazy query iterates the cursor and yields what the eager query returns"""
+    store = SqliteAttractionStore(data_file)
+    eager, total, *_ = store.query("sea", sort_by='rating')
+    lazy, lazy_total, last, has_more = store.query("sea", sort_by='rating', lazy=True)
+    assert not isinstance(lazy, list) and list(lazy) == eager
+    assert (lazy_total, last, has_more) == (total, None, False)
+    assert isinstance(store.query(sort_by='name', limit=1, lazy=True)[0], list)
+
+def test_cursors_walk_missing_sort_values(tmp_path):
+    """Null and missing sort values page through SQL in the order and number the in-memory indexes give"""
+    records = [{"id": "a1", "name": None, "rating": 3}, {"id": "b2", "name": "N2"},
+               {"id": "c3", "name": None, "rating": 4.5}, {"id": "d4", "name": "N4"},
+               {"id": "e5", "name": "N3", "rating": "n/a"}]
+    saved = dict(app.config)
+    try:
+        walks = {}
+        for mode in ('json', 'sqlite'):
+            # A file per mode, so neither is served the other's cached pages
+            path = tmp_path / f"{mode}.json"
+            path.write_text(json.dumps(records))
+            app.config.update(TESTING=True, DATA_FILE=str(path), STORAGE_MODE=mode,
+                              SQLITE_FILE=str(tmp_path / "walk.db"))
+            with app.test_client() as client:
+                for query in ('sort_by=name', 'sort_by=name&order=desc', 'sort_by=rating',
+                              'sort_by=rating&order=desc'):
+                    ids, url = [], f'/api/attractions?{query}&limit=2'
+                    while url:
+                        data = json.loads(client.get(url).data)
+                        ids.extend(a['id'] for a in data['items'])
+                        url = data['next_cursor'] and f"/api/attractions?{query}&limit=2&cursor={data['next_cursor']}"
+                    walks[mode, query] = ids
+        for (mode, query), ids in walks.items():
+            assert ids == walks['json', query] and len(ids) == 5
+        assert walks['json', 'sort_by=name'] == ["a1", "c3", "b2", "e5", "d4"]
+    finally:
+        app.config.clear()
+        app.config.update(saved)
+
+def test_missing_values_filter_and_facet_like_the_indexes(data_file):
+    """Blank-stored missing values stay out of facets, value filters and open text ranges"""
+    from query.filters import RangeFilter, ValueFilter
+    store = SqliteAttractionStore(data_file)
+    store.add({"id": "d4", "name": "Sea Life", "location": None})
+    store.add({"id": "e5", "name": "", "location": ""})
+    assert store.facets('location') == {"County Clare": 1, "County Antrim": 1, "County Cork": 1, "": 1}
+    assert [a['id'] for a in store.query(filters=[ValueFilter('location', [""])])[0]] == ["e5"]
+    page, *_ = store.query(filters=[RangeFilter('name', high="C")])
+    assert [a['id'] for a in page] == ["c3"]
+
+def test_save_replaces_rows_and_search(data_file):
+    """save() bulk-loads a new dataset and rebuilds the search index"""
+    store = SqliteAttractionStore(data_file)
+    version = store.current_version()
+    store.save(TEST_RECORDS[2:])
+    assert store.current_version() > version
+    assert [a['id'] for a in store.records()] == ["c3"]
+    assert store.query("sea", sort_by='relevance')[1] == 0
+    store.add(dict(TEST_RECORDS[0]))
+    assert store.query("sea", sort_by='relevance')[1] == 1
+
+def test_add_many_indexes_new_rows(data_file):
+    """Batched inserts are searchable and a duplicate id rejects the batch"""
+    store = SqliteAttractionStore(data_file)
+    store.add_many([{"id": f"n{i}", "name": f"Seaside {i}", "location": "County Sligo",
+                     "description": "Beach", "rating": 3} for i in range(3)])
+    assert store.query("seaside", sort_by='name')[1] == 3
+    with pytest.raises(Exception):
+        store.add_many([{"id": "n9", "name": "Other"}, {"id": "a1", "name": "Dup"}])
+    assert store.get("n9") is None
+    store.add({"id": "d4", "name": "Seaside late"})
+    assert store.query("seaside", sort_by='name')[1] == 4
+
+def test_fuzzy_query_expands_terms(data_file):
+    """Misspelt terms match through the FTS vocabulary, which follows later writes"""
+    store = SqliteAttractionStore(data_file)
+    assert store.query("blarny", sort_by='name')[1] == 0
+    page, total, *_ = store.query("blarny castel", sort_by='relevance', fuzzy=True)
+    assert [a['id'] for a in page] == ["c3"] and total == 1
+    store.add({"id": "d4", "name": "Dún Aonghasa", "location": "County Galway", "description": "Stone fort"})
+    page, total, *_ = store.query("dun aonghusa", sort_by='name', fuzzy=True)
+    assert [a['id'] for a in page] == ["d4"]
+    assert store.facets('location', "giants causway", fuzzy=True) == {"County Antrim": 1}
+
+def test_fuzzy_vocabulary_is_not_rebuilt_per_write(data_file, monkeypatch):
+    """Own writes extend the vocabulary in place; other workers' writes are picked up in the background"""
+    import storage.sqlite_store as sqlite_store
+    store = SqliteAttractionStore(data_file)
+    store.query("blarny", fuzzy=True)
+    index = store._vocabulary[1]
+    store.add({"id": "d4", "name": "Dún Aonghasa", "location": "County Galway"})
+    store.replace("a1", dict(TEST_RECORDS[0], description="Seabird colony"))
+    assert [a['id'] for a in store.query("aonghusa", fuzzy=True)[0]] == ["d4"]
+    assert [a['id'] for a in store.query("colny", fuzzy=True)[0]] == ["a1"]
+    assert store._vocabulary[1] is index
+    SqliteAttractionStore(data_file).add({"id": "e5", "name": "Skellig Michael"})
+    assert store.query("skelig", fuzzy=True)[1] == 0
+    monkeypatch.setattr(sqlite_store, 'VOCABULARY_REBUILD_SECONDS', 0)
+    assert store.query("skelig", fuzzy=True)[1] == 0
+    store._vocabulary_rebuild.join()
+    assert [a['id'] for a in store.query("skelig", fuzzy=True)[0]] == ["e5"]
+    assert store._vocabulary[1] is not index and store._vocabulary[0] == store.current_version()
+
+def test_non_scalar_fields_are_stored(data_file):
+    """Lists, objects and booleans in indexed fields are kept whole and sorted like sort_key"""
+    from query.filters import RangeFilter
+    store = SqliteAttractionStore(data_file)
+    store.add({"id": "d4", "name": ["Sea", "Life"], "location": {"county": "Cork"}, "rating": True})
+    assert store.replace("a1", dict(TEST_RECORDS[0], description=["cliffs", "sea"]))
+    store.add_many([{"id": "e5", "name": "Zoo", "location": ["Dublin"]}])
+    assert store.get("d4")["name"] == ["Sea", "Life"] and store.get("a1")["description"] == ["cliffs", "sea"]
+    page, *_ = store.query(sort_by='name')
+    assert [a['id'] for a in page] == ["c3", "a1", "b2", "e5", "d4"]
+    assert store.query(sort_by='rating', filters=[RangeFilter('rating', low=0)])[1] == 3
+
+def test_query_filters_and_facets(data_file):
+    """Range and value filters run in SQL; facets group the matching rows"""
+    from query.filters import RangeFilter, ValueFilter
+    store = SqliteAttractionStore(data_file)
+    store.add({"id": "d4", "name": "Sea Life", "location": "County Cork", "rating": "n/a",
+               "created_at": "2025-01-04T00:00:00"})
+    page, total, *_ = store.query(sort_by='rating', filters=[RangeFilter('rating', low=4.6)])
+    assert [a['id'] for a in page] == ["b2", "a1"] and total == 2
+    page, total, *_ = store.query(sort_by='name', filters=[
+        ValueFilter('location', ["County Cork", "County Clare"]),
+        RangeFilter('created_at', "2025-01-01T10:00:00", exclusive=True)])
+    assert [a['id'] for a in page] == ["c3", "d4"] and total == 2
+    page, total, *_ = store.query("sea", sort_by='relevance', filters=[RangeFilter('rating', high=4.85)])
+    assert [a['id'] for a in page] == ["b2"] and total == 1
+    assert store.facets('location') == {"County Clare": 1, "County Antrim": 1, "County Cork": 2}
+    assert store.facets('location', "sea", [RangeFilter('created_at', high="2025-01-04T12:00:00")]) == {
+        "County Clare": 1, "County Cork": 1}
+
+def test_nearby_follows_the_rtree(data_file):
+    """Nearest-first results come from the R*Tree and track inserts, updates and deletes"""
+    store = SqliteAttractionStore(data_file)
+    assert store.nearby(53.35, -6.26) == []
+    store.add_many([{"id": "d4", "name": "Newgrange", "lat": 53.6947, "lon": -6.4755},
+                    {"id": "e5", "name": "Skellig Michael", "lat": 51.7720, "lon": -10.5393}])
+    store.replace("a1", dict(TEST_RECORDS[0], lat=52.9715, lon=-9.4309))
+    store.add({"id": "f6", "name": "Fiji", "lat": -17.7, "lon": 179.9})
+    assert [(round(d), a['id']) for d, a in store.nearby(53.35, -6.26, limit=2)] == [(41, "d4"), (216, "a1")]
+    assert [a['id'] for _, a in store.nearby(53.35, -6.26, radius_km=250)] == ["d4", "a1"]
+    assert [a['id'] for _, a in store.nearby(-17.7, -179.9, limit=1)] == ["f6"]
+    store.remove("d4")
+    assert [a['id'] for _, a in store.nearby(53.35, -6.26, limit=1)] == ["a1"]
+    assert len(store.nearby(0, 0)) == 3
+    
+    # A reopened store finds the same points; a full save rebuilds the tree
+    distances = [d for d, _ in SqliteAttractionStore(data_file).nearby(51.77, -10.54)]
+    assert distances == sorted(distances) and distances[0] < 1
+    store.save([{"id": "g7", "name": "Spike Island", "lat": 51.8346, "lon": -8.2838}])
+    assert [(a['id'], round(d)) for d, a in store.nearby(51.8346, -8.2838)] == [("g7", 0)]
+
+def test_existing_database_gains_the_rtree(data_file):
+    """A database created before the R*Tree indexes the positions it already holds"""
+    store = SqliteAttractionStore(data_file)
+    store.add({"id": "d4", "name": "Newgrange", "lat": 53.6947, "lon": -6.4755})
+    conn = store._connection()
+    conn.execute("DROP TABLE attractions_geo")
+    reopened = SqliteAttractionStore(data_file)
+    assert [a['id'] for _, a in reopened.nearby(53.35, -6.26)] == ["d4"]
+    reopened.add({"id": "e5", "name": "Malahide Castle", "lat": 53.4509, "lon": -6.1540})
+    assert [a['id'] for _, a in reopened.nearby(53.35, -6.26)] == ["e5", "d4"]
+
+def test_stats_follow_the_rollups(data_file):
+    """Trigger-maintained rollups agree with rolling up the rows from scratch"""
+    from indexes.stats_index import StatsIndex
+    store = SqliteAttractionStore(data_file)
+    store.add_many([{"id": f"n{i}", "name": f"Seaside {i}", "location": "County Sligo", "rating": i % 3 + 3,
+                     "created_at": f"2025-02-0{i + 1}T08:00:00"} for i in range(5)])
+    store.add({"id": "d4", "name": "Sea Life", "location": "County Cork", "rating": "n/a",
+               "created_at": "2025-01-04"})
+    store.add({"id": "e5", "name": "Flagged", "rating": True, "location": 3, "created_at": "2025-02-30"})
+    store.add({"id": "f6", "name": "Unrated", "location": "County Cork"})
+    store.replace("a1", dict(TEST_RECORDS[0], location="County Cork", rating=3.5))
+    store.remove("n1")
+    expected = StatsIndex()
+    expected.reset(store.records())
+    assert store.stats() == expected.summary()
+    assert store.stats()["locations"]["County Cork"] == {"count": 4, "mean_rating": 4.0}
+    
+    # A database from before the rollups counts the rows it already holds
+    store._connection().execute("DROP TABLE rollups")
+    reopened = SqliteAttractionStore(data_file)
+    assert reopened.stats() == expected.summary()
+    reopened.remove("e5")
+    assert reopened.stats()["count"] == 9
+    reopened.save(TEST_RECORDS[:1])
+    assert reopened.stats()["rating"] == {"count": 1, "mean": 4.9, "min": 4.9, "max": 4.9, "histogram": {"4": 1}}
@@ -0,0 +1,58 @@
+import os
+import random
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from indexes.stats_index import StatsIndex, creation_day
+
+def random_record(rng, i):
+    """A record with a mix of valid, odd and missing rating, location and created_at values"""
+    record = {"id": f"r{i}",
+              "rating": rng.choice([0, 1.5, 3, 4, 4.0, 4.5, 5, "n/a", True]),
+              "location": rng.choice(["County Clare", "County Cork", "County Kerry", 7]),
+              "created_at": rng.choice([f"2024-0{rng.randrange(1, 4)}-1{rng.randrange(10)}T10:00:00",
+                                        "2024-02-30T00:00:00", "yesterday", "2024-03-01"])}
+    return {k: v for k, v in record.items() if rng.random() < 0.9}
+
+def test_incremental_rollups_match_a_rebuild():
+    """Creates, updates and deletes leave the same statistics as rebuilding from the records"""
+    rng = random.Random(3)
+    records = {f"r{i}": random_record(rng, i) for i in range(200)}
+    index = StatsIndex()
+    index.reset(records.values())
+    for step in range(2000):
+        doc_id = f"r{rng.randrange(300)}"
+        old = records.get(doc_id)
+        if old is not None and rng.random() < 0.3:
+            index.delete(records.pop(doc_id))
+        else:
+            new = dict(random_record(rng, step), id=doc_id)
+            index.put(old, new)
+            records[doc_id] = new
+    rebuilt = StatsIndex()
+    rebuilt.reset(records.values())
+    assert index.summary() == rebuilt.summary()
+    assert len(index) == len(records)
+
+def test_summary_shape():
+    """Histogram by whole star, location means over rated records only, days and months"""
+    index = StatsIndex()
+    index.reset([{"id": "a", "rating": 4.5, "location": "County Cork", "created_at": "2024-01-31T10:00:00"},
+                 {"id": "b", "rating": 3, "location": "County Cork", "created_at": "2024-02-01T09:00:00"},
+                 {"id": "c", "rating": "n/a", "location": "County Kerry", "created_at": "2024-02-01"},
+                 {"id": "d", "rating": 5}])
+    assert index.summary() == {
+        "count": 4,
+        "rating": {"count": 3, "mean": 4.167, "min": 3, "max": 5, "histogram": {"3": 1, "4": 1, "5": 1}},
+        "locations": {"County Cork": {"count": 2, "mean_rating": 3.75},
+                      "County Kerry": {"count": 1, "mean_rating": None}},
+        "created": {"per_day": {"2024-01-31": 1, "2024-02-01": 2}, "per_month": {"2024-01": 1, "2024-02": 2}},
+    }
+    index.delete({"id": "c", "rating": "n/a", "location": "County Kerry", "created_at": "2024-02-01"})
+    summary = index.summary()
+    assert "County Kerry" not in summary["locations"] and summary["created"]["per_day"]["2024-02-01"] == 1
+    assert StatsIndex().summary()["rating"] == {"count": 0, "mean": None, "min": None, "max": None, "histogram": {}}
+    assert creation_day("2024-02-30") is None and creation_day("2024-W01-1") is None
+    assert creation_day("2024-02-29T23:59:59+01:00") == "2024-02-29"
@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage.json_store import AttractionStore
+from storage.wal_store import WalAttractionStore
+from storage.registry import get_store
+from indexes.sorted_index import SortedIndex
+
+TEST_RECORDS = [
+    {"id": "a1", "name": "Cliffs of Moher", "location": "County Clare",
+     "description": "Sea cliffs", "rating": 4.9, "created_at": "2025-01-01T10:00:00"},
+    {"id": "b2", "name": "Giant's Causeway", "location": "County Antrim",
+     "description": "Basalt columns", "rating": 4.8, "created_at": "2025-01-05T11:30:00"},
+]
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Write the test records to a temporary data file"""
+    path = tmp_path / "attractions.json"
+    path.write_text(json.dumps(TEST_RECORDS))
+    return str(path)
+
+def test_records_are_cached(data_file):
+    """Unchanged files are served from memory without re-parsing"""
+    store = AttractionStore(data_file)
+    first = store.records()
+    assert first is store.records()
+    assert [a['id'] for a in first] == ["a1", "b2"]
+
+def test_outside_edit_is_detected(data_file):
+    """A change to the file on disk invalidates the cached copy"""
+    store = AttractionStore(data_file)
+    store.records()
+    with open(data_file, 'w') as f:
+        json.dump(TEST_RECORDS[:1], f)
+    assert [a['id'] for a in store.records()] == ["a1"]
+
+def test_save_is_visible_to_other_stores(data_file):
+    """A save from one store (worker) is picked up by another"""
+    writer = AttractionStore(data_file)
+    reader = AttractionStore(data_file)
+    reader.records()
+    writer.save(TEST_RECORDS + [{"id": "c3", "name": "Newgrange"}])
+    assert len(reader.records()) == 3
+    assert not [p for p in os.listdir(os.path.dirname(data_file)) if p.endswith('.tmp')]
+
+def test_corrupt_file_keeps_last_good_copy(data_file):
+    """A half-written file does not wipe the cache"""
+    store = AttractionStore(data_file)
+    store.records()
+    with open(data_file, 'w') as f:
+        f.write('[{"id": ')
+    assert len(store.records()) == 2
+
+def test_get_store_is_shared_per_path(data_file):
+    """The same path always maps to the same store"""
+    assert get_store(data_file) is get_store(os.path.relpath(data_file))
+
+def test_id_index_follows_mutations(data_file):
+    """Lookups by id stay correct after adds, replaces and deletes"""
+    store = AttractionStore(data_file)
+    store.add({"id": "c3", "name": "Newgrange"})
+    assert store.get("c3")['name'] == "Newgrange"
+    assert store.remove("a1")
+    assert store.get("a1") is None
+    assert store.get("c3")['name'] == "Newgrange"
+    assert store.replace("b2", {"id": "b2", "name": "Causeway"})
+    assert store.get("b2")['name'] == "Causeway"
+    assert not store.remove("a1")
+    assert sorted(a['id'] for a in AttractionStore(data_file).records()) == ["b2", "c3"]
+
+@pytest.mark.parametrize('count', [1, 200])
+def test_add_many_persists_in_one_write(data_file, count):
+    """Small batches update the indexes in place, large ones rebuild them"""
+    store = AttractionStore(data_file)
+    index = store.ensure_index('sort:name', lambda: SortedIndex('name'))
+    store.add_many([{"id": f"n{i:03}", "name": f"New {i:03}"} for i in range(count)])
+    assert len(index) == count + 2
+    assert index.ids()[-1] == f"n{count - 1:03}"
+    assert len(AttractionStore(data_file).records()) == count + 2
+
+def test_json_delete_writes_without_compacting(data_file):
+    """A delete writes the file without the record but leaves the in-memory list and positions alone"""
+    store = AttractionStore(data_file)
+    store.add_many([{"id": f"n{i:03}", "name": f"New {i:03}"} for i in range(200)])
+    records, positions = store._records, dict(store._positions)
+    assert store.remove("a1")
+    assert store._records is records and store._holes == [0]
+    assert store._positions == {i: p for i, p in positions.items() if i != "a1"}
+    with open(data_file) as f:
+        assert [a['id'] for a in json.load(f)][:2] == ["b2", "n000"]
+
+@pytest.mark.parametrize('compact_records', [False, True])
+@pytest.mark.parametrize('store_class', [AttractionStore, WalAttractionStore])
+def test_deletes_keep_record_order(data_file, store_class, compact_records):
+    """Deleted records leave the others in their original order, in memory and on disk"""
+    store = store_class(data_file, compact_records=compact_records)
+    store.add_many([{"id": f"n{i:03}", "name": f"New {i:03}"} for i in range(200)])
+    ids = [a['id'] for a in store.records()]
+    for attraction_id in ids[::3]:
+        assert store.remove(attraction_id)
+    expected = [i for i in ids if i not in ids[::3]]
+    assert [a['id'] for a in store.iter_records()] == expected and store.count() == len(expected)
+    assert [a['id'] for a in store.lookup(expected[::-1])] == expected[::-1] and store.get(ids[0]) is None
+    assert [a['id'] for a in store_class(data_file).records()] == expected
+    if store_class is WalAttractionStore:
+        store.compact()
+        assert [a['id'] for a in store_class(data_file).records()] == expected
@@ -0,0 +1,107 @@
+import os
+import sys
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from indexes.text_index import TextIndex, TrigramIndex
+
+RECORDS = [
+    {"id": "1", "name": "Dublin Castle", "location": "Dublin", "description": "Historic castle"},
+    {"id": "2", "name": "Blarney Castle", "location": "Cork", "description": "Home of the Blarney Stone"},
+    {"id": "3", "name": "Guinness Storehouse", "location": "Dublin", "description": "Brewery tour"},
+]
+
+def make_index():
+    index = TextIndex({'name': 3.0, 'location': 2.0, 'description': 1.0})
+    index.reset(RECORDS)
+    return index
+
+def test_exact_and_prefix_terms():
+    """Whole words and word prefixes both match"""
+    index = make_index()
+    assert set(index.search("castle")) == {"1", "2"}
+    assert set(index.search("dub")) == {"1", "3"}
+
+def test_all_terms_must_match():
+    """Multi-word queries intersect their terms"""
+    assert make_index().ranked("dublin castle") == ["1"]
+
+def test_substring_fallback():
+    """Text inside a word is found through the trigram index"""
+    index = make_index()
+    assert set(index.search("blin")) == {"1", "3"}
+    assert set(index.search("ness")) == {"3"}
+
+def test_name_matches_rank_first():
+    """A match in the name outranks one only in the description"""
+    index = make_index()
+    index.put(None, {"id": "4", "name": "Rock of Cashel", "location": "Tipperary",
+                     "description": "Castle ruins on a hill"})
+    assert index.ranked("castle")[-1] == "4"
+
+def test_incremental_updates():
+    """Updates and deletes keep postings and vocabulary in step"""
+    index = make_index()
+    index.put(RECORDS[2], dict(RECORDS[2], name="Jameson Distillery"))
+    assert "3" not in index.search("guinness")
+    assert set(index.search("distil")) == {"3"}
+    index.delete(RECORDS[0])
+    assert set(index.search("dublin")) == {"3"}
+    assert "historic" not in index._vocabulary
+
+def test_accents_and_case_are_folded():
+    """Irish fadas and capitals match their plain lowercase spelling both ways"""
+    index = make_index()
+    index.put(None, {"id": "4", "name": "Dún Aonghasa", "location": "Inis Mór", "description": "Fort"})
+    assert set(index.search("dun")) == {"4"}
+    assert set(index.search("DÚN MOR")) == {"4"}
+    assert set(index.search("cástle")) == {"1", "2"}
+
+def test_fuzzy_search_tolerates_typos():
+    """Misspelt terms match the most similar tokens, ranked below exact matches"""
+    index = make_index()
+    index.put(None, {"id": "4", "name": "Killarney National Park", "location": "Kerry", "description": "Lakes"})
+    index.put(None, {"id": "5", "name": "Giant's Causeway", "location": "Antrim", "description": "Basalt"})
+    assert index.search("killarny") == {}
+    assert set(index.search("killarny", fuzzy=True)) == {"4"}
+    assert set(index.search("Giants Causway", fuzzy=True)) == {"5"}
+    assert set(index.search("guiness storhouse", fuzzy=True)) == {"3"}
+    # Exact matches keep outranking fuzzy ones; short terms stay exact
+    index.put(None, {"id": "6", "name": "Castel Gardens", "location": "Dublin", "description": "Flowers"})
+    assert index.ranked("castle", fuzzy=True)[-1] == "6"
+    assert index.search("kery", fuzzy=True) and index.search("kry", fuzzy=True) == {}
+
+def test_similar_tokens_are_capped_and_ordered():
+    """The trigram index returns at most limit tokens, most similar first"""
+    trigram_index = TrigramIndex()
+    for token in ["castle", "castles", "castlebar", "cashel", "carlow", "tower"]:
+        trigram_index.add(token)
+    similar = trigram_index.similar("casle")
+    assert [token for token, _ in similar][:1] == ["castle"] and "tower" not in dict(similar)
+    assert [s for _, s in similar] == sorted((s for _, s in similar), reverse=True)
+    assert len(trigram_index.similar("casle", limit=2)) == 2
+    trigram_index.remove("castle")
+    assert "castle" not in dict(trigram_index.similar("casle"))
+    assert trigram_index.containing("stl") == {"castles", "castlebar"}
+
+@pytest.mark.parametrize("score_all", [0, 2048])
+def test_top_pages_match_the_full_ranking(monkeypatch, score_all):
+    """Ranking a page by weight levels agrees with ranking every match"""
+    monkeypatch.setattr('indexes.text_index.IMPACT_MIN_POSTINGS', 4)
+    monkeypatch.setattr('indexes.text_index.SCORE_ALL_MATCHES', score_all)
+    words = ["castle", "castle castle", "castles tower", "tower", "castle castle castle"]
+    index = TextIndex({'name': 3.0, 'description': 1.0})
+    index.reset([{"id": str(i), "name": words[i % 5], "description": words[i * 3 % 5]} for i in range(40)])
+    index.put(None, {"id": "40", "name": "castle tower castle", "description": "tower"})
+    index.delete({"id": "7"})
+    for query in ["castle", "castle tower", "cast tow", "castel towr"]:
+        matches = index.search(query, fuzzy=True)
+        full = sorted(((matches[i], i) for i in matches), reverse=True)
+        assert index.ranked(query, fuzzy=True) == [i for _, i in full]
+        assert matches.top(5) == full[:5]
+        assert matches.top(5, after=full[4]) == full[5:10]
+        within = {i for i in matches if int(i) % 2}
+        assert matches.top(3, within=within) == [pair for pair in full if pair[1] in within][:3]
@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from storage.wal_store import WalAttractionStore
+
+SNAPSHOT = [
+    {"id": "a1", "name": "Cliffs of Moher", "rating": 4.9},
+    {"id": "b2", "name": "Giant's Causeway", "rating": 4.8},
+]
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Write the snapshot to a temporary data file"""
+    path = tmp_path / "attractions.json"
+    path.write_text(json.dumps(SNAPSHOT))
+    return str(path)
+
+def read_log(store):
+    with open(store.log_path) as f:
+        return [json.loads(line) for line in f]
+
+def test_mutations_append_to_log(data_file):
+    """Writes append one line per mutation and leave the snapshot alone"""
+    store = WalAttractionStore(data_file)
+    before = open(data_file).read()
+    store.add({"id": "c3", "name": "Newgrange"})
+    store.replace("a1", {"id": "a1", "name": "Moher"})
+    store.remove("b2")
+    assert open(data_file).read() == before
+    assert [e['op'] for e in read_log(store)] == ["put", "put", "delete"]
+
+def test_log_is_replayed_on_load(data_file):
+    """A fresh store (new process) sees snapshot plus log"""
+    writer = WalAttractionStore(data_file)
+    writer.add({"id": "c3", "name": "Newgrange"})
+    writer.remove("a1")
+    reader = WalAttractionStore(data_file)
+    assert sorted(a['id'] for a in reader.records()) == ["b2", "c3"]
+    # Later appends are picked up incrementally
+    writer.replace("b2", {"id": "b2", "name": "Causeway"})
+    assert reader.get("b2")['name'] == "Causeway"
+
+def test_torn_final_line_is_ignored(data_file):
+    """A partially written last entry does not break replay"""
+    store = WalAttractionStore(data_file)
+    store.add({"id": "c3", "name": "Newgrange"})
+    with open(store.log_path, 'a') as f:
+        f.write('{"op":"put","record":{"id":')
+    assert len(WalAttractionStore(data_file).records()) == 3
+    store.add({"id": "d4", "name": "Kylemore Abbey"})
+    assert len(WalAttractionStore(data_file).records()) == 4
+
+def test_compaction_folds_log_into_snapshot(data_file):
+    """Compaction rewrites the snapshot and empties the log"""
+    store = WalAttractionStore(data_file)
+    store.add({"id": "c3", "name": "Newgrange"})
+    store.remove("a1")
+    store.compact()
+    with open(data_file) as f:
+        assert sorted(a['id'] for a in json.load(f)) == ["b2", "c3"]
+    assert os.path.getsize(store.log_path) == 0
+    assert sorted(a['id'] for a in WalAttractionStore(data_file).records()) == ["b2", "c3"]
+
+def test_reader_survives_compaction_by_writer(data_file):
+    """Another process notices the swapped snapshot and log"""
+    writer = WalAttractionStore(data_file)
+    reader = WalAttractionStore(data_file)
+    writer.add({"id": "c3", "name": "Newgrange"})
+    assert len(reader.records()) == 3
+    writer.compact()
+    writer.add({"id": "d4", "name": "Kylemore Abbey"})
+    assert sorted(a['id'] for a in reader.records()) == ["a1", "b2", "c3", "d4"]
+
+def test_background_compaction_past_threshold(data_file):
+    """Crossing the size threshold compacts without losing writes"""
+    store = WalAttractionStore(data_file, compact_bytes=200)
+    for i in range(20):
+        store.add({"id": f"x{i}", "name": f"Attraction {i}"})
+    store.compact()
+    assert len(WalAttractionStore(data_file).records()) == 22
+
+def test_add_many_snapshots_large_batches_and_logs_small_ones(data_file):
+    """A large batch becomes the new snapshot; a small one is one log write"""
+    store = WalAttractionStore(data_file)
+    store.add({"id": "c3", "name": "Newgrange"})
+    store.add_many([{"id": f"n{i}", "name": "New"} for i in range(100)])
+    assert read_log(store) == []
+    assert len(json.load(open(data_file))) == 103
+    store.add_many([{"id": "d4", "name": "Dun Aonghasa"}])
+    assert [e['op'] for e in read_log(store)] == ["put"]
+    assert len(WalAttractionStore(data_file).records()) == 104
+
+def test_apply_changes_is_one_append(data_file):
+    """A batch of puts and deletes is logged together and replays in order"""
+    store = WalAttractionStore(data_file)
+    for i in range(200):
+        store.add({"id": f"n{i}", "name": "New"})
+    store.compact()
+    store.apply_changes([('put', {"id": "a1", "name": "Moher"}), ('delete', "b2"), ('delete', "zz")])
+    assert [e['op'] for e in read_log(store)] == ["put", "delete"]
+    reader = WalAttractionStore(data_file)
+    assert reader.get("a1")['name'] == "Moher" and reader.get("b2") is None